@@ -1,6 +1,9 @@
 import os
+import hashlib
+from datetime import datetime
 from dotenv import load_dotenv
-from sqlalchemy import create_engine, text
+from sqlalchemy import create_engine, text, select, insert, update
+from sqlalchemy.exc import SQLAlchemyError, IntegrityError
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
@@ -9,6 +12,9 @@ load_dotenv()
 # Base class for models
 Base = declarative_base()
 
+# Floor of each worker's pool, whatever the budget split gives
+MIN_POOL_SIZE = int(os.getenv("DB_MIN_POOL_SIZE", "3"))
+
 def get_database_url():
     """Get database URL from environment variables"""
     database_url = os.getenv("DATABASE_URL")
@@ -22,6 +28,24 @@ def get_database_url():
     
     return database_url
 
+def get_pool_settings():
+    """
+    Connection pool per worker process. DB_MAX_CONNECTIONS is a soft budget
+    for the whole server, split across WEB_CONCURRENCY workers: each worker
+    keeps at least MIN_POOL_SIZE connections (a request's session plus the
+    detached single-flight builds it waits on) and may briefly overflow by
+    DB_MAX_OVERFLOW, so the real ceiling is workers * (pool_size + overflow).
+    """
+    workers = max(int(os.getenv("WEB_CONCURRENCY", "1")), 1)
+    total = int(os.getenv("DB_MAX_CONNECTIONS", "15"))
+    return {
+        "pool_size": int(os.getenv("DB_POOL_SIZE", str(max(total // workers, MIN_POOL_SIZE)))),
+        "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", "2")),
+        "pool_timeout": int(os.getenv("DB_POOL_TIMEOUT", "10")),
+        "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", "1800")),
+        "pool_pre_ping": True
+    }
+
 # Create engine
 database_url = get_database_url()
 if database_url.startswith("sqlite"):
@@ -38,7 +62,8 @@ elif database_url.startswith("mysql"):
         echo=False,
         connect_args={
             "ssl": {"check_hostname": False, "verify_mode": False}
-        }
+        },
+        **get_pool_settings()
     )
 else:
     # PostgreSQL with SSL for Supabase
@@ -47,7 +72,8 @@ else:
         echo=False,
         connect_args={
             "sslmode": "require"
-        }
+        },
+        **get_pool_settings()
     )
 
 # Create session factory
@@ -61,21 +87,100 @@ def get_db():
     finally:
         db.close()
 
+def with_session(fn, *args, **kwargs):
+    """
+    Run fn(db, *args, **kwargs) on a Session of its own. For work shared by
+    several requests (single-flight builds), which must outlive any one of
+    them and so cannot borrow a request's Session.
+    """
+    db = SessionLocal()
+    try:
+        return fn(db, *args, **kwargs)
+    finally:
+        db.close()
+
+def import_models():
+    """Import every model so Base.metadata describes the full schema"""
+    from models.user import Usuario
+    from models.modulo import Modulo
+    from models.leccion import Leccion
+    from models.video import Video
+    from models.usuario_leccion import UsuarioLeccion
+    from models.usuario_modulo import UsuarioModulo
+    from models.desafio_diario import DesafioDiario
+    from models.quiz_diario import QuizDiario
+    from models.checkpoint_tarea import CheckpointTarea
+    from models.esquema_version import EsquemaVersion
+    from models.purga_pendiente import PurgaPendiente
+    from models.resumen_leccion import ResumenLeccion
+    from models.evento_actividad import EventoActividad
+    from models.actividad_diaria import ActividadDiaria
+    from models.actividad_bitmap import ActividadBitmap
+    from models.repaso_palabra import RepasoPalabra
+    from models.resumen_usuario import ResumenUsuario
+    from models.mision_cobrada import MisionCobrada
+    return {"Usuario": Usuario, "EsquemaVersion": EsquemaVersion}
+
+
+def schema_fingerprint() -> str:
+    """Stable hash of the declared tables, columns, keys and indexes"""
+    partes = []
+    for tabla in sorted(Base.metadata.sorted_tables, key=lambda t: t.fullname):
+        partes.append(f"T {tabla.fullname}")
+        for col in tabla.columns:
+            fks = ",".join(sorted(fk.target_fullname for fk in col.foreign_keys))
+            partes.append(f"C {col.name} {col.type!r} {col.nullable} {col.primary_key} {col.unique} {fks}")
+        for indice in sorted(tabla.indexes, key=lambda i: i.name or ""):
+            partes.append(f"I {indice.name} {indice.unique} {[c.name for c in indice.columns]}")
+    return hashlib.sha256("\n".join(partes).encode("utf-8")).hexdigest()
+
+
 async def connect_and_sync():
-    """Connect to database and create tables"""
+    """
+    Connect to database and create tables.
+    create_all is skipped when the stored schema fingerprint matches the models
+    (set SCHEMA_SYNC_FORCE=true to always run it).
+    """
     try:
-        # Test connection
+        # Import models to register them
+        modelos = import_models()
+        EsquemaVersion = modelos["EsquemaVersion"]
+        huella = schema_fingerprint()
+        
+        # Test connection and read the stored fingerprint in one round trip
         with engine.connect() as conn:
-            conn.execute(text("SELECT 1"))
+            try:
+                guardada = conn.execute(
+                    select(EsquemaVersion.huella).where(EsquemaVersion.clave == "metadata")
+                ).scalar()
+            except SQLAlchemyError:
+                # First boot: the fingerprint table does not exist yet
+                conn.rollback()
+                guardada = None
         
-        # Import models to register them
-        from models.user import Usuario
+        if guardada == huella and os.getenv("SCHEMA_SYNC_FORCE", "false").lower() != "true":
+            print("✓ Database connected (schema unchanged, sync skipped)")
+            return modelos
         
         # Create all tables
         Base.metadata.create_all(bind=engine)
         
+        # Upsert: every worker of a fresh deploy gets here at the same time
+        valores = {"huella": huella, "actualizado_en": datetime.utcnow()}
+        actualizar = update(EsquemaVersion).where(EsquemaVersion.clave == "metadata").values(**valores)
+        with engine.begin() as conn:
+            escrita = conn.execute(actualizar).rowcount
+        if not escrita:
+            try:
+                with engine.begin() as conn:
+                    conn.execute(insert(EsquemaVersion).values(clave="metadata", **valores))
+            except IntegrityError:
+                # Another worker inserted it first
+                with engine.begin() as conn:
+                    conn.execute(actualizar)
+        
         print("✓ Database connected and synchronized")
-        return {"Usuario": Usuario}
+        return modelos
     except Exception as e:
         print(f"✗ Database connection failed: {e}")
         raise
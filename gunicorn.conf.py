@@ -0,0 +1,35 @@
+"""
+Gunicorn config for production: gunicorn -c gunicorn.conf.py main:app
+Use it instead of `NODE_ENV=production python main.py` when you need
+preload_app or max_requests jitter.
+"""
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+workers = int(os.getenv("WEB_CONCURRENCY", str(os.cpu_count() or 1)))
+worker_class = "uvicorn.workers.UvicornWorker"
+
+# Import the app once in the master and fork workers from it (PRELOAD_APP=true)
+preload_app = os.getenv("PRELOAD_APP", "false").lower() == "true"
+
+# Worker recycling: restart after N requests, jittered so workers do not restart together
+max_requests = int(os.getenv("MAX_REQUESTS", "10000"))
+max_requests_jitter = int(os.getenv("MAX_REQUESTS_JITTER", str(max_requests // 10)))
+
+# Graceful drain on SIGTERM
+graceful_timeout = int(os.getenv("GRACEFUL_TIMEOUT", "30"))
+timeout = int(os.getenv("WORKER_TIMEOUT", "60"))
+keepalive = int(os.getenv("KEEP_ALIVE", "5"))
+
+# Workers size their share of the DB pool from this
+os.environ["WEB_CONCURRENCY"] = str(workers)
+
+# bcrypt cost calibrated once in the master so every worker hashes at the same cost
+from services.password_hashing import calibrate_rounds
+os.environ["BCRYPT_ROUNDS"] = str(calibrate_rounds())
+
+
+def post_fork(server, worker):
+    # With preload_app the master's pool must not be shared across forks
+    from database.db import engine
+    engine.dispose(close=False)
@@ -1,10 +1,13 @@
 import os
+import asyncio
+from services.startup_report import startup_report
 from contextlib import asynccontextmanager
 from fastapi import FastAPI, Depends
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from dotenv import load_dotenv
 
-from database.db import connect_and_sync
+from database.db import connect_and_sync, engine
 from routes.auth_routes import router as auth_router
 from routes.home_routes import router as home_router
 from routes.modulos_routes import router as modulos_router
@@ -13,25 +16,98 @@ from routes.lecciones_routes import router as lecciones_router
 from routes.dictionary_routes import router as dictionary_router
 from routes.missions_routes import router as missions_router
 from routes.avatars_routes import router as avatars_router
+from routes.leaderboard_routes import router as leaderboard_router
+from routes.health_routes import router as health_router
+from routes.media_routes import router as media_router
+from routes.catalog_routes import router as catalog_router
+from routes.analytics_routes import router as analytics_router
+from routes.review_routes import router as review_router
 from middleware.auth_middleware import require_auth
+from middleware.compression import CompressionMiddleware
+from services.daily_reset import daily_reset_loop
+from services.write_behind import start_write_behind, stop_write_behind
+from services.leaderboard import seed_leaderboard, reconcile_leaderboard_loop
+from services.purge import purge_loop
+from services.analytics import analytics_rebuild_loop
+from services.activity_log import activity_maintenance_loop, ensure_rollups_seeded
+from services.spaced_repetition import review_backfill_loop
+from services.health import warm_up, health_state
+from services.media import fd_cache
+from services.password_hashing import init_password_hashing
 
 # Load environment variables
 load_dotenv()
 
+startup_report.mark("imports")
+
 # Lifespan context manager for startup/shutdown events
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
+    startup_report.mark("server init")
     try:
         await connect_and_sync()
+        startup_report.mark("schema sync")
+        # Before the first request can build an activity bitmap from the rollups
+        if await asyncio.to_thread(ensure_rollups_seeded):
+            print("✓ Activity rollups seeded from lesson history")
+        startup_report.mark("activity rollups")
+        await seed_leaderboard()
+        startup_report.mark("leaderboard")
+        await warm_up()
+        startup_report.mark("warm-up")
+        rounds = await asyncio.to_thread(init_password_hashing)
+        startup_report.mark("bcrypt calibration")
+        print(f"✓ bcrypt cost {rounds}")
         print(f"✓ API starting on port {os.getenv('PORT', '8000')} [{os.getenv('NODE_ENV', 'dev')}]")
     except Exception as e:
         print(f"✗ Failed to start server: {e}")
         raise
     
+    # Background rollover of daily challenges (disable with DAILY_RESET_ENABLED=false)
+    reset_task = None
+    if os.getenv("DAILY_RESET_ENABLED", "true").lower() != "false":
+        reset_task = asyncio.create_task(daily_reset_loop())
+    
+    # Optional write-behind buffer for progress counters (WRITE_BEHIND_ENABLED=true)
+    write_behind = start_write_behind()
+    flush_task = asyncio.create_task(write_behind.run()) if write_behind else None
+    
+    # Leaderboard drift correction against the database
+    reconcile_task = asyncio.create_task(reconcile_leaderboard_loop())
+    
+    # Background cascade deletes queued by module/lesson deletes
+    purge_task = asyncio.create_task(purge_loop())
+    
+    # Periodic full re-aggregation of the lesson analytics summaries
+    analytics_task = asyncio.create_task(analytics_rebuild_loop())
+    
+    # Daily compaction of the activity log into rollups, plus retention
+    activity_task = asyncio.create_task(activity_maintenance_loop())
+    
+    # One-off: queue the review words of lessons completed before the queue existed
+    backfill_task = asyncio.create_task(review_backfill_loop())
+    
+    startup_report.report()
+    
     yield
     
-    # Shutdown
+    # Shutdown: stop reporting ready while in-flight requests drain
+    health_state.ready = False
+    if reset_task:
+        reset_task.cancel()
+    if flush_task:
+        flush_task.cancel()
+    reconcile_task.cancel()
+    purge_task.cancel()
+    analytics_task.cancel()
+    activity_task.cancel()
+    backfill_task.cancel()
+    stop_write_behind()
+    
+    # In-flight requests have drained by now; release pooled connections and files
+    engine.dispose()
+    fd_cache.close_all()
     print("✓ API shutting down")
 
 
@@ -39,7 +115,8 @@ async def lifespan(app: FastAPI):
 app = FastAPI(
     title="Android Backend API",
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
 # CORS middleware - parse origins from env or use defaults
@@ -59,13 +136,11 @@ app.add_middleware(
     expose_headers=["*"],
 )
 
-# Health check endpoint
-@app.get("/health")
-async def health_check():
-    return {
-        "status": "ok",
-        "version": "1.0.0"
-    }
+# Response compression (gzip/brotli) above a size threshold
+app.add_middleware(CompressionMiddleware, minimum_size=int(os.getenv("COMPRESSION_MIN_SIZE", "1024")))
+
+# Health routes (liveness / readiness)
+app.include_router(health_router, prefix="/health", tags=["Health"])
 
 # Auth routes
 app.include_router(auth_router, prefix="/auth", tags=["Authentication"])
@@ -91,6 +166,21 @@ app.include_router(missions_router, prefix="/missions", tags=["Missions"])
 # Avatars routes
 app.include_router(avatars_router, prefix="/avatars", tags=["Avatars"])
 
+# Leaderboard routes
+app.include_router(leaderboard_router, prefix="/leaderboard", tags=["Leaderboard"])
+
+# Spaced-repetition review of dictionary words
+app.include_router(review_router, prefix="/review", tags=["Review"])
+
+# Catalog bulk import/export
+app.include_router(catalog_router, prefix="/api/catalogo", tags=["Catalogo"])
+
+# Learning analytics (served from summary tables)
+app.include_router(analytics_router, prefix="/api/analytics", tags=["Analytics"])
+
+# Media routes (self-hosted video files)
+app.include_router(media_router, prefix="/media", tags=["Media"])
+
 # Protected example endpoint
 @app.get("/me")
 async def get_me(user: dict = Depends(require_auth)):
@@ -100,13 +190,49 @@ async def get_me(user: dict = Depends(require_auth)):
         "nombre": user["nombre"]
     }
 
+def get_server_settings():
+    """uvicorn settings for NODE_ENV=production (all overridable via env)"""
+    workers = int(os.getenv("WEB_CONCURRENCY", str(os.cpu_count() or 1)))
+    try:
+        import uvloop  # noqa: F401
+        loop = "uvloop"
+    except ImportError:
+        loop = "asyncio"
+    return {
+        "workers": workers,
+        "loop": loop,
+        "http": "httptools",
+        # Recycle a worker after this many requests to contain memory growth (0 = never)
+        "limit_max_requests": int(os.getenv("MAX_REQUESTS", "10000")) or None,
+        # Seconds to drain in-flight requests after SIGTERM
+        "timeout_graceful_shutdown": int(os.getenv("GRACEFUL_TIMEOUT", "30")),
+        "timeout_keep_alive": int(os.getenv("KEEP_ALIVE", "5")),
+        "proxy_headers": True,
+        "access_log": os.getenv("ACCESS_LOG", "false").lower() == "true"
+    }
+
+
 if __name__ == "__main__":
     import uvicorn
     
     port = int(os.getenv("PORT", "8000"))
-    uvicorn.run(
-        "main:app",
-        host="0.0.0.0",
-        port=port,
-        reload=True 
-    )
+    if os.getenv("NODE_ENV", "dev") == "production":
+        settings = get_server_settings()
+        # Workers read this to size their share of the DB pool
+        os.environ["WEB_CONCURRENCY"] = str(settings["workers"])
+        # Calibrate the bcrypt cost once so every worker hashes at the same cost
+        from services.password_hashing import calibrate_rounds
+        os.environ["BCRYPT_ROUNDS"] = str(calibrate_rounds())
+        uvicorn.run(
+            "main:app",
+            host="0.0.0.0",
+            port=port,
+            **settings
+        )
+    else:
+        uvicorn.run(
+            "main:app",
+            host="0.0.0.0",
+            port=port,
+            reload=True 
+        )
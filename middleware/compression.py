@@ -0,0 +1,108 @@
+import gzip
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always available
+    brotli = None
+
+MINIMUM_SIZE = 1024
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 4
+
+COMPRESSIBLE_TYPES = ("application/json", "text/")
+
+
+def choose_encoding(accept_encoding: str) -> str | None:
+    """Pick the best encoding the client accepts ('br', 'gzip' or None)"""
+    aceptadas = {
+        parte.split(";")[0].strip().lower()
+        for parte in accept_encoding.split(",")
+        if parte.strip() and not parte.strip().endswith(";q=0")
+    }
+    if brotli and "br" in aceptadas:
+        return "br"
+    if "gzip" in aceptadas:
+        return "gzip"
+    return None
+
+
+def compress(body: bytes, encoding: str, nivel: int | None = None) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY if nivel is None else nivel)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL if nivel is None else nivel)
+
+
+class CompressionMiddleware:
+    """
+    gzip/brotli for buffered responses above MINIMUM_SIZE bytes.
+    Streaming responses and responses that already carry a
+    Content-Encoding (precompressed cache hits) pass through untouched.
+    """
+
+    def __init__(self, app, minimum_size: int = MINIMUM_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers") or [])
+        encoding = choose_encoding(headers.get(b"accept-encoding", b"").decode("latin-1"))
+        if not encoding:
+            await self.app(scope, receive, send)
+            return
+
+        inicio = None
+        pasar = False
+
+        async def send_wrapper(message):
+            nonlocal inicio, pasar
+
+            if message["type"] == "http.response.start":
+                inicio = message
+                return
+
+            if pasar:
+                await send(message)
+                return
+
+            if message["type"] != "http.response.body":
+                # Anything but a body (e.g. an extension message) is not ours to compress
+                pasar = True
+                if inicio is not None:
+                    await send(inicio)
+                await send(message)
+                return
+
+            cabeceras = {k.lower(): v for k, v in inicio.get("headers", [])}
+            tipo = cabeceras.get(b"content-type", b"").decode("latin-1")
+            body = message.get("body", b"")
+
+            if (
+                message.get("more_body")
+                or b"content-encoding" in cabeceras
+                or len(body) < self.minimum_size
+                or not tipo.startswith(COMPRESSIBLE_TYPES)
+            ):
+                pasar = True
+                await send(inicio)
+                await send(message)
+                return
+
+            comprimido = compress(body, encoding)
+            nuevas = [
+                (k, v) for k, v in inicio.get("headers", [])
+                if k.lower() not in (b"content-length", b"vary")
+            ]
+            vary = cabeceras.get(b"vary")
+            nuevas += [
+                (b"content-encoding", encoding.encode()),
+                (b"content-length", str(len(comprimido)).encode()),
+                (b"vary", vary + b", Accept-Encoding" if vary else b"Accept-Encoding"),
+            ]
+            await send({**inicio, "headers": nuevas})
+            await send({"type": "http.response.body", "body": comprimido})
+
+        await self.app(scope, receive, send_wrapper)
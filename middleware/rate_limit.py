@@ -0,0 +1,147 @@
+import os
+import time
+import threading
+from fastapi import HTTPException, Request
+
+# Tunables (env): burst capacity and refill rate per minute
+IP_CAPACIDAD = int(os.getenv("AUTH_RATE_LIMIT_IP_BURST", "20"))
+IP_POR_MINUTO = float(os.getenv("AUTH_RATE_LIMIT_IP_PER_MIN", "10"))
+CORREO_CAPACIDAD = int(os.getenv("AUTH_RATE_LIMIT_EMAIL_BURST", "5"))
+CORREO_POR_MINUTO = float(os.getenv("AUTH_RATE_LIMIT_EMAIL_PER_MIN", "5"))
+TRUST_PROXY = os.getenv("RATE_LIMIT_TRUST_PROXY", "false").lower() == "true"
+REDIS_URL = os.getenv("RATE_LIMIT_REDIS_URL")
+
+SHARDS = 32
+MAX_KEYS_POR_SHARD = 10000
+
+
+class TokenBucketLimiter:
+    """
+    In-memory token buckets, sharded by key so concurrent requests for
+    different clients do not contend on a single lock.
+    """
+
+    def __init__(self, capacidad: int, por_minuto: float):
+        self.capacidad = capacidad
+        self.por_seg = por_minuto / 60.0
+        self._shards = [(threading.Lock(), {}) for _ in range(SHARDS)]
+
+    def allow(self, clave: str) -> tuple[bool, int]:
+        """Take one token. Returns (allowed, seconds until a token is available)."""
+        lock, buckets = self._shards[hash(clave) % SHARDS]
+        ahora = time.monotonic()
+        with lock:
+            tokens, ultimo = buckets.get(clave, (self.capacidad, ahora))
+            tokens = min(self.capacidad, tokens + (ahora - ultimo) * self.por_seg)
+
+            if tokens >= 1:
+                buckets[clave] = (tokens - 1, ahora)
+                permitido, espera = True, 0
+            else:
+                buckets[clave] = (tokens, ahora)
+                permitido, espera = False, int((1 - tokens) / self.por_seg) + 1
+
+            if len(buckets) > MAX_KEYS_POR_SHARD:
+                self._prune(buckets, ahora)
+        return permitido, espera
+
+    def _prune(self, buckets: dict, ahora: float) -> None:
+        """Drop buckets that have refilled completely (equivalent to a new key)"""
+        llenos = [
+            clave for clave, (tokens, ultimo) in buckets.items()
+            if tokens + (ahora - ultimo) * self.por_seg >= self.capacidad
+        ]
+        for clave in llenos:
+            del buckets[clave]
+
+
+class RedisTokenBucketLimiter:
+    """Token buckets stored in Redis so limits hold across all workers"""
+
+    SCRIPT = """
+    local capacidad = tonumber(ARGV[1])
+    local por_seg = tonumber(ARGV[2])
+    local ahora = tonumber(ARGV[3])
+    local estado = redis.call('HMGET', KEYS[1], 'tokens', 'ultimo')
+    local tokens = tonumber(estado[1]) or capacidad
+    local ultimo = tonumber(estado[2]) or ahora
+    tokens = math.min(capacidad, tokens + (ahora - ultimo) * por_seg)
+    local permitido = 0
+    if tokens >= 1 then
+        tokens = tokens - 1
+        permitido = 1
+    end
+    redis.call('HSET', KEYS[1], 'tokens', tokens, 'ultimo', ahora)
+    redis.call('EXPIRE', KEYS[1], math.ceil(capacidad / por_seg) + 1)
+    return {permitido, tostring(tokens)}
+    """
+
+    def __init__(self, cliente, capacidad: int, por_minuto: float, prefijo: str):
+        self.capacidad = capacidad
+        self.por_seg = por_minuto / 60.0
+        self.prefijo = prefijo
+        self._script = cliente.register_script(self.SCRIPT)
+
+    def allow(self, clave: str) -> tuple[bool, int]:
+        permitido, tokens = self._script(
+            keys=[f"{self.prefijo}:{clave}"],
+            args=[self.capacidad, self.por_seg, time.time()]
+        )
+        if permitido:
+            return True, 0
+        return False, int((1 - float(tokens)) / self.por_seg) + 1
+
+
+def _build_limiters():
+    if REDIS_URL:
+        try:
+            import redis
+            cliente = redis.Redis.from_url(REDIS_URL)
+            return (
+                RedisTokenBucketLimiter(cliente, IP_CAPACIDAD, IP_POR_MINUTO, "rl:auth:ip"),
+                RedisTokenBucketLimiter(cliente, CORREO_CAPACIDAD, CORREO_POR_MINUTO, "rl:auth:correo"),
+            )
+        except Exception as e:
+            print(f"Warning: Redis rate limiter unavailable, using in-memory limits: {e}")
+
+    return (
+        TokenBucketLimiter(IP_CAPACIDAD, IP_POR_MINUTO),
+        TokenBucketLimiter(CORREO_CAPACIDAD, CORREO_POR_MINUTO),
+    )
+
+
+ip_limiter, correo_limiter = _build_limiters()
+
+
+def client_ip(request: Request) -> str:
+    """Client address; X-Forwarded-For is honored only behind a trusted proxy"""
+    if TRUST_PROXY:
+        reenviado = request.headers.get("x-forwarded-for")
+        if reenviado:
+            return reenviado.split(",")[0].strip()
+    return request.client.host if request.client else "unknown"
+
+
+def require_auth_rate_limit(request: Request, correo: str | None) -> None:
+    """
+    Admission control for the auth endpoints.
+    Raises 429 before any password hashing or DB lookup happens.
+    """
+    limites = [(ip_limiter, client_ip(request))]
+    if correo:
+        limites.append((correo_limiter, correo.strip().lower()))
+
+    for limiter, clave in limites:
+        try:
+            permitido, espera = limiter.allow(clave)
+        except Exception as e:
+            # A broken shared backend must not take the login down with it
+            print(f"Rate limiter error: {e}")
+            continue
+
+        if not permitido:
+            raise HTTPException(
+                status_code=429,
+                detail="Demasiados intentos, intenta de nuevo más tarde",
+                headers={"Retry-After": str(espera)}
+            )
@@ -0,0 +1,15 @@
+from sqlalchemy import Column, Integer, LargeBinary, DateTime
+from datetime import datetime
+from database.db import Base
+
+BYTES_POR_ANIO = 46  # 366 days, one bit each
+
+
+class ActividadBitmap(Base):
+    __tablename__ = "actividad_bitmap"
+    
+    id_usuario = Column(Integer, primary_key=True)
+    anio = Column(Integer, primary_key=True)
+    # Bit (day of year - 1), least significant bit first: active that day
+    dias = Column(LargeBinary(BYTES_POR_ANIO), nullable=False)
+    actualizado_en = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
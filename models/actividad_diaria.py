@@ -0,0 +1,26 @@
+from sqlalchemy import Column, Integer, Date, Index
+from database.db import Base
+
+
+class ActividadDiaria(Base):
+    __tablename__ = "actividad_diaria"
+    __table_args__ = (
+        Index("ix_actividad_diaria_dia", "dia"),
+    )
+    
+    id_usuario = Column(Integer, primary_key=True)
+    dia = Column(Date, primary_key=True)
+    intentos = Column(Integer, default=0)
+    completados = Column(Integer, default=0)
+    misiones = Column(Integer, default=0)
+    monedas = Column(Integer, default=0)
+    
+    def to_dict(self):
+        return {
+            "id_usuario": self.id_usuario,
+            "dia": self.dia.isoformat() if self.dia else None,
+            "intentos": self.intentos or 0,
+            "completados": self.completados or 0,
+            "misiones": self.misiones or 0,
+            "monedas": self.monedas or 0
+        }
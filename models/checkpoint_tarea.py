@@ -0,0 +1,24 @@
+from sqlalchemy import Column, Integer, String, Boolean, Date, DateTime
+from datetime import datetime
+from database.db import Base
+
+
+class CheckpointTarea(Base):
+    __tablename__ = "checkpoints_tareas"
+    
+    nombre = Column(String(100), primary_key=True)
+    fecha = Column(Date)
+    ultimo_id = Column(Integer, default=0)
+    completado = Column(Boolean, default=False)
+    procesados = Column(Integer, default=0)
+    actualizado_en = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def to_dict(self):
+        return {
+            "nombre": self.nombre,
+            "fecha": self.fecha.isoformat() if self.fecha else None,
+            "ultimo_id": self.ultimo_id,
+            "completado": bool(self.completado),
+            "procesados": self.procesados or 0,
+            "actualizado_en": self.actualizado_en.isoformat() if self.actualizado_en else None
+        }
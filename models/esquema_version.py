@@ -0,0 +1,11 @@
+from sqlalchemy import Column, String, DateTime
+from datetime import datetime
+from database.db import Base
+
+
+class EsquemaVersion(Base):
+    __tablename__ = "esquema_version"
+    
+    clave = Column(String(50), primary_key=True)
+    huella = Column(String(64), nullable=False)
+    actualizado_en = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
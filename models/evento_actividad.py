@@ -0,0 +1,32 @@
+from sqlalchemy import Column, Integer, BigInteger, String, Date, DateTime, DECIMAL, Index
+from datetime import datetime
+from database.db import Base
+
+
+class EventoActividad(Base):
+    __tablename__ = "eventos_actividad"
+    # Bucketed by day: per-user range scans and retention deletes both
+    # walk the `dia` index instead of the whole log
+    __table_args__ = (
+        Index("ix_eventos_actividad_usuario_dia", "id_usuario", "dia"),
+        Index("ix_eventos_actividad_dia", "dia"),
+    )
+    
+    id_evento = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True)
+    dia = Column(Date, nullable=False)
+    id_usuario = Column(Integer, nullable=False)
+    tipo = Column(String(20), nullable=False)  # intento | completado | mision | monedas
+    id_referencia = Column(Integer)  # id_leccion o id de la misión
+    valor = Column(DECIMAL(10, 2))  # calificación o monedas
+    creado_en = Column(DateTime, default=datetime.utcnow)
+    
+    def to_dict(self):
+        return {
+            "id_evento": self.id_evento,
+            "dia": self.dia.isoformat() if self.dia else None,
+            "id_usuario": self.id_usuario,
+            "tipo": self.tipo,
+            "id_referencia": self.id_referencia,
+            "valor": float(self.valor) if self.valor is not None else None,
+            "creado_en": self.creado_en.isoformat() if self.creado_en else None
+        }
@@ -0,0 +1,21 @@
+from sqlalchemy import Column, Integer, Date, DateTime
+from datetime import datetime
+from database.db import Base
+
+
+class MisionCobrada(Base):
+    __tablename__ = "misiones_cobradas"
+    
+    # One row per user, mission and challenge day: its reward was paid
+    id_usuario = Column(Integer, primary_key=True)
+    id_mision = Column(Integer, primary_key=True)
+    dia = Column(Date, primary_key=True)
+    creado_en = Column(DateTime, default=datetime.utcnow)
+    
+    def to_dict(self):
+        return {
+            "id_usuario": self.id_usuario,
+            "id_mision": self.id_mision,
+            "dia": self.dia.isoformat() if self.dia else None,
+            "creado_en": self.creado_en.isoformat() if self.creado_en else None
+        }
@@ -0,0 +1,30 @@
+from sqlalchemy import Column, Integer, String, Boolean, DateTime
+from datetime import datetime
+from database.db import Base
+
+
+class PurgaPendiente(Base):
+    __tablename__ = "purgas_pendientes"
+    
+    id_purga = Column(Integer, primary_key=True, autoincrement=True)
+    tipo = Column(String(20), nullable=False)  # "modulo" | "leccion"
+    id_entidad = Column(Integer, nullable=False, index=True)
+    fase = Column(Integer, default=0)
+    ultimo_id = Column(Integer, default=0)
+    procesados = Column(Integer, default=0)
+    completado = Column(Boolean, default=False, index=True)
+    creado_en = Column(DateTime, default=datetime.utcnow)
+    actualizado_en = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def to_dict(self):
+        return {
+            "id_purga": self.id_purga,
+            "tipo": self.tipo,
+            "id_entidad": self.id_entidad,
+            "fase": self.fase or 0,
+            "ultimo_id": self.ultimo_id or 0,
+            "procesados": self.procesados or 0,
+            "completado": bool(self.completado),
+            "creado_en": self.creado_en.isoformat() if self.creado_en else None,
+            "actualizado_en": self.actualizado_en.isoformat() if self.actualizado_en else None
+        }
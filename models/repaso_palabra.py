@@ -0,0 +1,31 @@
+from sqlalchemy import Column, Integer, Float, DateTime, Index
+from datetime import datetime
+from database.db import Base
+
+
+class RepasoPalabra(Base):
+    __tablename__ = "repasos_palabras"
+    # The review queue is a range scan over one user's due dates
+    __table_args__ = (
+        Index("ix_repasos_palabras_usuario_proxima", "id_usuario", "proxima"),
+    )
+    
+    id_usuario = Column(Integer, primary_key=True)
+    id_video = Column(Integer, primary_key=True)
+    # SM-2 state
+    facilidad = Column(Float, nullable=False, default=2.5)
+    intervalo_dias = Column(Integer, nullable=False, default=0)
+    repeticiones = Column(Integer, nullable=False, default=0)
+    proxima = Column(DateTime, nullable=False)
+    ultima_revision = Column(DateTime)
+    
+    def to_dict(self):
+        return {
+            "id_usuario": self.id_usuario,
+            "id_video": self.id_video,
+            "facilidad": round(self.facilidad or 0, 2),
+            "intervalo_dias": self.intervalo_dias or 0,
+            "repeticiones": self.repeticiones or 0,
+            "proxima": self.proxima.isoformat() if self.proxima else None,
+            "ultima_revision": self.ultima_revision.isoformat() if self.ultima_revision else None
+        }
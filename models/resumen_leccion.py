@@ -0,0 +1,37 @@
+from sqlalchemy import Column, Integer, DECIMAL, DateTime
+from datetime import datetime
+from database.db import Base
+
+
+class ResumenLeccion(Base):
+    __tablename__ = "resumen_lecciones"
+    
+    id_leccion = Column(Integer, primary_key=True)
+    usuarios = Column(Integer, default=0)
+    completados = Column(Integer, default=0)
+    intentos_total = Column(Integer, default=0)
+    suma_calificacion = Column(DECIMAL(14, 2), default=0)
+    # Users by number of attempts
+    intentos_1 = Column(Integer, default=0)
+    intentos_2 = Column(Integer, default=0)
+    intentos_3_5 = Column(Integer, default=0)
+    intentos_6_mas = Column(Integer, default=0)
+    actualizado_en = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def to_dict(self):
+        usuarios = self.usuarios or 0
+        return {
+            "id_leccion": self.id_leccion,
+            "usuarios": usuarios,
+            "completados": self.completados or 0,
+            "tasa_completado": round((self.completados or 0) / usuarios, 4) if usuarios else 0.0,
+            "calificacion_promedio": round(float(self.suma_calificacion or 0) / usuarios, 2) if usuarios else 0.0,
+            "intentos_promedio": round((self.intentos_total or 0) / usuarios, 2) if usuarios else 0.0,
+            "distribucion_intentos": {
+                "1": self.intentos_1 or 0,
+                "2": self.intentos_2 or 0,
+                "3-5": self.intentos_3_5 or 0,
+                "6+": self.intentos_6_mas or 0
+            },
+            "actualizado_en": self.actualizado_en.isoformat() if self.actualizado_en else None
+        }
@@ -0,0 +1,18 @@
+from sqlalchemy import Column, Integer, DateTime
+from datetime import datetime
+from database.db import Base
+
+
+class ResumenUsuario(Base):
+    __tablename__ = "resumen_usuarios"
+    
+    id_usuario = Column(Integer, primary_key=True)
+    lecciones_completadas = Column(Integer, nullable=False, default=0)
+    actualizado_en = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def to_dict(self):
+        return {
+            "id_usuario": self.id_usuario,
+            "lecciones_completadas": self.lecciones_completadas or 0,
+            "actualizado_en": self.actualizado_en.isoformat() if self.actualizado_en else None
+        }
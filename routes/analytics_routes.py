@@ -0,0 +1,141 @@
+from fastapi import APIRouter, HTTPException, Depends, Query
+from sqlalchemy.orm import Session
+from typing import Optional
+
+from database.db import get_db
+from models.modulo import Modulo
+from models.leccion import Leccion
+from models.resumen_leccion import ResumenLeccion
+from middleware.auth_middleware import require_auth
+
+router = APIRouter()
+
+
+# ============== HELPERS ==============
+
+def lesson_summaries(db: Session, id_modulo: int | None = None) -> list[dict]:
+    """
+    Lesson summaries with their catalog position, in module/lesson order.
+    Reads only resumen_lecciones (joined to the small catalog tables).
+    """
+    query = db.query(ResumenLeccion, Leccion.titulo, Leccion.orden, Modulo.id_modulo, Modulo.titulo).join(
+        Leccion, ResumenLeccion.id_leccion == Leccion.id_leccion
+    ).join(
+        Modulo, Leccion.id_modulo == Modulo.id_modulo
+    )
+    if id_modulo is not None:
+        query = query.filter(Modulo.id_modulo == id_modulo)
+
+    return [
+        {
+            **resumen.to_dict(),
+            "titulo": titulo,
+            "orden": orden,
+            "id_modulo": modulo_id,
+            "modulo": modulo_titulo
+        }
+        for resumen, titulo, orden, modulo_id, modulo_titulo in query.order_by(
+            Modulo.orden, Modulo.id_modulo, Leccion.orden, Leccion.id_leccion
+        ).all()
+    ]
+
+
+def module_summary(lecciones: list[dict]) -> dict:
+    """
+    Module roll-up of its lesson summaries (in order). `abandono` on each
+    lesson counts learners who completed the previous lesson but never
+    started this one: the module's drop-off points.
+    """
+    usuarios = sum(l["usuarios"] for l in lecciones)
+    completados = sum(l["completados"] for l in lecciones)
+    suma = sum(l["calificacion_promedio"] * l["usuarios"] for l in lecciones)
+
+    embudo = []
+    anteriores = None
+    for l in lecciones:
+        abandono = max(anteriores - l["usuarios"], 0) if anteriores is not None else 0
+        embudo.append({
+            "id_leccion": l["id_leccion"],
+            "titulo": l["titulo"],
+            "usuarios": l["usuarios"],
+            "completados": l["completados"],
+            "abandono": abandono
+        })
+        anteriores = l["completados"]
+
+    return {
+        "lecciones": len(lecciones),
+        "usuarios_inicio": lecciones[0]["usuarios"] if lecciones else 0,
+        "usuarios_final": lecciones[-1]["completados"] if lecciones else 0,
+        "tasa_completado": round(completados / usuarios, 4) if usuarios else 0.0,
+        "calificacion_promedio": round(suma / usuarios, 2) if usuarios else 0.0,
+        "embudo": embudo
+    }
+
+
+# ============== ENDPOINTS ==============
+
+@router.get("/lecciones")
+async def get_lessons_analytics(
+    id_modulo: Optional[int] = Query(None),
+    current_user: dict = Depends(require_auth),
+    db: Session = Depends(get_db)
+):
+    """
+    Completion rate, average grade and attempt distribution per lesson
+    """
+    lecciones = lesson_summaries(db, id_modulo)
+    return {"total": len(lecciones), "lecciones": lecciones}
+
+
+@router.get("/lecciones/{leccion_id}")
+async def get_lesson_analytics(
+    leccion_id: int,
+    current_user: dict = Depends(require_auth),
+    db: Session = Depends(get_db)
+):
+    """
+    Analytics summary for one lesson
+    """
+    resumen = db.query(ResumenLeccion).filter(ResumenLeccion.id_leccion == leccion_id).first()
+    if not resumen:
+        raise HTTPException(status_code=404, detail="Sin datos para esta lección")
+
+    return resumen.to_dict()
+
+
+@router.get("/modulos")
+async def get_modules_analytics(
+    current_user: dict = Depends(require_auth),
+    db: Session = Depends(get_db)
+):
+    """
+    Per-module roll-up with drop-off funnel
+    """
+    por_modulo: dict[int, list[dict]] = {}
+    titulos = {}
+    for l in lesson_summaries(db):
+        por_modulo.setdefault(l["id_modulo"], []).append(l)
+        titulos[l["id_modulo"]] = l["modulo"]
+
+    modulos = [
+        {"id_modulo": id_modulo, "titulo": titulos[id_modulo], **module_summary(lecciones)}
+        for id_modulo, lecciones in por_modulo.items()
+    ]
+    return {"total": len(modulos), "modulos": modulos}
+
+
+@router.get("/modulos/{modulo_id}")
+async def get_module_analytics(
+    modulo_id: int,
+    current_user: dict = Depends(require_auth),
+    db: Session = Depends(get_db)
+):
+    """
+    Roll-up and drop-off funnel for one module
+    """
+    lecciones = lesson_summaries(db, modulo_id)
+    if not lecciones:
+        raise HTTPException(status_code=404, detail="Sin datos para este módulo")
+
+    return {"id_modulo": modulo_id, "titulo": lecciones[0]["modulo"], **module_summary(lecciones)}
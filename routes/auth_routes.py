@@ -1,29 +1,44 @@
 import os
 import re
+import asyncio
 import jwt
 import bcrypt
 from datetime import datetime, timedelta
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Request, BackgroundTasks
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel
 from sqlalchemy.orm import Session
-import firebase_admin
-from firebase_admin import credentials, auth
 
 from database.db import get_db
 from models.user import Usuario
+from middleware.rate_limit import require_auth_rate_limit
+from services.fieldsets import parse_fields
+from services.leaderboard import get_leaderboard
+from services.password_hashing import hash_password, needs_rehash, rehash_password
 
 router = APIRouter()
 
-# Initialize Firebase Admin (using Application Default Credentials or service account)
-if not firebase_admin._apps:
-    try:
-        # Try to use Application Default Credentials
-        firebase_admin.initialize_app(
-            credentials.ApplicationDefault()
-        )
-    except Exception as e:
-        print(f"Warning: Firebase initialization failed: {e}")
-        print("Make sure GOOGLE_APPLICATION_CREDENTIALS is set")
+
+def get_firebase_auth():
+    """
+    Initialize Firebase Admin on first use and return its auth module.
+    Kept out of import time: the SDK import and credential discovery are slow.
+    """
+    import firebase_admin
+    from firebase_admin import credentials, auth
+
+    # Initialize Firebase Admin (using Application Default Credentials or service account)
+    if not firebase_admin._apps:
+        try:
+            # Try to use Application Default Credentials
+            firebase_admin.initialize_app(
+                credentials.ApplicationDefault()
+            )
+        except Exception as e:
+            print(f"Warning: Firebase initialization failed: {e}")
+            print("Make sure GOOGLE_APPLICATION_CREDENTIALS is set")
+
+    return auth
 
 
 class SignupRequest(BaseModel):
@@ -47,10 +62,13 @@ class AuthResponse(BaseModel):
 
 
 @router.post("/signup", response_model=AuthResponse)
-async def signup(request: SignupRequest, db: Session = Depends(get_db)):
+async def signup(request: SignupRequest, http_request: Request, db: Session = Depends(get_db)):
     """
     Sign up endpoint - creates a new user account
     """
+    # 0. Admission control before any hashing or DB work
+    require_auth_rate_limit(http_request, request.correo)
+    
     try:
         # 1. Check if user already exists
         existing_user = db.query(Usuario).filter(Usuario.correo == request.correo).first()
@@ -76,14 +94,13 @@ async def signup(request: SignupRequest, db: Session = Depends(get_db)):
                 status_code=400,
                 detail="El correo no tiene un formato válido"
             )
-        # 3. Hash password
-        salt = bcrypt.gensalt()
-        hashed_password = bcrypt.hashpw(request.contrasena.encode('utf-8'), salt)
+        # 3. Hash password (cost calibrated for this CPU at startup; in a thread, off the event loop)
+        hashed_password = await asyncio.to_thread(hash_password, request.contrasena)
         
         # 4. Create new user
         nuevo_usuario = Usuario(
             correo=request.correo,
-            contrasena_hash=hashed_password.decode('utf-8'),
+            contrasena_hash=hashed_password,
             nombre=request.nombre,
             creado_en=datetime.utcnow()
         )
@@ -91,6 +108,7 @@ async def signup(request: SignupRequest, db: Session = Depends(get_db)):
         db.add(nuevo_usuario)
         db.commit()
         db.refresh(nuevo_usuario)
+        get_leaderboard().update(nuevo_usuario.id_usuario, nuevo_usuario.monedas or 0, nuevo_usuario.nombre)
         
         # 5. Create JWT token
         jwt_secret = os.getenv("JWT_SECRET")
@@ -131,10 +149,18 @@ async def signup(request: SignupRequest, db: Session = Depends(get_db)):
 
 
 @router.post("/login", response_model=AuthResponse)
-async def login(request: LoginRequest, db: Session = Depends(get_db)):
+async def login(
+    request: LoginRequest,
+    http_request: Request,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db)
+):
     """
     Login endpoint - authenticates user with email and password
     """
+    # 0. Admission control before any hashing or DB work
+    require_auth_rate_limit(http_request, request.correo)
+    
     try:
         # 1. Find user by email
         usuario = db.query(Usuario).filter(Usuario.correo == request.correo).first()
@@ -145,13 +171,20 @@ async def login(request: LoginRequest, db: Session = Depends(get_db)):
                 detail="Correo o contraseña incorrectos"
             )
         
-        # 2. Verify password
-        if not bcrypt.checkpw(request.contrasena.encode('utf-8'), usuario.contrasena_hash.encode('utf-8')):
+        # 2. Verify password (bcrypt runs in a thread, off the event loop)
+        if not await asyncio.to_thread(
+            bcrypt.checkpw, request.contrasena.encode('utf-8'), usuario.contrasena_hash.encode('utf-8')
+        ):
             raise HTTPException(
                 status_code=401,
                 detail="Correo o contraseña incorrectos"
             )
         
+        # Hashed at a lower cost than this node's target: upgrade it after
+        # the response is sent
+        if needs_rehash(usuario.contrasena_hash):
+            background_tasks.add_task(rehash_password, usuario.id_usuario, request.contrasena, usuario.contrasena_hash)
+        
         # 3. Create JWT token
         jwt_secret = os.getenv("JWT_SECRET")
         if not jwt_secret:
@@ -203,7 +236,7 @@ async def firebase_login(request: FirebaseLoginRequest, db: Session = Depends(ge
         
         # 1. Verify Firebase ID token
         try:
-            decoded_token = auth.verify_id_token(request.firebaseToken)
+            decoded_token = get_firebase_auth().verify_id_token(request.firebaseToken)
         except Exception as e:
             raise HTTPException(
                 status_code=401,
@@ -225,12 +258,11 @@ async def firebase_login(request: FirebaseLoginRequest, db: Session = Depends(ge
         if not usuario:
             # Create new user with Firebase authentication
             # Generate a random password hash since Firebase handles auth
-            salt = bcrypt.gensalt()
-            temp_password = bcrypt.hashpw(os.urandom(32), salt)
+            temp_password = await asyncio.to_thread(hash_password, os.urandom(32))
             
             usuario = Usuario(
                 correo=email,
-                contrasena_hash=temp_password.decode('utf-8'),
+                contrasena_hash=temp_password,
                 nombre=nombre,
                 creado_en=datetime.utcnow()
             )
@@ -276,18 +308,40 @@ async def firebase_login(request: FirebaseLoginRequest, db: Session = Depends(ge
         )
 
 
+# Selectable fields of /users, in Usuario.to_dict order
+USER_FIELDS = ["id_usuario", "correo", "nombre", "creado_en", "es_admin", "updated_at", "monedas"]
+
+
+def user_field_value(campo: str, valor):
+    """A selected column formatted as Usuario.to_dict formats it"""
+    if campo in ("creado_en", "updated_at"):
+        return valor.isoformat() if valor else None
+    if campo == "es_admin":
+        return bool(valor)
+    if campo == "monedas":
+        return valor or 0
+    return valor
+
+
 @router.get("/users")
-async def get_all_users(db: Session = Depends(get_db)):
+async def get_all_users(fields: str | None = None, db: Session = Depends(get_db)):
     """
     Get all users endpoint - returns list of all users in database
+    `fields=id_usuario,nombre` returns (and selects) only those fields
     """
+    campos = parse_fields(fields, USER_FIELDS)
     try:
-        usuarios = db.query(Usuario).all()
+        # Only the requested columns; no ORM objects are built
+        filas = db.query(*[getattr(Usuario, campo) for campo in campos]).all()
         
-        return {
-            "total": len(usuarios),
-            "usuarios": [usuario.to_dict() for usuario in usuarios]
-        }
+        # Serialized straight to bytes with orjson
+        return ORJSONResponse({
+            "total": len(filas),
+            "usuarios": [
+                {campo: user_field_value(campo, valor) for campo, valor in zip(campos, fila)}
+                for fila in filas
+            ]
+        })
         
     except Exception as e:
         print(f"Get users error: {e}")
@@ -0,0 +1,113 @@
+import json
+from fastapi import APIRouter, HTTPException, Depends, Request, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+
+from database.db import get_db, SessionLocal
+from middleware.auth_middleware import require_auth
+from services.catalog_cache import bump_catalog_version
+from models.purga_pendiente import PurgaPendiente
+from services.purge import purge_progress
+from services.catalog_io import (
+    CatalogImportError, parse_json_catalog, parse_csv_catalog,
+    import_catalog, export_json, export_csv
+)
+
+router = APIRouter()
+
+
+# ============== HELPERS ==============
+
+def _stream_export(formato: str):
+    # The request's session is closed before a streamed body is sent,
+    # so the export reads through its own session
+    db = SessionLocal()
+    try:
+        yield from (export_csv(db) if formato == "csv" else export_json(db))
+    finally:
+        db.close()
+
+
+# ============== ENDPOINTS ==============
+
+@router.post("/import")
+async def import_catalogo(
+    request: Request,
+    current_user: dict = Depends(require_auth),
+    db: Session = Depends(get_db)
+):
+    """
+    Importar un catálogo completo (módulos, lecciones y videos) en una sola transacción.
+    Acepta JSON (árbol anidado o formato de exportación) o CSV (Content-Type: text/csv).
+    """
+    cuerpo = await request.body()
+    try:
+        if request.headers.get("content-type", "").startswith("text/csv"):
+            registros = parse_csv_catalog(cuerpo.decode("utf-8-sig"))
+        else:
+            registros = parse_json_catalog(json.loads(cuerpo))
+    except (UnicodeDecodeError, ValueError, AttributeError):
+        raise HTTPException(status_code=400, detail="Formato de catálogo inválido")
+
+    try:
+        totales = import_catalog(db, registros)
+    except CatalogImportError as e:
+        db.rollback()
+        raise HTTPException(
+            status_code=400,
+            detail="Catálogo inválido: " + "; ".join(e.errores[:50])
+        )
+
+    db.commit()
+    bump_catalog_version()
+
+    return {"mensaje": "Catálogo importado correctamente", **totales}
+
+
+@router.get("/export")
+async def export_catalogo(
+    format: str = Query("json", pattern="^(json|csv)$"),
+    current_user: dict = Depends(require_auth)
+):
+    """
+    Exportar el catálogo completo en streaming, en el mismo formato que acepta /import
+    """
+    tipo = "text/csv" if format == "csv" else "application/json"
+    return StreamingResponse(
+        _stream_export(format),
+        media_type=tipo,
+        headers={"Content-Disposition": f'attachment; filename="catalogo.{format}"'}
+    )
+
+
+@router.get("/purgas")
+async def get_purgas(
+    pendientes: bool = Query(True),
+    current_user: dict = Depends(require_auth),
+    db: Session = Depends(get_db)
+):
+    """
+    Progreso de los borrados en cascada (por defecto solo los pendientes)
+    """
+    query = db.query(PurgaPendiente)
+    if pendientes:
+        query = query.filter(PurgaPendiente.completado == False)
+    purgas = query.order_by(PurgaPendiente.id_purga.desc()).limit(100).all()
+
+    return {"total": len(purgas), "purgas": [purge_progress(p) for p in purgas]}
+
+
+@router.get("/purgas/{id_purga}")
+async def get_purga(
+    id_purga: int,
+    current_user: dict = Depends(require_auth),
+    db: Session = Depends(get_db)
+):
+    """
+    Progreso de un borrado en cascada
+    """
+    purga = db.query(PurgaPendiente).filter(PurgaPendiente.id_purga == id_purga).first()
+    if not purga:
+        raise HTTPException(status_code=404, detail="Purga no encontrada")
+
+    return purge_progress(purga)
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Request
 from pydantic import BaseModel
 from sqlalchemy.orm import Session
 from typing import Optional
@@ -7,7 +7,12 @@ from database.db import get_db
 from models.video import Video
 from models.leccion import Leccion
 from models.modulo import Modulo
+from models.repaso_palabra import RepasoPalabra
 from middleware.auth_middleware import require_auth
+from services.catalog_cache import catalog_response, bump_catalog_version
+from services.catalog_order import ReorderRequest, reorder
+from services.singleflight import normalize_key
+from services.fieldsets import parse_fields, fieldset_responses
 
 router = APIRouter()
 
@@ -65,46 +70,87 @@ class VideoUpdate(BaseModel):
     activo: Optional[bool] = None
 
 
-# ============== ENDPOINTS ==============
+# ============== HELPERS ==============
 
-@router.get("/", response_model=DictionaryResponse)
-async def get_dictionary(
-    search: str | None = None,
-    current_user: dict = Depends(require_auth),
-    db: Session = Depends(get_db)
-):
+# Selectable fields of a dictionary entry, in response order
+DICTIONARY_FIELDS = ["id", "titulo", "url", "duracion_seg", "leccion", "modulo"]
+
+
+def build_dictionary(db: Session, search: str = "", campos: list[str] | None = None) -> dict:
     """
-    Get all words (videos) in the dictionary
-    Optionally filter by search term
+    Dictionary payload as plain dicts (rows -> dicts -> bytes), without
+    building WordInfo models or validating against the response schema.
+    Only the requested `campos` are selected.
     """
-    # Base query joining videos with lessons and modules
-    query = db.query(Video, Leccion, Modulo).join(
-        Leccion, Video.id_leccion == Leccion.id_leccion
-    ).join(
-        Modulo, Leccion.id_modulo == Modulo.id_modulo
-    ).filter(Video.activo == True)
+    campos = campos or DICTIONARY_FIELDS
+    columnas = {
+        "id": Video.id_video,
+        "titulo": Video.titulo,
+        "url": Video.url,
+        "duracion_seg": Video.duracion_seg,
+        "leccion": Leccion.titulo,
+        "modulo": Modulo.titulo
+    }
+
+    # Plain columns: no ORM objects are built for the rows. Lessons and modules
+    # are joined only when a requested field needs them; they also give the
+    # full listing its module/lesson order, so a video-only fieldset is
+    # ordered by video id instead.
+    con_catalogo = "leccion" in campos or "modulo" in campos
+    query = db.query(
+        *[columnas[campo] for campo in campos]
+    ).select_from(Video).filter(Video.activo == True)
+    if con_catalogo:
+        query = query.join(
+            Leccion, Video.id_leccion == Leccion.id_leccion
+        ).join(
+            Modulo, Leccion.id_modulo == Modulo.id_modulo
+        )
 
     # Apply search filter if provided
     if search:
         query = query.filter(Video.titulo.ilike(f"%{search}%"))
 
     # Order by module, lesson, then video order
-    results = query.order_by(Modulo.orden, Leccion.orden, Video.orden).all()
-
-    palabras = []
-    for video, leccion, modulo in results:
-        palabras.append(WordInfo(
-            id=video.id_video,
-            titulo=video.titulo,
-            url=video.url,
-            duracion_seg=video.duracion_seg,
-            leccion=leccion.titulo,
-            modulo=modulo.titulo
-        ))
-
-    return DictionaryResponse(
-        total=len(palabras),
-        palabras=palabras
+    if con_catalogo:
+        results = query.order_by(Modulo.orden, Leccion.orden, Video.orden).all()
+    else:
+        results = query.order_by(Video.id_video).all()
+
+    palabras = [dict(zip(campos, fila)) for fila in results]
+
+    return {
+        "total": len(palabras),
+        "palabras": palabras
+    }
+
+
+def dictionary_cache_key(search: str = "", campos: list[str] | None = None) -> str:
+    parcial = campos and campos != DICTIONARY_FIELDS
+    return normalize_key("dictionary", search=search, fields=",".join(campos) if parcial else None)
+
+
+# ============== ENDPOINTS ==============
+
+@router.get("/", responses=fieldset_responses(DictionaryResponse))
+async def get_dictionary(
+    request: Request,
+    search: str | None = None,
+    fields: str | None = None,
+    current_user: dict = Depends(require_auth)
+):
+    """
+    Get all words (videos) in the dictionary
+    Optionally filter by search term; `fields=id,titulo` returns only those fields
+    """
+    search = (search or "").strip().lower()
+    campos = parse_fields(fields, DICTIONARY_FIELDS)
+
+    # Cached per search term and fieldset; serialized and compressed once per catalog version
+    return await catalog_response(
+        request,
+        dictionary_cache_key(search, campos),
+        lambda sesion: build_dictionary(sesion, search, campos)
     )
 
 
@@ -168,6 +214,7 @@ async def create_video(
     db.add(nuevo_video)
     db.commit()
     db.refresh(nuevo_video)
+    bump_catalog_version()
 
     # Volvemos a hacer el join para regresar el mismo formato de detalle
     result = db.query(Video, Leccion, Modulo).join(
@@ -190,6 +237,22 @@ async def create_video(
     )
 
 
+@router.put("/reorder")
+async def reorder_videos(
+    data: ReorderRequest,
+    current_user: dict = Depends(require_auth),
+    db: Session = Depends(get_db)
+):
+    """
+    Reordenar los videos de una lección con una lista ordenada de ids.
+    """
+    actualizados = reorder(db, Video.id_video, data.ids, padre=Video.id_leccion, nombre="Videos")
+    db.commit()
+    bump_catalog_version()
+
+    return {"mensaje": "Orden actualizado correctamente", "actualizados": actualizados}
+
+
 @router.put("/{word_id}", response_model=WordDetailResponse)
 async def update_video(
     word_id: int,
@@ -225,6 +288,7 @@ async def update_video(
 
     db.commit()
     db.refresh(video)
+    bump_catalog_version()
 
     # Join para regresar detalle completo
     result = db.query(Video, Leccion, Modulo).join(
@@ -261,8 +325,10 @@ async def delete_video(
     if not video:
         raise HTTPException(status_code=404, detail="Video no encontrado")
 
+    db.query(RepasoPalabra).filter(RepasoPalabra.id_video == word_id).delete(synchronize_session=False)
     db.delete(video)
     db.commit()
+    bump_catalog_version()
 
     return {"mensaje": "Video eliminado correctamente"}
 
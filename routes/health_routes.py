@@ -0,0 +1,37 @@
+from fastapi import APIRouter
+from fastapi.responses import ORJSONResponse
+
+from services.health import health_state
+
+router = APIRouter()
+
+
+# ============== ENDPOINTS ==============
+
+@router.get("")
+async def health_check():
+    """
+    Basic health check (kept for existing monitors)
+    """
+    return {
+        "status": "ok",
+        "version": "1.0.0"
+    }
+
+
+@router.get("/live")
+async def liveness():
+    """
+    Liveness: the process is up and serving the event loop
+    """
+    return {"status": "ok"}
+
+
+@router.get("/ready")
+async def readiness():
+    """
+    Readiness: warmed up and the database is reachable.
+    Results are cached for a short TTL so probes add no load.
+    """
+    estado = await health_state.readiness()
+    return ORJSONResponse(estado, status_code=200 if estado["ready"] else 503)
@@ -1,16 +1,17 @@
 from fastapi import APIRouter, HTTPException, Depends
 from pydantic import BaseModel
 from sqlalchemy.orm import Session
-from sqlalchemy import func
-from datetime import datetime, timedelta
 
 from database.db import get_db
 from models.user import Usuario
 from models.desafio_diario import DesafioDiario
 from models.usuario_modulo import UsuarioModulo
-from models.usuario_leccion import UsuarioLeccion
 from models.modulo import Modulo
 from middleware.auth_middleware import require_auth
+from services.daily_reset import is_stale
+from services.activity_bitmap import streak, week_mask
+from services.next_lesson import get_next_lesson
+from services.progress_service import completed_lessons_total
 
 router = APIRouter()
 
@@ -41,32 +42,12 @@ async def get_home_data(
             detail="Usuario no encontrado"
         )
     
-    # Calculate days of the current week where user had activity
-    hoy = datetime.now().date()
-    # Get the Monday of the current week
-    inicio_semana = hoy - timedelta(days=hoy.weekday())
-    fin_semana = inicio_semana + timedelta(days=6)
-    
-    # Get all user lesson completions this week
-    actividad_semana = db.query(UsuarioLeccion).filter(
-        UsuarioLeccion.id_usuario == user_id,
-        UsuarioLeccion.completado == True,
-        UsuarioLeccion.actualizado_en >= datetime.combine(inicio_semana, datetime.min.time()),
-        UsuarioLeccion.actualizado_en <= datetime.combine(fin_semana, datetime.max.time())
-    ).all()
+    # Days of the current week with activity (7-bit mask from the activity bitmap)
+    semana = week_mask(db, user_id)
     
     # Map weekday numbers to Spanish names (Monday=0, Sunday=6)
     dias_map = {0: "Lunes", 1: "Martes", 2: "Miercoles", 3: "Jueves", 4: "Viernes", 5: "Sabado", 6: "Domingo"}
-    dias_dict = {dia: False for dia in dias_map.values()}
-    
-    # Mark days where user had activity
-    dias_activos = set()
-    for actividad in actividad_semana:
-        if actividad.actualizado_en:
-            dia_num = actividad.actualizado_en.weekday()
-            dia_nombre = dias_map[dia_num]
-            dias_dict[dia_nombre] = True
-            dias_activos.add(actividad.actualizado_en.date())
+    dias_dict = {nombre: bool(semana >> num & 1) for num, nombre in dias_map.items()}
     
     # Get desafio for this user (using id_desafio as user reference)
     desafio = db.query(DesafioDiario).filter(
@@ -74,7 +55,7 @@ async def get_home_data(
     ).first()
     
     if desafio:
-        misiones = desafio.lecciones_completadas or 0
+        misiones = 0 if is_stale(desafio) else desafio.lecciones_completadas or 0
     else:
         # Create desafio for user if not exists
         desafio = DesafioDiario(
@@ -88,30 +69,8 @@ async def get_home_data(
         db.commit()
         misiones = 0
     
-    # Calculate racha (streak) - count consecutive days backwards from today
-    racha = 0
-    fecha_check = hoy
-    while True:
-        # Check if user had activity on this day
-        actividad_dia = db.query(UsuarioLeccion).filter(
-            UsuarioLeccion.id_usuario == user_id,
-            UsuarioLeccion.completado == True,
-            func.date(UsuarioLeccion.actualizado_en) == fecha_check
-        ).first()
-        
-        if actividad_dia:
-            racha += 1
-            fecha_check -= timedelta(days=1)
-        else:
-            # If no activity today but checking today, try yesterday
-            if fecha_check == hoy:
-                fecha_check -= timedelta(days=1)
-                continue
-            break
-        
-        # Safety limit to avoid infinite loop
-        if racha > 365:
-            break
+    # Calculate racha (streak) - run of active days in the bitmap ending today
+    racha = streak(db, user_id)
     
     # Calculate overall progress (average of all modules)
     progreso_modulos = db.query(UsuarioModulo).filter(
@@ -144,10 +103,7 @@ async def get_home_data(
     progreso_modulo3 = int(float(modulo3.progreso_pct or 0)) if modulo3 else 0
     
     # Count total lessons completed by user
-    total_lecciones = db.query(UsuarioLeccion).filter(
-        UsuarioLeccion.id_usuario == user_id,
-        UsuarioLeccion.completado == True
-    ).count()
+    total_lecciones = completed_lessons_total(db, user_id)
     
     # Build response
     home_data = {
@@ -162,4 +118,16 @@ async def get_home_data(
         "Total": total_lecciones
     }
 
-    return home_data
\ No newline at end of file
+    return home_data
+
+
+@router.get("/next")
+async def get_next(
+    current_user: dict = Depends(require_auth),
+    db: Session = Depends(get_db)
+):
+    """
+    Continue where you left off: the first incomplete active lesson
+    (module and lesson order) with its videos
+    """
+    return get_next_lesson(db, current_user["userId"])
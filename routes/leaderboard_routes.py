@@ -0,0 +1,66 @@
+from fastapi import APIRouter, HTTPException, Depends, Query
+from pydantic import BaseModel
+from sqlalchemy.orm import Session
+
+from database.db import get_db
+from models.user import Usuario
+from middleware.auth_middleware import require_auth
+from services.leaderboard import get_leaderboard
+
+router = APIRouter()
+
+
+# ============== SCHEMAS ==============
+
+class LeaderboardEntry(BaseModel):
+    posicion: int
+    id_usuario: int
+    nombre: str
+    monedas: int
+
+class LeaderboardResponse(BaseModel):
+    total: int
+    top: list[LeaderboardEntry]
+    mi_posicion: int
+    mis_monedas: int
+
+
+# ============== ENDPOINTS ==============
+
+@router.get("/", response_model=LeaderboardResponse)
+async def get_leaderboard_top(
+    k: int = Query(10, ge=1, le=100),
+    current_user: dict = Depends(require_auth),
+    db: Session = Depends(get_db)
+):
+    """
+    Get the top-k users by coins plus the caller's rank
+    """
+    user_id = current_user["userId"]
+    tablero = get_leaderboard()
+
+    # Users created since the last reconcile are added on first sight
+    if user_id not in tablero:
+        user = db.query(Usuario).filter(Usuario.id_usuario == user_id).first()
+        if not user:
+            raise HTTPException(status_code=404, detail="Usuario no encontrado")
+        tablero.update(user.id_usuario, user.monedas or 0, user.nombre)
+
+    top = tablero.top(k)
+    # Users added without a name get it from one query, kept for next time
+    sin_nombre = [fila["id_usuario"] for fila in top if not fila["nombre"]]
+    if sin_nombre:
+        nombres = dict(db.query(Usuario.id_usuario, Usuario.nombre).filter(
+            Usuario.id_usuario.in_(sin_nombre)
+        ).all())
+        for fila in top:
+            if not fila["nombre"] and nombres.get(fila["id_usuario"]):
+                fila["nombre"] = nombres[fila["id_usuario"]]
+                tablero.set_name(fila["id_usuario"], fila["nombre"])
+
+    return LeaderboardResponse(
+        total=tablero.total(),
+        top=[LeaderboardEntry(**fila) for fila in top],
+        mi_posicion=tablero.rank(user_id) or 0,
+        mis_monedas=tablero.coins(user_id) or 0
+    )
@@ -12,6 +12,16 @@ from models.video import Video
 from models.usuario_leccion import UsuarioLeccion
 from models.modulo import Modulo  # 👈 para validar id_modulo
 from middleware.auth_middleware import require_auth
+from services.catalog_cache import bump_catalog_version
+from services.catalog_order import ReorderRequest, reorder
+from services.purge import schedule_purge, get_pending_purge
+from services.progress_service import on_lesson_completed
+from services.analytics import answer_delta, record_answer
+from services.activity_log import log_event, INTENTO, COMPLETADO
+from services.activity_bitmap import mark_active
+from services.spaced_repetition import enqueue_lesson_words
+from services.next_lesson import next_lesson_cache
+from services.write_behind import get_write_behind, LECCIONES
 
 router = APIRouter()
 
@@ -203,6 +213,7 @@ async def submit_answer(
         UsuarioLeccion.id_leccion == leccion_id
     ).first()
 
+    existente = usuario_leccion is not None
     if not usuario_leccion:
         usuario_leccion = UsuarioLeccion(
             id_usuario=user_id,
@@ -213,16 +224,64 @@ async def submit_answer(
         )
         db.add(usuario_leccion)
 
-    # Increment attempts
-    usuario_leccion.intentos = (usuario_leccion.intentos or 0) + 1
-    usuario_leccion.calificacion = request.calificacion
-    usuario_leccion.actualizado_en = datetime.utcnow()
+    ya_completada = bool(usuario_leccion.completado)
+    intentos_previos = usuario_leccion.intentos or 0
+    calificacion_previa = float(usuario_leccion.calificacion or 0)
+
+    buffer = get_write_behind()
+    if buffer and existente:
+        # The row does not include attempts still sitting in the buffer
+        pendiente = buffer.pending(LECCIONES, (user_id, leccion_id))
+        intentos_previos += pendiente["inc"].get("intentos", 0)
+        buffered_en = pendiente["set"].get("actualizado_en")
+        if buffered_en and (not usuario_leccion.actualizado_en or
+                            datetime.fromisoformat(buffered_en) >= usuario_leccion.actualizado_en):
+            calificacion_previa = float(pendiente["set"]["calificacion"])
 
     # Mark as completed if grade >= 70 (puedes cambiar este umbral)
+    # Completion is sticky so a later lower grade does not undo the rollup
     leccion_completada = request.calificacion >= 100
-    usuario_leccion.completado = leccion_completada
+    recien_completada = leccion_completada and not ya_completada
+
+    # Lesson analytics summary (incremental; periodically re-aggregated)
+    record_answer(db, leccion_id, answer_delta(
+        not existente, intentos_previos, calificacion_previa, request.calificacion, recien_completada
+    ))
+
+    # Append-only history (actualizado_en above only keeps the latest attempt)
+    log_event(db, user_id, INTENTO, leccion_id, request.calificacion)
+    if recien_completada:
+        log_event(db, user_id, COMPLETADO, leccion_id)
+        mark_active(db, user_id)
+
+    if buffer and existente and not recien_completada:
+        # Attempt that does not change completion: coalesce it in the write-behind buffer
+        buffer.add(
+            LECCIONES,
+            (user_id, leccion_id),
+            inc={"intentos": 1},
+            valores={
+                "calificacion": request.calificacion,
+                "actualizado_en": datetime.utcnow().isoformat()
+            }
+        )
+    else:
+        # Increment attempts
+        usuario_leccion.intentos = (usuario_leccion.intentos or 0) + 1
+        usuario_leccion.calificacion = request.calificacion
+        usuario_leccion.actualizado_en = datetime.utcnow()
+        usuario_leccion.completado = ya_completada or leccion_completada
 
-    db.commit()
+        # Roll the completion up into module progress and daily counters
+        if recien_completada:
+            on_lesson_completed(db, user_id, leccion)
+            # The lesson's words enter the review queue
+            enqueue_lesson_words(db, user_id, leccion_id)
+
+        db.commit()
+
+    # The user's resume point is resolved again on their next /api/next
+    next_lesson_cache.discard(user_id)
 
     if leccion_completada:
         mensaje = f"¡Felicidades! Has completado esta lección con {request.calificacion}%"
@@ -262,10 +321,27 @@ async def create_leccion(
     db.add(nueva_leccion)
     db.commit()
     db.refresh(nueva_leccion)
+    bump_catalog_version()
 
     return nueva_leccion
 
 
+@router.put("/reorder")
+async def reorder_lecciones(
+    data: ReorderRequest,
+    current_user: dict = Depends(require_auth),
+    db: Session = Depends(get_db)
+):
+    """
+    Reordenar las lecciones de un módulo con una lista ordenada de ids.
+    """
+    actualizados = reorder(db, Leccion.id_leccion, data.ids, padre=Leccion.id_modulo, nombre="Lecciones")
+    db.commit()
+    bump_catalog_version()
+
+    return {"mensaje": "Orden actualizado correctamente", "actualizados": actualizados}
+
+
 @router.put("/{leccion_id}", response_model=LeccionDB)
 async def update_leccion(
     leccion_id: int,
@@ -278,7 +354,7 @@ async def update_leccion(
     Solo se actualizan los campos que se envíen.
     """
     leccion = db.query(Leccion).filter(Leccion.id_leccion == leccion_id).first()
-    if not leccion:
+    if not leccion or get_pending_purge(db, "leccion", leccion_id):
         raise HTTPException(status_code=404, detail="Leccion no encontrada")
 
     # Si quieren moverla de módulo, validar el módulo nuevo
@@ -297,25 +373,29 @@ async def update_leccion(
 
     db.commit()
     db.refresh(leccion)
+    bump_catalog_version()
 
     return leccion
 
 
-@router.delete("/{leccion_id}")
+@router.delete("/{leccion_id}", status_code=202)
 async def delete_leccion(
     leccion_id: int,
     current_user: dict = Depends(require_auth),
     db: Session = Depends(get_db)
 ):
     """
-    Eliminar lección (borrado físico).
-    Elimina la fila completa de la tabla 'lecciones'.
+    Eliminar lección.
+    Se oculta de inmediato (junto con sus videos) y el borrado físico de
+    videos y progreso corre en segundo plano; el progreso se consulta en
+    /api/catalogo/purgas/{id_purga}.
     """
     leccion = db.query(Leccion).filter(Leccion.id_leccion == leccion_id).first()
     if not leccion:
         raise HTTPException(status_code=404, detail="Leccion no encontrada")
 
-    db.delete(leccion)
+    purga = schedule_purge(db, "leccion", leccion_id)
     db.commit()
+    bump_catalog_version()
 
-    return {"mensaje": "Leccion eliminada correctamente"}
+    return {"mensaje": "Leccion eliminada correctamente", "id_purga": purga.id_purga}
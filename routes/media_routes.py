@@ -0,0 +1,36 @@
+import os
+from fastapi import APIRouter, HTTPException, Depends, Request
+from sqlalchemy.orm import Session
+
+from database.db import get_db
+from models.video import Video
+from middleware.auth_middleware import require_auth
+from services.media import RangeFileResponse, video_media_path
+
+router = APIRouter()
+
+
+# ============== ENDPOINTS ==============
+
+@router.api_route("/videos/{id_video}", methods=["GET", "HEAD"])
+async def get_video_media(
+    id_video: int,
+    request: Request,
+    current_user: dict = Depends(require_auth),
+    db: Session = Depends(get_db)
+):
+    """
+    Stream a self-hosted video with byte-range support (206 Partial Content)
+    """
+    video = db.query(Video).filter(
+        Video.id_video == id_video,
+        Video.activo == True
+    ).first()
+    if not video:
+        raise HTTPException(status_code=404, detail="Video no encontrado")
+
+    path = video_media_path(video)
+    if not path or not os.path.isfile(path):
+        raise HTTPException(status_code=404, detail="Archivo de video no encontrado")
+
+    return RangeFileResponse(path, request.headers, method=request.method)
@@ -4,12 +4,26 @@ from sqlalchemy.orm import Session
 from datetime import datetime
 
 from database.db import get_db
-from models.user import Usuario
 from models.desafio_diario import DesafioDiario
 from middleware.auth_middleware import require_auth
+from services.progress_service import (
+    set_mission_progress, mission_counter, claim_mission_reward, award_coins, NOMBRE_DESAFIO
+)
+from services.activity_log import log_event, MISION, MONEDAS
+from services.daily_reset import is_stale
+from services.leaderboard import get_leaderboard
 
 router = APIRouter()
 
+# mision_id -> (DesafioDiario column, goal, coin reward)
+MISIONES = {
+    1: ("lecciones_completadas", 3, 50),
+    2: ("modulos_completados", 1, 100),
+    3: ("xp_ganado", 100, 25),
+}
+# Counters the server keeps (progress_service.on_lesson_completed); client reports are ignored
+CONTADORES_SERVIDOR = {"lecciones_completadas", "modulos_completados"}
+
 
 # ============== SCHEMAS ==============
 
@@ -34,6 +48,7 @@ class UpdateMissionResponse(BaseModel):
     mensaje: str
     mision_completada: bool
     xp_ganado: int
+    monedas: int | None = None
 
 
 # ============== ENDPOINTS ==============
@@ -58,39 +73,48 @@ async def get_daily_missions(
             id_desafio=user_id,
             lecciones_completadas=0,
             modulos_completados=0,
-            xp_ganado=0
+            xp_ganado=0,
+            nombre_desafio=NOMBRE_DESAFIO
         )
         db.add(desafio)
         db.commit()
         db.refresh(desafio)
     
+    # Counters from a previous day count as zero until the reset reaches this row
+    if is_stale(desafio):
+        lecciones, modulos, xp = 0, 0, 0
+    else:
+        lecciones = desafio.lecciones_completadas or 0
+        modulos = desafio.modulos_completados or 0
+        xp = desafio.xp_ganado or 0
+    
     # Define the 3 daily missions based on your schema
     misiones = [
         MissionInfo(
             id=1,
             nombre="Completa 3 lecciones",
             descripcion="Termina 3 lecciones de cualquier modulo",
-            progreso_actual=min(desafio.lecciones_completadas or 0, 3),
+            progreso_actual=min(lecciones, 3),
             meta=3,
-            completada=(desafio.lecciones_completadas or 0) >= 3,
+            completada=lecciones >= 3,
             xp_recompensa=50
         ),
         MissionInfo(
             id=2,
             nombre="Completa 1 modulo",
             descripcion="Termina todas las lecciones de un modulo",
-            progreso_actual=min(desafio.modulos_completados or 0, 1),
+            progreso_actual=min(modulos, 1),
             meta=1,
-            completada=(desafio.modulos_completados or 0) >= 1,
+            completada=modulos >= 1,
             xp_recompensa=100
         ),
         MissionInfo(
             id=3,
             nombre="Gana 100 XP",
             descripcion="Acumula 100 puntos de experiencia",
-            progreso_actual=min(desafio.xp_ganado or 0, 100),
+            progreso_actual=min(xp, 100),
             meta=100,
-            completada=(desafio.xp_ganado or 0) >= 100,
+            completada=xp >= 100,
             xp_recompensa=25
         )
     ]
@@ -112,57 +136,38 @@ async def update_mission(
     """
     user_id = current_user["userId"]
     
-    # Get or create challenge record
-    desafio = db.query(DesafioDiario).filter(
-        DesafioDiario.id_desafio == user_id
-    ).first()
-    
-    if not desafio:
-        desafio = DesafioDiario(
-            id_desafio=user_id,
-            lecciones_completadas=0,
-            modulos_completados=0,
-            xp_ganado=0
-        )
-        db.add(desafio)
-    
-    xp_ganado = 0
-    mision_completada = False
-    
-    # Update based on mission_id
-    if request.mision_id == 1:
-        # Lecciones completadas
-        desafio.lecciones_completadas = request.progreso
-        if request.progreso >= 3:
-            mision_completada = True
-            xp_ganado = 50
-    elif request.mision_id == 2:
-        # Modulos completados
-        desafio.modulos_completados = request.progreso
-        if request.progreso >= 1:
-            mision_completada = True
-            xp_ganado = 100
-    elif request.mision_id == 3:
-        # XP ganado
-        desafio.xp_ganado = request.progreso
-        if request.progreso >= 100:
-            mision_completada = True
-            xp_ganado = 25
-    else:
+    mision = MISIONES.get(request.mision_id)
+    if not mision:
         raise HTTPException(status_code=400, detail="Mision no valida")
     
-    desafio.actualizado_en = datetime.utcnow()
+    columna, meta, recompensa = mision
     
-    # Add XP reward to user if mission completed
-    if mision_completada and xp_ganado > 0:
-        user = db.query(Usuario).filter(Usuario.id_usuario == user_id).first()
-        if user:
-            user.monedas = (user.monedas or 0) + xp_ganado
+    if columna not in CONTADORES_SERVIDOR:
+        set_mission_progress(db, user_id, columna, request.progreso)
+    mision_completada = mission_counter(db, user_id, columna) >= meta
+    
+    # Reward only the first completion of the day
+    recien_completada = mision_completada and claim_mission_reward(db, user_id, request.mision_id)
+    xp_ganado = 0
+    monedas = None
+    if recien_completada:
+        log_event(db, user_id, MISION, request.mision_id)
+    if recien_completada and recompensa > 0:
+        monedas = award_coins(db, user_id, recompensa)
+        if monedas is not None:
+            xp_ganado = recompensa
+            log_event(db, user_id, MONEDAS, request.mision_id, recompensa)
     
     db.commit()
     
+    if monedas is not None:
+        tablero = get_leaderboard()
+        # A name already on the board may be newer than the token's
+        tablero.update(user_id, monedas, None if user_id in tablero else current_user.get("nombre"))
+    
     return UpdateMissionResponse(
         mensaje="Mision actualizada" if not mision_completada else "¡Mision completada!",
         mision_completada=mision_completada,
-        xp_ganado=xp_ganado
+        xp_ganado=xp_ganado,
+        monedas=monedas
     )
@@ -1,9 +1,10 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Request
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel
 from sqlalchemy.orm import Session
 from typing import Optional
 
-from database.db import get_db
+from database.db import get_db, with_session
 from models.user import Usuario
 from models.usuario_modulo import UsuarioModulo
 from models.modulo import Modulo
@@ -11,6 +12,12 @@ from models.leccion import Leccion
 from models.usuario_leccion import UsuarioLeccion
 from models.video import Video
 from middleware.auth_middleware import require_auth
+from services.catalog_cache import catalog_response, catalog_data, bump_catalog_version
+from services.catalog_order import ReorderRequest, reorder
+from services.purge import schedule_purge, get_pending_purge
+from services.media import file_digest, video_media_path
+from services.singleflight import single_flight_group
+from services.fieldsets import parse_fields, fieldset_responses
 
 router = APIRouter()
 
@@ -69,17 +76,95 @@ class ModuloDB(ModuloBase):
         orm_mode = True
 
 
+# ============== HELPERS ==============
+
+# Selectable fields of the module and lesson lists (fields=), in response order
+MODULE_FIELDS = ["name", "current", "max", "id"]
+LESSON_FIELDS = ["name", "current", "max", "id"]
+
+
+def get_active_modules(db: Session) -> list[tuple[int, str]]:
+    """Active modules as plain (id_modulo, titulo) tuples, safe to share across requests"""
+    return [
+        (id_modulo, titulo)
+        for id_modulo, titulo in db.query(Modulo.id_modulo, Modulo.titulo).filter(
+            Modulo.activo == True
+        ).order_by(Modulo.orden).all()
+    ]
+
+
+def build_module_manifest(db: Session, modulo_id: int) -> dict:
+    """
+    Every active lesson and video of a module in two queries, with the byte
+    size and sha256 of files served from MEDIA_ROOT so clients can prefetch
+    in parallel and skip what they already have (videos without a local file
+    keep their remote URL and report null for both)
+    """
+    modulo = db.query(Modulo.id_modulo, Modulo.titulo).filter(
+        Modulo.id_modulo == modulo_id,
+        Modulo.activo == True
+    ).first()
+    if not modulo:
+        raise HTTPException(status_code=404, detail="Módulo no encontrado")
+
+    lecciones = db.query(Leccion.id_leccion, Leccion.titulo, Leccion.orden).filter(
+        Leccion.id_modulo == modulo_id,
+        Leccion.activo == True
+    ).order_by(Leccion.orden).all()
+
+    videos = db.query(Video).filter(
+        Video.id_leccion.in_([l.id_leccion for l in lecciones]),
+        Video.activo == True
+    ).order_by(Video.id_leccion, Video.orden).all() if lecciones else []
+
+    por_leccion: dict[int, list[dict]] = {}
+    total_bytes = 0
+    for video in videos:
+        path = video_media_path(video)
+        digest = file_digest(path) if path else None
+        if digest:
+            total_bytes += digest[0]
+        por_leccion.setdefault(video.id_leccion, []).append({
+            "id_video": video.id_video,
+            "titulo": video.titulo,
+            "orden": video.orden,
+            "url": f"/media/videos/{video.id_video}" if digest else video.url,
+            "duracion_seg": video.duracion_seg,
+            "bytes": digest[0] if digest else None,
+            "sha256": digest[1] if digest else None
+        })
+
+    return {
+        "modulo_id": modulo.id_modulo,
+        "modulo_nombre": modulo.titulo,
+        "total_videos": len(videos),
+        "total_bytes": total_bytes,
+        "lecciones": [
+            {
+                "id_leccion": l.id_leccion,
+                "titulo": l.titulo,
+                "orden": l.orden,
+                "videos": por_leccion.get(l.id_leccion, [])
+            }
+            for l in lecciones
+        ]
+    }
+
+
 # ============== ENDPOINTS ==============
 
-@router.get("/", response_model=ModulosResponse)
+@router.get("/", responses=fieldset_responses(ModulosResponse))
 async def get_modulos(
+    fields: str | None = None,
     current_user: dict = Depends(require_auth),
     db: Session = Depends(get_db)
 ):
     """
     Get all modules with user's progress
     Returns: list of modules with name, current progress, max value, and id
+    (`fields=id,name` returns only those; without `current` no progress is read)
     """
+    campos = parse_fields(fields, MODULE_FIELDS)
     user_id = current_user["userId"]
 
     # Verify user exists
@@ -90,43 +175,44 @@ async def get_modulos(
             detail="Usuario no encontrado"
         )
 
-    # Get all active modules
-    modulos = db.query(Modulo).filter(
-        Modulo.activo == True
-    ).order_by(Modulo.orden).all()
+    # Get all active modules (identical concurrent requests share one query)
+    modulos = await single_flight_group.do("modulos:activos", with_session, get_active_modules)
 
     # Get user's progress for each module
     modulos_response = []
-    for modulo in modulos:
-        # Get user progress for this module
-        usuario_modulo = db.query(UsuarioModulo).filter(
-            UsuarioModulo.id_usuario == user_id,
-            UsuarioModulo.id_modulo == modulo.id_modulo
-        ).first()
+    for id_modulo, titulo in modulos:
+        current = 0
+        if "current" in campos:
+            # Get user progress for this module
+            usuario_modulo = db.query(UsuarioModulo).filter(
+                UsuarioModulo.id_usuario == user_id,
+                UsuarioModulo.id_modulo == id_modulo
+            ).first()
 
-        # Calculate current progress (progreso_pct is 0-100, we convert to 0-50 scale)
-        current = int(float(usuario_modulo.progreso_pct or 0) / 100) if usuario_modulo else 0
+            # Calculate current progress (progreso_pct is 0-100, we convert to 0-50 scale)
+            current = int(float(usuario_modulo.progreso_pct or 0) / 100) if usuario_modulo else 0
 
-        modulos_response.append(ModuleInfo(
-            name=modulo.titulo,
-            current=current,
-            max=50,
-            id=modulo.id_modulo
-        ))
+        modulo = {"name": titulo, "current": current, "max": 50, "id": id_modulo}
+        modulos_response.append({campo: modulo[campo] for campo in campos})
 
-    return ModulosResponse(modulos=modulos_response)
+    # Plain dicts serialized once by orjson (a partial fieldset would not fit ModuleInfo)
+    return ORJSONResponse({"modulos": modulos_response})
 
 
-@router.get("/{modulo_id}/lecciones", response_model=LeccionesResponse)
+@router.get("/{modulo_id}/lecciones", responses=fieldset_responses(LeccionesResponse))
 async def get_lecciones_by_modulo(
     modulo_id: int,
+    fields: str | None = None,
     current_user: dict = Depends(require_auth),
     db: Session = Depends(get_db)
 ):
     """
     Get all lessons for a specific module with user's progress
     Returns: list of lessons with name, current videos watched, max videos, and id
+    (`fields=id,name` returns only those; video counts and progress are read
+    only for `max`/`current`)
     """
+    campos = parse_fields(fields, LESSON_FIELDS)
     user_id = current_user["userId"]
 
     # Verify user exists
@@ -145,52 +231,118 @@ async def get_lecciones_by_modulo(
             detail="Módulo no encontrado"
         )
 
-    # Get all active lessons for this module
-    lecciones = db.query(Leccion).filter(
+    # Get all active lessons for this module (only the columns the fieldset needs)
+    lecciones = db.query(Leccion.id_leccion, Leccion.titulo).filter(
         Leccion.id_modulo == modulo_id,
         Leccion.activo == True
     ).order_by(Leccion.orden).all()
 
+    # current is derived from max, so either one needs the video counts
+    con_progreso = "current" in campos
+    con_videos = con_progreso or "max" in campos
+
     # Build response with progress for each lesson
     lecciones_response = []
     for leccion in lecciones:
-        # Count total videos in this lesson (max)
-        total_videos = db.query(Video).filter(
-            Video.id_leccion == leccion.id_leccion,
-            Video.activo == True
-        ).count()
-
-        # Get user's progress for this lesson
-        usuario_leccion = db.query(UsuarioLeccion).filter(
-            UsuarioLeccion.id_usuario == user_id,
-            UsuarioLeccion.id_leccion == leccion.id_leccion
-        ).first()
-
-        # Calculate current progress based on calificacion or intentos
-        # If completed, current = max; otherwise calculate from calificacion percentage
-        if usuario_leccion:
-            if usuario_leccion.completado:
-                current = total_videos
-            else:
-                # Use calificacion as percentage of completion
-                current = int(float(usuario_leccion.calificacion or 0) / 100 * total_videos)
-        else:
-            current = 0
-
-        lecciones_response.append(LessonInfo(
-            name=leccion.titulo,
-            current=current,
-            max=total_videos,
-            id=leccion.id_leccion
-        ))
-
-    return LeccionesResponse(
-        modulo_id=modulo_id,
-        modulo_nombre=modulo.titulo,
-        lecciones=lecciones_response
+        total_videos = current = 0
+        if con_videos:
+            # Count total videos in this lesson (max)
+            total_videos = db.query(Video).filter(
+                Video.id_leccion == leccion.id_leccion,
+                Video.activo == True
+            ).count()
+
+        if con_progreso:
+            # Get user's progress for this lesson
+            usuario_leccion = db.query(UsuarioLeccion).filter(
+                UsuarioLeccion.id_usuario == user_id,
+                UsuarioLeccion.id_leccion == leccion.id_leccion
+            ).first()
+
+            # Calculate current progress based on calificacion or intentos
+            # If completed, current = max; otherwise calculate from calificacion percentage
+            if usuario_leccion:
+                if usuario_leccion.completado:
+                    current = total_videos
+                else:
+                    # Use calificacion as percentage of completion
+                    current = int(float(usuario_leccion.calificacion or 0) / 100 * total_videos)
+
+        fila = {"name": leccion.titulo, "current": current, "max": total_videos, "id": leccion.id_leccion}
+        lecciones_response.append({campo: fila[campo] for campo in campos})
+
+    # Fast path: plain dicts serialized once by orjson (no double validation)
+    return ORJSONResponse({
+        "modulo_id": modulo_id,
+        "modulo_nombre": modulo.titulo,
+        "lecciones": lecciones_response
+    })
+
+
+@router.get("/{modulo_id}/manifest")
+async def get_module_manifest(
+    modulo_id: int,
+    request: Request,
+    current_user: dict = Depends(require_auth)
+):
+    """
+    Prefetch manifest for a module: lessons and videos with URLs, durations,
+    byte sizes and content hashes. Built once per catalog version.
+    """
+    return await catalog_response(
+        request,
+        f"manifest:{modulo_id}",
+        lambda sesion: build_module_manifest(sesion, modulo_id)
     )
 
 
+@router.get("/{modulo_id}/bundle")
+async def get_module_bundle(
+    modulo_id: int,
+    current_user: dict = Depends(require_auth),
+    db: Session = Depends(get_db)
+):
+    """
+    Everything needed to open a module in one response: the module, its
+    active lessons with their ordered videos, and the user's progress per
+    lesson. The catalog part is the cached manifest; progress is one query.
+    """
+    user_id = current_user["userId"]
+
+    manifest = await catalog_data(f"manifest:{modulo_id}", lambda sesion: build_module_manifest(sesion, modulo_id))
+    ids = [l["id_leccion"] for l in manifest["lecciones"]]
+
+    progreso = {
+        fila.id_leccion: fila
+        for fila in db.query(
+            UsuarioLeccion.id_leccion,
+            UsuarioLeccion.completado,
+            UsuarioLeccion.intentos,
+            UsuarioLeccion.calificacion
+        ).filter(
+            UsuarioLeccion.id_usuario == user_id,
+            UsuarioLeccion.id_leccion.in_(ids)
+        ).all()
+    } if ids else {}
+
+    lecciones = []
+    for leccion in manifest["lecciones"]:
+        fila = progreso.get(leccion["id_leccion"])
+        # New dicts: the manifest is shared by every request
+        lecciones.append({
+            **leccion,
+            "completado": bool(fila.completado) if fila else False,
+            "intentos": (fila.intentos or 0) if fila else 0,
+            "calificacion": float(fila.calificacion) if fila and fila.calificacion is not None else None
+        })
+
+    return ORJSONResponse({
+        **manifest,
+        "lecciones_completadas": sum(1 for l in lecciones if l["completado"]),
+        "lecciones": lecciones
+    })
+
+
 # ---------- NUEVOS ENDPOINTS CRUD PARA MÓDULOS ----------
 
 @router.post("/", response_model=ModuloDB)
@@ -211,10 +363,27 @@ async def create_modulo(
     db.add(nuevo_modulo)
     db.commit()
     db.refresh(nuevo_modulo)
+    bump_catalog_version()
 
     return nuevo_modulo
 
 
+@router.put("/reorder")
+async def reorder_modulos(
+    data: ReorderRequest,
+    current_user: dict = Depends(require_auth),
+    db: Session = Depends(get_db)
+):
+    """
+    Reordenar módulos con una lista ordenada de ids.
+    """
+    actualizados = reorder(db, Modulo.id_modulo, data.ids, nombre="Módulos")
+    db.commit()
+    bump_catalog_version()
+
+    return {"mensaje": "Orden actualizado correctamente", "actualizados": actualizados}
+
+
 @router.put("/{modulo_id}", response_model=ModuloDB)
 async def update_modulo(
     modulo_id: int,
@@ -227,7 +396,7 @@ async def update_modulo(
     Solo se actualizan los campos que se envíen.
     """
     modulo = db.query(Modulo).filter(Modulo.id_modulo == modulo_id).first()
-    if not modulo:
+    if not modulo or get_pending_purge(db, "modulo", modulo_id):
         raise HTTPException(status_code=404, detail="Módulo no encontrado")
 
     if data.titulo is not None:
@@ -239,26 +408,30 @@ async def update_modulo(
 
     db.commit()
     db.refresh(modulo)
+    bump_catalog_version()
 
     return modulo
 
 
-@router.delete("/{modulo_id}")
+@router.delete("/{modulo_id}", status_code=202)
 async def delete_modulo(
     modulo_id: int,
     current_user: dict = Depends(require_auth),
     db: Session = Depends(get_db)
 ):
     """
-    Eliminar módulo (borrado físico).
-    Elimina la fila completa de la tabla 'modulos'.
+    Eliminar módulo.
+    Se oculta de inmediato (junto con sus lecciones y videos) y el borrado
+    físico en cascada corre en segundo plano; el progreso se consulta en
+    /api/catalogo/purgas/{id_purga}.
     """
     modulo = db.query(Modulo).filter(Modulo.id_modulo == modulo_id).first()
     if not modulo:
         raise HTTPException(status_code=404, detail="Módulo no encontrado")
 
-    db.delete(modulo)
+    purga = schedule_purge(db, "modulo", modulo_id)
     db.commit()
+    bump_catalog_version()
 
-    return {"mensaje": "Módulo eliminado correctamente"}
+    return {"mensaje": "Módulo eliminado correctamente", "id_purga": purga.id_purga}
 
@@ -6,6 +6,7 @@ from datetime import datetime
 from database.db import get_db
 from models.user import Usuario
 from middleware.auth_middleware import require_auth
+from services.leaderboard import get_leaderboard
 
 router = APIRouter()
 
@@ -73,6 +74,8 @@ async def update_profile(
     db.commit()
     db.refresh(user)
     
+    get_leaderboard().update(user.id_usuario, user.monedas or 0, user.nombre)
+    
     return ProfileResponse(
         id_usuario=user.id_usuario,
         nombre=user.nombre,
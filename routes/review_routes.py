@@ -0,0 +1,83 @@
+from fastapi import APIRouter, HTTPException, Depends, Query
+from pydantic import BaseModel, Field
+from sqlalchemy.orm import Session
+
+from database.db import get_db
+from middleware.auth_middleware import require_auth
+from services.spaced_repetition import pop_due, apply_answers
+
+router = APIRouter()
+
+
+# ============== SCHEMAS ==============
+
+class ReviewAnswer(BaseModel):
+    id_video: int
+    calidad: int = Field(ge=0, le=5)  # 0 = no la recordó ... 5 = respuesta perfecta
+
+
+class ReviewAnswersRequest(BaseModel):
+    respuestas: list[ReviewAnswer]
+
+
+# ============== ENDPOINTS ==============
+
+@router.get("/next")
+async def get_next_reviews(
+    n: int = Query(10, ge=1, le=50),
+    current_user: dict = Depends(require_auth),
+    db: Session = Depends(get_db)
+):
+    """
+    Next words due for review (oldest first).
+    Returned words are reserved for a few minutes while they are answered.
+    """
+    user_id = current_user["userId"]
+
+    filas = pop_due(db, user_id, n)
+    db.commit()
+
+    return {
+        "total": len(filas),
+        "palabras": [
+            {
+                "id_video": video.id_video,
+                "titulo": video.titulo,
+                "url": video.url,
+                "duracion_seg": video.duracion_seg,
+                "repeticiones": repaso.repeticiones or 0,
+                "intervalo_dias": repaso.intervalo_dias or 0
+            }
+            for repaso, video in filas
+        ]
+    }
+
+
+@router.post("/answers")
+async def submit_review_answers(
+    request: ReviewAnswersRequest,
+    current_user: dict = Depends(require_auth),
+    db: Session = Depends(get_db)
+):
+    """
+    Grade reviewed words (calidad 0-5) and schedule their next review
+    """
+    if not request.respuestas:
+        raise HTTPException(status_code=400, detail="La lista de respuestas no puede estar vacía")
+
+    # A word answered twice in one batch keeps its last grade
+    calidades = {r.id_video: r.calidad for r in request.respuestas}
+    cambios = apply_answers(db, current_user["userId"], calidades)
+    db.commit()
+
+    return {
+        "actualizados": len(cambios),
+        "repasos": [
+            {
+                "id_video": c["id_video"],
+                "intervalo_dias": c["intervalo_dias"],
+                "proxima": c["proxima"].isoformat()
+            }
+            for c in cambios
+        ]
+    }
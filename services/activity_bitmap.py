@@ -0,0 +1,194 @@
+import os
+import time
+import threading
+from collections import OrderedDict
+from datetime import datetime, date, timedelta
+from sqlalchemy import select, insert, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from database.db import with_session
+from models.actividad_bitmap import ActividadBitmap, BYTES_POR_ANIO
+from models.actividad_diaria import ActividadDiaria
+from models.evento_actividad import EventoActividad
+from services.activity_log import COMPLETADO
+
+CACHE_SIZE = int(os.getenv("ACTIVITY_BITMAP_CACHE_SIZE", "10000"))
+# Completions made through other workers show up after at most this long
+CACHE_TTL_SEG = float(os.getenv("ACTIVITY_BITMAP_CACHE_TTL", "60"))
+
+
+# Days are UTC days (see daily_reset.inicio_dia), like the activity log and the
+# daily challenges. The home screen used the server's local date before the
+# log existed, so for a server off UTC the day boundary moved to UTC midnight.
+def day_index(dia: date) -> int:
+    return dia.timetuple().tm_yday - 1
+
+
+class BitmapCache:
+    """LRU of (id_usuario, anio) -> bitmap as an int, with a TTL"""
+
+    def __init__(self, capacidad: int):
+        self.capacidad = capacidad
+        self._lock = threading.Lock()
+        self._entradas: OrderedDict[tuple, tuple[int, float]] = OrderedDict()
+
+    def get(self, clave: tuple) -> int | None:
+        with self._lock:
+            entrada = self._entradas.get(clave)
+            if not entrada or time.monotonic() - entrada[1] > CACHE_TTL_SEG:
+                return None
+            self._entradas.move_to_end(clave)
+            return entrada[0]
+
+    def put(self, clave: tuple, bits: int) -> None:
+        with self._lock:
+            self._entradas[clave] = (bits, time.monotonic())
+            self._entradas.move_to_end(clave)
+            while len(self._entradas) > self.capacidad:
+                self._entradas.popitem(last=False)
+
+    def discard(self, clave: tuple) -> None:
+        with self._lock:
+            self._entradas.pop(clave, None)
+
+
+bitmap_cache = BitmapCache(CACHE_SIZE)
+
+
+def _from_history(db: Session, user_id: int, anio: int) -> int:
+    """Initial bitmap for a year from the activity rollups and raw log (one-time, per user and year)"""
+    inicio, fin = date(anio, 1, 1), date(anio, 12, 31)
+    dias = set(db.execute(
+        select(ActividadDiaria.dia).where(
+            ActividadDiaria.id_usuario == user_id,
+            ActividadDiaria.dia >= inicio,
+            ActividadDiaria.dia <= fin,
+            ActividadDiaria.completados > 0
+        )
+    ).scalars())
+    dias.update(db.execute(
+        select(EventoActividad.dia).distinct().where(
+            EventoActividad.id_usuario == user_id,
+            EventoActividad.dia >= max(inicio, datetime.utcnow().date() - timedelta(days=1)),
+            EventoActividad.dia <= fin,
+            EventoActividad.tipo == COMPLETADO
+        )
+    ).scalars())
+
+    bits = 0
+    for dia in dias:
+        bits |= 1 << day_index(dia)
+    return bits
+
+
+def _build_row(db: Session, user_id: int, anio: int, consulta) -> int:
+    """Insert the year's row from history; a concurrent build wins and is re-read"""
+    bits = _from_history(db, user_id, anio)
+    try:
+        with db.begin_nested():
+            db.execute(insert(ActividadBitmap).values(
+                id_usuario=user_id,
+                anio=anio,
+                dias=bits.to_bytes(BYTES_POR_ANIO, "little"),
+                actualizado_en=datetime.utcnow()
+            ))
+    except IntegrityError:
+        # Built concurrently by another request
+        return int.from_bytes(db.execute(consulta).scalar(), "little")
+    return bits
+
+
+def _build_row_committed(db: Session, user_id: int, anio: int, consulta) -> int:
+    bits = _build_row(db, user_id, anio, consulta)
+    db.commit()
+    return bits
+
+
+def _load(db: Session, user_id: int, anio: int, for_update: bool = False) -> int:
+    """
+    The year's bitmap, its row built from history on a miss. Writers build it
+    in the caller's transaction; reads build it on a Session of their own and
+    commit, so a read-only route does not roll it back.
+    """
+    consulta = select(ActividadBitmap.dias).where(
+        ActividadBitmap.id_usuario == user_id,
+        ActividadBitmap.anio == anio
+    )
+    if for_update:
+        consulta = consulta.with_for_update()
+
+    dias = db.execute(consulta).scalar()
+    if dias is not None:
+        return int.from_bytes(dias, "little")
+
+    if for_update:
+        return _build_row(db, user_id, anio, consulta)
+    return with_session(_build_row_committed, user_id, anio, consulta)
+
+
+def get_year_bits(db: Session, user_id: int, anio: int) -> int:
+    """The user's activity bitmap for a year (cached)"""
+    bits = bitmap_cache.get((user_id, anio))
+    if bits is None:
+        bits = _load(db, user_id, anio)
+        bitmap_cache.put((user_id, anio), bits)
+    return bits
+
+
+def mark_active(db: Session, user_id: int, dia: date | None = None) -> None:
+    """Set the day's bit. Runs in the caller's transaction; the caller commits."""
+    dia = dia or datetime.utcnow().date()
+    bits = _load(db, user_id, dia.year, for_update=True)
+    nuevos = bits | (1 << day_index(dia))
+    if nuevos != bits:
+        db.execute(
+            update(ActividadBitmap)
+            .where(ActividadBitmap.id_usuario == user_id, ActividadBitmap.anio == dia.year)
+            .values(dias=nuevos.to_bytes(BYTES_POR_ANIO, "little"), actualizado_en=datetime.utcnow())
+            .execution_options(synchronize_session=False)
+        )
+    # Re-read on next access (after this transaction commits)
+    bitmap_cache.discard((user_id, dia.year))
+
+
+def streak(db: Session, user_id: int, hoy: date | None = None) -> int:
+    """
+    Consecutive active days ending today (or yesterday, if today has no
+    activity yet): a run-of-ones scan down from that day's bit, continuing
+    into the previous year's bitmap when the run reaches January 1st.
+    """
+    hoy = hoy or datetime.utcnow().date()
+    fin = hoy
+    if not (get_year_bits(db, user_id, hoy.year) >> day_index(hoy)) & 1:
+        fin = hoy - timedelta(days=1)
+
+    anio, dia = fin.year, day_index(fin)
+    bits = get_year_bits(db, user_id, anio)
+    racha = 0
+    for _ in range(2):  # capped at about a year, as before
+        ceros = ~bits & ((1 << (dia + 1)) - 1)
+        if ceros:
+            # The highest inactive day at or below `dia` ends the run
+            return racha + dia - (ceros.bit_length() - 1)
+        racha += dia + 1
+        anio -= 1
+        bits = get_year_bits(db, user_id, anio)
+        dia = day_index(date(anio, 12, 31))
+    return racha
+
+
+def week_mask(db: Session, user_id: int, hoy: date | None = None) -> int:
+    """7-bit mask of active days this week, bit 0 = Monday"""
+    hoy = hoy or datetime.utcnow().date()
+    lunes = hoy - timedelta(days=hoy.weekday())
+    domingo = lunes + timedelta(days=6)
+    if lunes.year == domingo.year:
+        return (get_year_bits(db, user_id, lunes.year) >> day_index(lunes)) & 0x7F
+
+    # Week straddling New Year: take each day from its own year's bitmap
+    mascara = 0
+    for i in range(7):
+        dia = lunes + timedelta(days=i)
+        mascara |= ((get_year_bits(db, user_id, dia.year) >> day_index(dia)) & 1) << i
+    return mascara
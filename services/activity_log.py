@@ -0,0 +1,289 @@
+import os
+import uuid
+import asyncio
+from datetime import datetime, date, timedelta
+from sqlalchemy import insert, delete, select, func, case
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from database.db import SessionLocal
+from models.evento_actividad import EventoActividad
+from models.actividad_diaria import ActividadDiaria
+from models.usuario_leccion import UsuarioLeccion
+from models.checkpoint_tarea import CheckpointTarea
+from services.daily_reset import inicio_dia
+from services.write_behind import get_write_behind, EVENTOS
+
+NOMBRE_TAREA = "compactar_actividad"
+
+# Tunables (env)
+# Raw events are kept at least one day so only compacted days ever expire
+RETENTION_DAYS = max(int(os.getenv("ACTIVITY_RETENTION_DAYS", "90")), 1)
+BATCH_SIZE = int(os.getenv("ACTIVITY_PURGE_BATCH_SIZE", "1000"))
+BATCH_PAUSE_SEG = float(os.getenv("ACTIVITY_PURGE_BATCH_PAUSE", "0.2"))
+
+INTENTO = "intento"
+COMPLETADO = "completado"
+MISION = "mision"
+MONEDAS = "monedas"
+
+
+# ============== WRITE PATH ==============
+
+def log_event(db: Session, user_id: int, tipo: str, id_referencia: int | None = None, valor: float | None = None) -> None:
+    """
+    Append one activity event. Goes through the write-behind buffer when
+    enabled (batched into one executemany per flush); otherwise it is a
+    single INSERT in the caller's transaction.
+    """
+    ahora = datetime.utcnow()
+    evento = {
+        "dia": ahora.date().isoformat(),
+        "id_usuario": user_id,
+        "tipo": tipo,
+        "id_referencia": id_referencia,
+        "valor": valor,
+        "creado_en": ahora.isoformat(),
+    }
+
+    buffer = get_write_behind()
+    if buffer:
+        # Unique key: events are appended, never coalesced
+        buffer.add(EVENTOS, (uuid.uuid4().hex,), valores=evento)
+    else:
+        db.execute(insert(EventoActividad).values(**event_row(evento)))
+
+
+def event_row(evento: dict) -> dict:
+    """Column values for an event as journaled (ISO strings back to dates)"""
+    return {
+        **evento,
+        "dia": date.fromisoformat(evento["dia"]),
+        "creado_en": datetime.fromisoformat(evento["creado_en"]),
+    }
+
+
+# ============== READ PATH ==============
+
+def active_days(db: Session, user_id: int, desde: date, hasta: date) -> set[date]:
+    """
+    Days in [desde, hasta] with at least one completed lesson. Compacted
+    days come from the rollups; yesterday and today also from the raw log,
+    since they may not be compacted yet. Both are bounded range scans.
+    """
+    dias = set(db.execute(
+        select(ActividadDiaria.dia).where(
+            ActividadDiaria.id_usuario == user_id,
+            ActividadDiaria.dia >= desde,
+            ActividadDiaria.dia <= hasta,
+            ActividadDiaria.completados > 0
+        )
+    ).scalars())
+
+    recientes = max(desde, datetime.utcnow().date() - timedelta(days=1))
+    if recientes <= hasta:
+        dias.update(db.execute(
+            select(EventoActividad.dia).distinct().where(
+                EventoActividad.id_usuario == user_id,
+                EventoActividad.dia >= recientes,
+                EventoActividad.dia <= hasta,
+                EventoActividad.tipo == COMPLETADO
+            )
+        ).scalars())
+    return dias
+
+
+def current_streak(db: Session, user_id: int, maximo: int = 366) -> int:
+    """Consecutive active days ending today (or yesterday, if today has no activity yet)"""
+    hoy = datetime.utcnow().date()
+    dias = active_days(db, user_id, hoy - timedelta(days=maximo), hoy)
+
+    fecha = hoy if hoy in dias else hoy - timedelta(days=1)
+    racha = 0
+    while fecha in dias and racha < maximo:
+        racha += 1
+        fecha -= timedelta(days=1)
+    return racha
+
+
+# ============== COMPACTION & RETENTION ==============
+
+def compact_day(db: Session, dia: date) -> int:
+    """
+    Roll one day's events up into actividad_diaria (replacing that day's
+    rollups, so re-running a day is safe). Returns rollup rows written.
+    The caller commits.
+    """
+    def contar(tipo):
+        return func.sum(case((EventoActividad.tipo == tipo, 1), else_=0))
+
+    filas = db.execute(
+        select(
+            EventoActividad.id_usuario,
+            contar(INTENTO),
+            contar(COMPLETADO),
+            contar(MISION),
+            func.sum(case((EventoActividad.tipo == MONEDAS, EventoActividad.valor), else_=0)),
+        )
+        .where(EventoActividad.dia == dia)
+        .group_by(EventoActividad.id_usuario)
+    ).all()
+
+    db.execute(delete(ActividadDiaria).where(ActividadDiaria.dia == dia))
+    if filas:
+        db.execute(insert(ActividadDiaria), [
+            {
+                "id_usuario": id_usuario,
+                "dia": dia,
+                "intentos": intentos or 0,
+                "completados": completados or 0,
+                "misiones": misiones or 0,
+                "monedas": int(monedas or 0),
+            }
+            for id_usuario, intentos, completados, misiones, monedas in filas
+        ])
+    return len(filas)
+
+
+def seed_rollups_from_progress(db: Session) -> int:
+    """
+    First run only: derive past active days from the last-touched timestamp
+    of completed lessons (all the history that existed before the log).
+    """
+    dia = func.date(UsuarioLeccion.actualizado_en)
+    filas = db.execute(
+        select(UsuarioLeccion.id_usuario, dia, func.count())
+        .where(UsuarioLeccion.completado == True, UsuarioLeccion.actualizado_en < inicio_dia())
+        .group_by(UsuarioLeccion.id_usuario, dia)
+    ).all()
+    if filas:
+        db.execute(insert(ActividadDiaria), [
+            {
+                "id_usuario": id_usuario,
+                "dia": d if isinstance(d, date) else date.fromisoformat(str(d)),
+                "intentos": 0,
+                "completados": completados,
+                "misiones": 0,
+                "monedas": 0,
+            }
+            for id_usuario, d, completados in filas
+        ])
+    return len(filas)
+
+
+def ensure_rollups_seeded() -> bool:
+    """
+    Seed the rollups from lesson history once, at startup, before anything
+    reads them: activity bitmaps are built from the rollups and then stored
+    for good, so one built from an unseeded table would lose the user's past
+    streak. The job's checkpoint row is inserted first as a claim, so workers
+    starting together seed once. Returns True if this call seeded.
+    """
+    db = SessionLocal()
+    try:
+        if db.query(CheckpointTarea.nombre).filter(CheckpointTarea.nombre == NOMBRE_TAREA).first():
+            return False
+
+        # Seeded days must not be overwritten by an empty compaction
+        primero = db.execute(select(func.min(EventoActividad.dia))).scalar()
+        try:
+            with db.begin_nested():
+                db.add(CheckpointTarea(
+                    nombre=NOMBRE_TAREA, ultimo_id=0, completado=True, procesados=0,
+                    fecha=primero or inicio_dia().date()
+                ))
+        except IntegrityError:
+            # Claimed by another worker
+            db.rollback()
+            return False
+
+        seed_rollups_from_progress(db)
+        db.commit()
+        return True
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def run_compaction() -> int:
+    """
+    Compact every closed day since the last run. The last compacted day is
+    redone as well, picking up events flushed late across midnight.
+    Returns days compacted.
+    """
+    ensure_rollups_seeded()
+    db = SessionLocal()
+    try:
+        checkpoint = db.query(CheckpointTarea).filter(
+            CheckpointTarea.nombre == NOMBRE_TAREA
+        ).with_for_update().first()
+        ayer = inicio_dia().date() - timedelta(days=1)
+        dia = checkpoint.fecha or ayer
+
+        compactados = 0
+        while dia <= ayer:
+            checkpoint.procesados = compact_day(db, dia)
+            checkpoint.fecha = dia
+            db.commit()
+            compactados += 1
+            dia += timedelta(days=1)
+        db.commit()
+        return compactados
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def purge_expired_batch(limite: date) -> int:
+    """Delete one keyset batch of raw events older than `limite`. Returns rows deleted."""
+    db = SessionLocal()
+    try:
+        ids = db.execute(
+            select(EventoActividad.id_evento)
+            .where(EventoActividad.dia < limite)
+            .order_by(EventoActividad.id_evento)
+            .limit(BATCH_SIZE)
+        ).scalars().all()
+        if not ids:
+            return 0
+        borrados = db.execute(
+            delete(EventoActividad)
+            .where(
+                EventoActividad.dia < limite,
+                EventoActividad.id_evento >= ids[0],
+                EventoActividad.id_evento <= ids[-1]
+            )
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        db.commit()
+        return borrados
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+async def activity_maintenance_loop() -> None:
+    """Scheduler: after every UTC midnight, compact the closed days and drop expired raw events"""
+    while True:
+        try:
+            dias = await asyncio.to_thread(run_compaction)
+            limite = inicio_dia().date() - timedelta(days=RETENTION_DAYS)
+            borrados = 0
+            while (n := await asyncio.to_thread(purge_expired_batch, limite)):
+                borrados += n
+                await asyncio.sleep(BATCH_PAUSE_SEG)
+            print(f"✓ Activity log compacted ({dias} days, {borrados} expired events removed)")
+        except Exception as e:
+            print(f"✗ Activity log maintenance failed: {e}")
+            await asyncio.sleep(60)
+            continue
+
+        siguiente = inicio_dia() + timedelta(days=1)
+        # A few minutes past midnight so late write-behind flushes land first
+        await asyncio.sleep(max((siguiente - datetime.utcnow()).total_seconds(), 1) + 300)
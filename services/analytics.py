@@ -0,0 +1,182 @@
+import os
+import asyncio
+from datetime import datetime, timedelta
+from sqlalchemy import update, insert, delete, select, func, case
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from database.db import SessionLocal
+from models.usuario_leccion import UsuarioLeccion
+from models.resumen_leccion import ResumenLeccion
+from models.checkpoint_tarea import CheckpointTarea
+from services.write_behind import get_write_behind, RESUMENES
+
+NOMBRE_TAREA = "rebuild_resumen_lecciones"
+REBUILD_INTERVAL_SEG = float(os.getenv("ANALYTICS_REBUILD_INTERVAL", "3600"))
+
+CONTADORES = (
+    "usuarios", "completados", "intentos_total", "suma_calificacion",
+    "intentos_1", "intentos_2", "intentos_3_5", "intentos_6_mas"
+)
+
+
+def attempts_bucket(intentos: int) -> str:
+    """Summary column counting users with this many attempts"""
+    if intentos <= 1:
+        return "intentos_1"
+    if intentos == 2:
+        return "intentos_2"
+    if intentos <= 5:
+        return "intentos_3_5"
+    return "intentos_6_mas"
+
+
+def answer_delta(
+    nuevo: bool,
+    intentos_previos: int,
+    calificacion_previa: float,
+    calificacion: float,
+    recien_completada: bool
+) -> dict:
+    """Change to a lesson's summary caused by one submitted answer"""
+    delta = {"intentos_total": 1, "suma_calificacion": calificacion - calificacion_previa}
+    if nuevo:
+        delta["usuarios"] = 1
+    if recien_completada:
+        delta["completados"] = 1
+
+    anterior = None if nuevo else attempts_bucket(intentos_previos)
+    siguiente = attempts_bucket(intentos_previos + 1)
+    if anterior != siguiente:
+        delta[siguiente] = 1
+        if anterior:
+            delta[anterior] = -1
+    return delta
+
+
+def apply_summary_delta(db: Session, id_leccion: int, delta: dict) -> None:
+    """Add `delta` to the lesson's summary row (col = col + n), creating it if needed"""
+    delta = {col: n for col, n in delta.items() if n}
+    if not delta:
+        return
+    valores = {col: func.coalesce(getattr(ResumenLeccion, col), 0) + n for col, n in delta.items()}
+    valores["actualizado_en"] = datetime.utcnow()
+    stmt = (
+        update(ResumenLeccion)
+        .where(ResumenLeccion.id_leccion == id_leccion)
+        .values(valores)
+        .execution_options(synchronize_session=False)
+    )
+
+    if db.execute(stmt).rowcount:
+        return
+    try:
+        with db.begin_nested():
+            fila = {col: 0 for col in CONTADORES}
+            fila.update(delta)
+            db.execute(insert(ResumenLeccion).values(id_leccion=id_leccion, actualizado_en=datetime.utcnow(), **fila))
+    except IntegrityError:
+        # A concurrent answer created the row first
+        db.execute(stmt)
+
+
+def record_answer(db: Session, id_leccion: int, delta: dict) -> None:
+    """
+    Fold one answer into the lesson summary: coalesced through the
+    write-behind buffer when enabled (the summary row is shared by every
+    learner), otherwise in the caller's transaction.
+    """
+    buffer = get_write_behind()
+    if buffer:
+        buffer.add(RESUMENES, (id_leccion,), inc=delta)
+    else:
+        apply_summary_delta(db, id_leccion, delta)
+
+
+def rebuild_lesson_summaries(db: Session) -> int:
+    """
+    Recompute every lesson summary with one GROUP BY over usuarios_lecciones
+    and swap the rows. Corrects any drift in the incremental counters.
+    Returns the number of lessons summarized. The caller commits.
+    """
+    ul = UsuarioLeccion
+    intentos = func.coalesce(ul.intentos, 0)
+
+    def contar(condicion):
+        return func.sum(case((condicion, 1), else_=0))
+
+    filas = db.execute(
+        select(
+            ul.id_leccion,
+            func.count(),
+            contar(ul.completado == True),
+            func.sum(intentos),
+            func.sum(func.coalesce(ul.calificacion, 0)),
+            contar(intentos <= 1),
+            contar(intentos == 2),
+            contar(intentos.between(3, 5)),
+            contar(intentos >= 6),
+        ).group_by(ul.id_leccion)
+    ).all()
+
+    ahora = datetime.utcnow()
+    db.execute(delete(ResumenLeccion))
+    if filas:
+        db.execute(insert(ResumenLeccion), [
+            {
+                "id_leccion": fila[0],
+                **{col: valor or 0 for col, valor in zip(CONTADORES, fila[1:])},
+                "actualizado_en": ahora,
+            }
+            for fila in filas
+        ])
+    return len(filas)
+
+
+def run_rebuild(forzar: bool = False) -> int | None:
+    """
+    Rebuild unless another worker did so within the interval.
+    Returns lessons summarized, or None when skipped.
+    """
+    db = SessionLocal()
+    try:
+        checkpoint = db.query(CheckpointTarea).filter(
+            CheckpointTarea.nombre == NOMBRE_TAREA
+        ).with_for_update().first()
+        limite = datetime.utcnow() - timedelta(seconds=REBUILD_INTERVAL_SEG)
+        if checkpoint and not forzar and checkpoint.actualizado_en and checkpoint.actualizado_en > limite:
+            db.commit()
+            return None
+
+        if not checkpoint:
+            checkpoint = CheckpointTarea(nombre=NOMBRE_TAREA, ultimo_id=0, completado=False, procesados=0)
+            db.add(checkpoint)
+        checkpoint.completado = True
+        checkpoint.fecha = datetime.utcnow().date()
+        checkpoint.actualizado_en = datetime.utcnow()
+        resumidas = rebuild_lesson_summaries(db)
+        checkpoint.procesados = resumidas
+        db.commit()
+        return resumidas
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+async def analytics_rebuild_loop() -> None:
+    """Scheduler: full re-aggregation on startup (if due) and every interval"""
+    while True:
+        try:
+            resumidas = await asyncio.to_thread(run_rebuild)
+            if resumidas is not None:
+                print(f"✓ Lesson analytics rebuilt ({resumidas} lessons)")
+        except Exception as e:
+            print(f"✗ Lesson analytics rebuild failed: {e}")
+        await asyncio.sleep(REBUILD_INTERVAL_SEG)
+
+
+if __name__ == "__main__":
+    # Manual rebuild: python -m services.analytics
+    print(f"✓ Lesson analytics rebuilt ({run_rebuild(forzar=True)} lessons)")
@@ -0,0 +1,158 @@
+import os
+import time
+import hashlib
+import threading
+import orjson
+from collections import OrderedDict
+from fastapi import Request, Response
+
+from middleware.compression import choose_encoding, compress
+from database.db import with_session
+from services.singleflight import single_flight_group
+
+# Entries also expire after a TTL so catalog edits made through other
+# workers become visible without a shared invalidation channel
+CATALOG_CACHE_TTL_SEG = float(os.getenv("CATALOG_CACHE_TTL", "30"))
+MAX_ENTRADAS = 256
+CACHED_GZIP_LEVEL = 9
+CACHED_BROTLI_QUALITY = 9
+
+
+class CachedBody:
+    """A serialized catalog response plus its ETag and lazily built compressed variants"""
+
+    def __init__(self, body: bytes, version: int, data=None):
+        self.body = body
+        self.version = version
+        # The payload the body was serialized from; shared, so read-only
+        self.data = data
+        self.etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+        self.creado = time.monotonic()
+        self._variantes: dict[str, bytes] = {}
+        self._lock = threading.Lock()
+
+    def encoded(self, encoding: str) -> bytes:
+        with self._lock:
+            if encoding not in self._variantes:
+                nivel = CACHED_BROTLI_QUALITY if encoding == "br" else CACHED_GZIP_LEVEL
+                self._variantes[encoding] = compress(self.body, encoding, nivel)
+            return self._variantes[encoding]
+
+
+class CatalogCache:
+    """
+    Process-wide LRU cache of catalog (modules/lessons/videos) responses.
+    Every catalog write bumps the version, which invalidates all entries.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = 0
+        self._entradas: OrderedDict[str, CachedBody] = OrderedDict()
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    def bump(self) -> int:
+        with self._lock:
+            self._version += 1
+            self._entradas.clear()
+            return self._version
+
+    def _vigente(self, entrada: CachedBody) -> bool:
+        return entrada.version == self._version and time.monotonic() - entrada.creado <= CATALOG_CACHE_TTL_SEG
+
+    def get(self, clave: str) -> CachedBody | None:
+        with self._lock:
+            entrada = self._entradas.get(clave)
+            if not entrada:
+                return None
+            if not self._vigente(entrada):
+                del self._entradas[clave]
+                return None
+            self._entradas.move_to_end(clave)
+            return entrada
+
+    def get_or_build(self, clave: str, builder) -> CachedBody:
+        """Return the cached body for `clave`, building it with `builder()` on a miss"""
+        entrada = self.get(clave)
+        if entrada:
+            return entrada
+
+        version = self._version
+        datos = builder()
+        entrada = CachedBody(orjson.dumps(datos), version, datos)
+        with self._lock:
+            # Do not store a body built against a catalog that changed meanwhile
+            if version == self._version:
+                self._entradas[clave] = entrada
+                self._entradas.move_to_end(clave)
+                self._evict()
+        return entrada
+
+    def _evict(self) -> None:
+        """
+        Keep at most MAX_ENTRADAS entries (arbitrary search terms and
+        fieldsets are all keys): drop expired ones first, then the least
+        recently used. Called with the lock held.
+        """
+        if len(self._entradas) <= MAX_ENTRADAS:
+            return
+        for clave in [c for c, e in self._entradas.items() if not self._vigente(e)]:
+            del self._entradas[clave]
+        while len(self._entradas) > MAX_ENTRADAS:
+            self._entradas.popitem(last=False)
+
+
+catalog_cache = CatalogCache()
+
+
+def bump_catalog_version() -> int:
+    """Call after any write to modulos, lecciones or videos"""
+    return catalog_cache.bump()
+
+
+async def _cached_entry(clave: str, builder) -> CachedBody:
+    """
+    Cached entry for `clave`; concurrent misses for the same key share a
+    single build. `builder(db)` runs on a Session of its own.
+    """
+    entrada = catalog_cache.get(clave)
+    if entrada is None:
+        entrada = await single_flight_group.do(
+            clave, catalog_cache.get_or_build, clave, lambda: with_session(builder)
+        )
+    return entrada
+
+
+async def catalog_data(clave: str, builder):
+    """
+    The cached payload itself, for responses that combine catalog data with
+    per-user data. Callers must copy before changing anything in it.
+    """
+    return (await _cached_entry(clave, builder)).data
+
+
+async def catalog_response(request: Request, clave: str, builder) -> Response:
+    """
+    Serve a cacheable catalog response: 304 on a matching If-None-Match,
+    otherwise the cached bytes, precompressed for the client's encoding.
+    Concurrent misses for the same key share a single build.
+    """
+    entrada = await _cached_entry(clave, builder)
+    cabeceras = {
+        "ETag": entrada.etag,
+        "Cache-Control": "private, no-cache",
+        "Vary": "Accept-Encoding",
+    }
+
+    if request.headers.get("if-none-match") == entrada.etag:
+        return Response(status_code=304, headers=cabeceras)
+
+    encoding = choose_encoding(request.headers.get("accept-encoding", ""))
+    if encoding:
+        cabeceras["Content-Encoding"] = encoding
+        return Response(entrada.encoded(encoding), media_type="application/json", headers=cabeceras)
+
+    return Response(entrada.body, media_type="application/json", headers=cabeceras)
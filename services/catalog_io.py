@@ -0,0 +1,299 @@
+import io
+import csv
+import json
+import orjson
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session
+
+from models.modulo import Modulo
+from models.leccion import Leccion
+from models.video import Video
+
+# Flat CSV layout shared by import and export: one row per entity, children
+# point at their parent's id through `padre`
+CSV_COLUMNAS = ["tipo", "id", "padre", "titulo", "orden", "activo", "url", "duracion_seg"]
+EXPORT_BATCH = 500
+
+
+class CatalogImportError(Exception):
+    def __init__(self, errores: list[str]):
+        super().__init__("; ".join(errores))
+        self.errores = errores
+
+
+# ============== PARSING ==============
+
+def _bool(valor) -> bool:
+    if isinstance(valor, str):
+        return valor.strip().lower() not in ("0", "false", "no", "")
+    return True if valor is None else bool(valor)
+
+
+def _int(valor):
+    if valor is None or valor == "":
+        return None
+    return int(valor)
+
+
+def parse_json_catalog(data: dict) -> list[dict]:
+    """
+    Flatten a JSON catalog into records. Accepts the nested tree
+    (modulos[].lecciones[].videos[]) and the flat export shape
+    (top-level modulos/lecciones/videos with id_modulo/id_leccion parents).
+    """
+    registros = []
+
+    def agregar(tipo, item, padre=None):
+        registros.append({
+            "tipo": tipo,
+            "id": item.get("id", item.get(f"id_{tipo}")),
+            "padre": padre,
+            "titulo": item.get("titulo"),
+            "orden": item.get("orden"),
+            "activo": item.get("activo", True),
+            "url": item.get("url"),
+            "duracion_seg": item.get("duracion_seg"),
+        })
+        return registros[-1]
+
+    for modulo in data.get("modulos", []):
+        m = agregar("modulo", modulo)
+        for leccion in modulo.get("lecciones", []):
+            l = agregar("leccion", leccion, padre=("modulo", m))
+            for video in leccion.get("videos", []):
+                agregar("video", video, padre=("leccion", l))
+
+    for leccion in data.get("lecciones", []):
+        agregar("leccion", leccion, padre=leccion.get("id_modulo"))
+    for video in data.get("videos", []):
+        agregar("video", video, padre=video.get("id_leccion"))
+    return registros
+
+
+def parse_csv_catalog(texto: str) -> list[dict]:
+    registros = []
+    for fila in csv.DictReader(io.StringIO(texto)):
+        registros.append({
+            "tipo": (fila.get("tipo") or "").strip().lower(),
+            "id": fila.get("id") or None,
+            "padre": fila.get("padre") or None,
+            "titulo": fila.get("titulo"),
+            "orden": fila.get("orden"),
+            "activo": fila.get("activo", "true"),
+            "url": fila.get("url") or None,
+            "duracion_seg": fila.get("duracion_seg"),
+        })
+    return registros
+
+
+# ============== IMPORT ==============
+
+def _validate(db: Session, registros: list[dict]) -> dict[str, list[dict]]:
+    """
+    Check required fields and resolve every parent reference in memory.
+    A `padre` matching an id in the file refers to that new row; anything
+    else must be an existing row, checked with one IN query per table.
+    """
+    errores = []
+    por_tipo = {"modulo": [], "leccion": [], "video": []}
+    refs = {"modulo": {}, "leccion": {}}
+
+    for n, r in enumerate(registros, start=1):
+        if r["tipo"] not in por_tipo:
+            errores.append(f"fila {n}: tipo inválido '{r['tipo']}'")
+            continue
+        if not r["titulo"]:
+            errores.append(f"fila {n}: titulo requerido")
+        try:
+            r["orden"] = _int(r["orden"])
+            r["duracion_seg"] = _int(r["duracion_seg"])
+        except (TypeError, ValueError):
+            errores.append(f"fila {n}: orden/duracion_seg deben ser enteros")
+            continue
+        if r["orden"] is None:
+            errores.append(f"fila {n}: orden requerido")
+        if r["tipo"] == "video" and not r["url"]:
+            errores.append(f"fila {n}: url requerida")
+        r["activo"] = _bool(r["activo"])
+        r["fila"] = n
+
+        if r["tipo"] in refs and r["id"] is not None:
+            clave = str(r["id"])
+            if clave in refs[r["tipo"]]:
+                errores.append(f"fila {n}: id duplicado '{clave}'")
+            refs[r["tipo"]][clave] = r
+        por_tipo[r["tipo"]].append(r)
+
+    # Parent references: a row from this file, or an existing id
+    existentes = {"modulo": set(), "leccion": set()}
+    for tipo_hijo, tipo_padre in (("leccion", "modulo"), ("video", "leccion")):
+        for r in por_tipo[tipo_hijo]:
+            padre = r["padre"]
+            if isinstance(padre, tuple):
+                continue
+            if padre is None:
+                errores.append(f"fila {r['fila']}: {tipo_hijo} sin padre")
+            elif str(padre) in refs[tipo_padre]:
+                r["padre"] = (tipo_padre, refs[tipo_padre][str(padre)])
+            else:
+                try:
+                    r["padre"] = int(padre)
+                    existentes[tipo_padre].add(r["padre"])
+                except (TypeError, ValueError):
+                    errores.append(f"fila {r['fila']}: padre inválido '{padre}'")
+
+    for tipo_padre, pk in (("modulo", Modulo.id_modulo), ("leccion", Leccion.id_leccion)):
+        ids = existentes[tipo_padre]
+        if not ids:
+            continue
+        encontrados = set(db.scalars(select(pk).where(pk.in_(ids))).all())
+        for faltante in sorted(ids - encontrados):
+            errores.append(f"{tipo_padre} {faltante} no existe")
+
+    if errores:
+        raise CatalogImportError(errores)
+    return por_tipo
+
+
+def _insert_rows(db: Session, modelo, pk, filas: list[dict]) -> list[int]:
+    """Insert rows and return their generated ids in parameter order"""
+    if not filas:
+        return []
+    dialecto = db.get_bind().dialect
+    if dialecto.insert_executemany_returning_sort_by_parameter_order:
+        # One batched INSERT ... RETURNING (PostgreSQL, SQLite)
+        return list(db.scalars(
+            insert(modelo).returning(pk, sort_by_parameter_order=True),
+            filas
+        ))
+    # MySQL has no RETURNING: ids come back one INSERT at a time
+    return [db.execute(insert(modelo).values(**fila)).inserted_primary_key[0] for fila in filas]
+
+
+def _parent_id(r: dict) -> int:
+    padre = r["padre"]
+    return padre[1]["nuevo_id"] if isinstance(padre, tuple) else padre
+
+
+def import_catalog(db: Session, registros: list[dict]) -> dict:
+    """
+    Validate and insert a whole catalog in one transaction: one statement
+    per table (modules, then lessons, then videos). Nothing is written if
+    any row is invalid. The caller commits.
+    """
+    por_tipo = _validate(db, registros)
+
+    modulos = por_tipo["modulo"]
+    ids = _insert_rows(db, Modulo, Modulo.id_modulo, [
+        {"titulo": r["titulo"], "orden": r["orden"], "activo": r["activo"]}
+        for r in modulos
+    ])
+    for r, nuevo_id in zip(modulos, ids):
+        r["nuevo_id"] = nuevo_id
+
+    lecciones = por_tipo["leccion"]
+    ids = _insert_rows(db, Leccion, Leccion.id_leccion, [
+        {"id_modulo": _parent_id(r), "titulo": r["titulo"], "orden": r["orden"], "activo": r["activo"]}
+        for r in lecciones
+    ])
+    for r, nuevo_id in zip(lecciones, ids):
+        r["nuevo_id"] = nuevo_id
+
+    videos = por_tipo["video"]
+    if videos:
+        # Nothing references videos, so no ids are needed: plain executemany
+        db.execute(insert(Video), [
+            {
+                "id_leccion": _parent_id(r),
+                "titulo": r["titulo"],
+                "url": r["url"],
+                "duracion_seg": r["duracion_seg"],
+                "orden": r["orden"],
+                "activo": r["activo"],
+            }
+            for r in videos
+        ])
+
+    return {"modulos": len(modulos), "lecciones": len(lecciones), "videos": len(videos)}
+
+
+# ============== EXPORT ==============
+
+def _export_sections(db: Session):
+    """(tipo, rows) for each table, parents first; rows are read in batches"""
+    consultas = (
+        ("modulo", select(Modulo.id_modulo, Modulo.titulo, Modulo.orden, Modulo.activo)
+            .order_by(Modulo.orden, Modulo.id_modulo)),
+        ("leccion", select(Leccion.id_leccion, Leccion.id_modulo, Leccion.titulo, Leccion.orden, Leccion.activo)
+            .order_by(Leccion.id_modulo, Leccion.orden, Leccion.id_leccion)),
+        ("video", select(Video.id_video, Video.id_leccion, Video.titulo, Video.url,
+                         Video.duracion_seg, Video.orden, Video.activo)
+            .order_by(Video.id_leccion, Video.orden, Video.id_video)),
+    )
+    for tipo, consulta in consultas:
+        filas = db.execute(consulta.execution_options(yield_per=EXPORT_BATCH)).mappings()
+        yield tipo, ({**fila, "activo": bool(fila["activo"])} for fila in filas)
+
+
+def export_json(db: Session):
+    """Stream the flat JSON shape accepted by parse_json_catalog"""
+    secciones = {"modulo": b"modulos", "leccion": b"lecciones", "video": b"videos"}
+    yield b"{"
+    for i, (tipo, filas) in enumerate(_export_sections(db)):
+        yield (b"," if i else b"") + b'"' + secciones[tipo] + b'":['
+        for j, fila in enumerate(filas):
+            yield (b"," if j else b"") + orjson.dumps(fila)
+        yield b"]"
+    yield b"}"
+
+
+def export_csv(db: Session):
+    """Stream the flat CSV layout accepted by parse_csv_catalog"""
+    buffer = io.StringIO()
+    escritor = csv.DictWriter(buffer, fieldnames=CSV_COLUMNAS, extrasaction="ignore")
+    escritor.writeheader()
+    for tipo, filas in _export_sections(db):
+        for n, fila in enumerate(filas, start=1):
+            escritor.writerow({
+                "tipo": tipo,
+                "id": fila[f"id_{tipo}"],
+                "padre": fila.get("id_modulo") if tipo == "leccion" else fila.get("id_leccion"),
+                **fila,
+            })
+            if n % EXPORT_BATCH == 0:
+                yield buffer.getvalue().encode()
+                buffer.seek(0)
+                buffer.truncate()
+    yield buffer.getvalue().encode()
+
+
+if __name__ == "__main__":
+    # python -m services.catalog_io import catalogo.json|catalogo.csv
+    # python -m services.catalog_io export json|csv > catalogo.json
+    import sys
+    from database.db import SessionLocal
+    from services.catalog_cache import bump_catalog_version
+
+    db = SessionLocal()
+    try:
+        if len(sys.argv) == 3 and sys.argv[1] == "import":
+            with open(sys.argv[2], encoding="utf-8") as f:
+                texto = f.read()
+            registros = parse_csv_catalog(texto) if sys.argv[2].endswith(".csv") else parse_json_catalog(json.loads(texto))
+            try:
+                totales = import_catalog(db, registros)
+            except CatalogImportError as e:
+                db.rollback()
+                print("✗ Catálogo inválido:\n  " + "\n  ".join(e.errores))
+                sys.exit(1)
+            db.commit()
+            bump_catalog_version()
+            print(f"✓ Catalog imported: {totales}")
+        elif len(sys.argv) == 3 and sys.argv[1] == "export" and sys.argv[2] in ("json", "csv"):
+            for chunk in (export_csv(db) if sys.argv[2] == "csv" else export_json(db)):
+                sys.stdout.buffer.write(chunk)
+        else:
+            print("Uso: python -m services.catalog_io import <archivo.json|csv> | export json|csv")
+            sys.exit(2)
+    finally:
+        db.close()
@@ -0,0 +1,45 @@
+from fastapi import HTTPException
+from pydantic import BaseModel
+from sqlalchemy import update, case
+from sqlalchemy.orm import Session
+
+
+class ReorderRequest(BaseModel):
+    ids: list[int]  # En el nuevo orden; la posición i recibe orden = i + 1
+
+
+def reorder(db: Session, pk, ids: list[int], padre=None, nombre: str = "Elementos") -> int:
+    """
+    Apply an ordered id list as orden = 1..n with a single CASE UPDATE.
+    When `padre` is given, every id must share the same parent (a lesson
+    list belongs to one module, a video list to one lesson).
+    The caller commits and bumps the catalog version.
+    """
+    if not ids:
+        raise HTTPException(status_code=400, detail="La lista de ids no puede estar vacía")
+    if len(set(ids)) != len(ids):
+        raise HTTPException(status_code=400, detail="La lista de ids contiene duplicados")
+
+    columnas = [pk] if padre is None else [pk, padre]
+    filas = db.query(*columnas).filter(pk.in_(ids)).all()
+
+    faltantes = set(ids) - {fila[0] for fila in filas}
+    if faltantes:
+        raise HTTPException(
+            status_code=404,
+            detail=f"No se encontraron {nombre.lower()} con ids {sorted(faltantes)}"
+        )
+    if padre is not None and len({fila[1] for fila in filas}) > 1:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Todos los ids deben pertenecer al mismo {padre.key}"
+        )
+
+    modelo = pk.class_
+    db.execute(
+        update(modelo)
+        .where(pk.in_(ids))
+        .values(orden=case({id_: i for i, id_ in enumerate(ids, start=1)}, value=pk))
+        .execution_options(synchronize_session=False)
+    )
+    return len(ids)
@@ -0,0 +1,128 @@
+import os
+import asyncio
+from datetime import datetime, timedelta
+from sqlalchemy import update, select
+from sqlalchemy.orm import Session
+
+from database.db import SessionLocal
+from models.desafio_diario import DesafioDiario
+from models.checkpoint_tarea import CheckpointTarea
+
+NOMBRE_TAREA = "reset_desafios_diarios"
+
+# Tunables (env)
+BATCH_SIZE = int(os.getenv("DAILY_RESET_BATCH_SIZE", "500"))
+BATCH_PAUSE_SEG = float(os.getenv("DAILY_RESET_BATCH_PAUSE", "0.2"))
+
+
+def inicio_dia(ahora: datetime | None = None) -> datetime:
+    """Start of the current challenge day (UTC midnight)"""
+    ahora = ahora or datetime.utcnow()
+    return datetime.combine(ahora.date(), datetime.min.time())
+
+
+def is_stale(desafio: DesafioDiario | None) -> bool:
+    """True if the challenge row still holds counters from a previous day"""
+    if not desafio or not desafio.actualizado_en:
+        return False
+    return desafio.actualizado_en < inicio_dia()
+
+
+def get_checkpoint(db: Session, nombre: str) -> CheckpointTarea:
+    """Get or create the checkpoint row for a background job"""
+    checkpoint = db.query(CheckpointTarea).filter(CheckpointTarea.nombre == nombre).first()
+    if not checkpoint:
+        checkpoint = CheckpointTarea(nombre=nombre, ultimo_id=0, completado=False, procesados=0)
+        db.add(checkpoint)
+        db.flush()
+    return checkpoint
+
+
+def reset_batch(db: Session, inicio: datetime) -> bool:
+    """
+    Reset the next keyset page of challenge rows left over from before `inicio`.
+    The checkpoint advances in the same transaction, so a crash resumes
+    from the last committed page. Returns False when the day's pass is done.
+    """
+    checkpoint = get_checkpoint(db, NOMBRE_TAREA)
+
+    if checkpoint.fecha != inicio.date():
+        # New day: start a fresh pass
+        checkpoint.fecha = inicio.date()
+        checkpoint.ultimo_id = 0
+        checkpoint.procesados = 0
+        checkpoint.completado = False
+
+    if checkpoint.completado:
+        db.commit()
+        return False
+
+    ids = db.execute(
+        select(DesafioDiario.id_desafio)
+        .where(DesafioDiario.id_desafio > checkpoint.ultimo_id)
+        .order_by(DesafioDiario.id_desafio)
+        .limit(BATCH_SIZE)
+    ).scalars().all()
+
+    if not ids:
+        checkpoint.completado = True
+        db.commit()
+        return False
+
+    # Rows already touched today keep their progress
+    reseteadas = db.execute(
+        update(DesafioDiario)
+        .where(
+            DesafioDiario.id_desafio >= ids[0],
+            DesafioDiario.id_desafio <= ids[-1],
+            DesafioDiario.actualizado_en < inicio
+        )
+        .values(
+            lecciones_completadas=0,
+            modulos_completados=0,
+            xp_ganado=0,
+            actualizado_en=datetime.utcnow()
+        )
+        .execution_options(synchronize_session=False)
+    ).rowcount
+
+    checkpoint.ultimo_id = ids[-1]
+    checkpoint.procesados = (checkpoint.procesados or 0) + reseteadas
+    db.commit()
+    return True
+
+
+def run_reset_batch(inicio: datetime) -> bool:
+    """Run one batch in its own session (called from a worker thread)"""
+    db = SessionLocal()
+    try:
+        return reset_batch(db, inicio)
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+async def run_daily_reset() -> None:
+    """Process the whole day's pass batch by batch without blocking the event loop"""
+    inicio = inicio_dia()
+    while await asyncio.to_thread(run_reset_batch, inicio):
+        # Throttle so the rollover never competes with API traffic
+        await asyncio.sleep(BATCH_PAUSE_SEG)
+
+
+async def daily_reset_loop() -> None:
+    """Scheduler: catch up on startup, then roll over after every UTC midnight"""
+    while True:
+        try:
+            await run_daily_reset()
+            print("✓ Daily challenges rolled over")
+        except Exception as e:
+            # Resume from the checkpoint shortly
+            print(f"✗ Daily reset failed: {e}")
+            await asyncio.sleep(60)
+            continue
+
+        siguiente = inicio_dia() + timedelta(days=1)
+        await asyncio.sleep(max((siguiente - datetime.utcnow()).total_seconds(), 1))
@@ -0,0 +1,28 @@
+from fastapi import HTTPException
+
+
+def parse_fields(fields: str | None, permitidos: list[str]) -> list[str]:
+    """
+    Requested fields of a `fields=a,b` query param, in the endpoint's own
+    field order (so equal sets share cache keys). No param means every field.
+    """
+    if not fields or not fields.strip():
+        return list(permitidos)
+
+    pedidos = {campo.strip().lower() for campo in fields.split(",") if campo.strip()}
+    invalidos = sorted(pedidos - set(permitidos))
+    if invalidos:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Campos no válidos: {invalidos}. Permitidos: {permitidos}"
+        )
+    return [campo for campo in permitidos if campo in pedidos]
+
+
+def fieldset_responses(modelo) -> dict:
+    """
+    OpenAPI `responses` for an endpoint that takes `fields=`. Used instead of
+    response_model: a partial projection is returned as a raw response and
+    would not validate against the full schema.
+    """
+    return {200: {"model": modelo, "description": "Full schema; with `fields=` each item carries only the requested fields"}}
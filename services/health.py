@@ -0,0 +1,126 @@
+import os
+import time
+import asyncio
+from sqlalchemy import text
+
+from database.db import engine, SessionLocal
+
+# Probe results are cached so readiness checks add no DB load
+HEALTH_CACHE_TTL_SEG = float(os.getenv("HEALTH_CACHE_TTL", "5"))
+WARMUP_CONNECTIONS = int(os.getenv("WARMUP_CONNECTIONS", "4"))
+
+
+class HealthState:
+    """Readiness flag plus a TTL-cached snapshot of DB and pool status"""
+
+    def __init__(self):
+        self.ready = False
+        self._cache: dict | None = None
+        self._cache_en = 0.0
+        self._lock = asyncio.Lock()
+
+    def pool_status(self) -> dict:
+        pool = engine.pool
+        estado = {"tipo": type(pool).__name__}
+        for metrica in ("size", "checkedin", "checkedout", "overflow"):
+            funcion = getattr(pool, metrica, None)
+            if callable(funcion):
+                estado[metrica] = funcion()
+        return estado
+
+    def _check_db(self) -> dict:
+        inicio = time.perf_counter()
+        try:
+            with engine.connect() as conn:
+                conn.execute(text("SELECT 1"))
+            return {"ok": True, "latencia_ms": round((time.perf_counter() - inicio) * 1000, 1)}
+        except Exception as e:
+            return {"ok": False, "error": str(e)}
+
+    def _pool_exhausted(self, pool: dict) -> bool:
+        if "size" not in pool or "checkedout" not in pool:
+            return False
+        overflow = getattr(engine.pool, "_max_overflow", 0)
+        if overflow < 0:
+            # Unlimited overflow: a checkout never waits
+            return False
+        return pool["checkedout"] >= pool["size"] + overflow
+
+    async def readiness(self) -> dict:
+        async with self._lock:
+            if self._cache and time.monotonic() - self._cache_en < HEALTH_CACHE_TTL_SEG:
+                return self._cache
+
+            pool = self.pool_status()
+            # An exhausted pool would block the probe itself; report it without querying
+            if self._pool_exhausted(pool):
+                db = {"ok": False, "error": "pool exhausted"}
+            else:
+                db = await asyncio.to_thread(self._check_db)
+
+            self._cache = {
+                "ready": self.ready and db["ok"],
+                "warmed": self.ready,
+                "database": db,
+                "pool": pool
+            }
+            self._cache_en = time.monotonic()
+            return self._cache
+
+
+health_state = HealthState()
+
+
+def _open_pool_connections() -> None:
+    """Open (then return) a few pooled connections so first requests skip the handshake"""
+    # Never more than the pool holds without overflowing (NullPool & co. have no size)
+    tamano = engine.pool.size() if hasattr(engine.pool, "size") else WARMUP_CONNECTIONS
+    conexiones = []
+    try:
+        for _ in range(min(WARMUP_CONNECTIONS, tamano)):
+            conn = engine.connect()
+            conexiones.append(conn)
+            conn.execute(text("SELECT 1"))
+    finally:
+        for conn in conexiones:
+            conn.close()
+
+
+def _warm_statements_and_catalog() -> None:
+    """Load the catalog cache and run the hot queries once to fill SQLAlchemy's compiled cache"""
+    from models.user import Usuario
+    from models.usuario_leccion import UsuarioLeccion
+    from models.usuario_modulo import UsuarioModulo
+    from models.leccion import Leccion
+    from models.modulo import Modulo
+    from services.catalog_cache import catalog_cache
+    from routes.dictionary_routes import build_dictionary, dictionary_cache_key
+
+    db = SessionLocal()
+    try:
+        catalog_cache.get_or_build(dictionary_cache_key(), lambda: build_dictionary(db))
+
+        # Same statement shapes the routers use; id -1 matches no rows
+        db.query(Usuario).filter(Usuario.id_usuario == -1).first()
+        db.query(UsuarioLeccion).filter(
+            UsuarioLeccion.id_usuario == -1,
+            UsuarioLeccion.id_leccion == -1
+        ).first()
+        db.query(UsuarioModulo).filter(UsuarioModulo.id_usuario == -1).all()
+        db.query(Modulo).filter(Modulo.activo == True).order_by(Modulo.orden).all()
+        db.query(Leccion).filter(Leccion.id_leccion == -1).first()
+    finally:
+        db.close()
+
+
+async def warm_up() -> None:
+    """
+    Run before reporting ready: pool connections, catalog cache, hot
+    statements. Best effort: a failed step is logged and never stops startup.
+    """
+    for paso in (_open_pool_connections, _warm_statements_and_catalog):
+        try:
+            await asyncio.to_thread(paso)
+        except Exception as e:
+            print(f"✗ Warm-up step {paso.__name__} failed: {e}")
+    health_state.ready = True
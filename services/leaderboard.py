@@ -0,0 +1,140 @@
+import os
+import bisect
+import asyncio
+import threading
+from sqlalchemy import select
+
+from database.db import SessionLocal
+from models.user import Usuario
+
+RECONCILE_INTERVAL_SEG = float(os.getenv("LEADERBOARD_RECONCILE_INTERVAL", "300"))
+
+
+class CoinLeaderboard:
+    """
+    In-memory order-statistic index over Usuario.monedas: one sorted list of
+    (-monedas, id_usuario), so memory is O(users) whatever the balances.
+    Rank and top-k are a bisect and a slice; a balance change is one delete
+    plus one insort (a pointer memmove, cheap even for large n).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._orden: list[tuple[int, int]] = []
+        self._monedas: dict[int, int] = {}
+        self._nombres: dict[int, str] = {}
+
+    @classmethod
+    def from_rows(cls, filas) -> "CoinLeaderboard":
+        """Bulk build from (id_usuario, nombre, monedas) rows with one sort"""
+        tablero = cls()
+        for user_id, nombre, monedas in filas:
+            tablero._monedas[user_id] = max(int(monedas or 0), 0)
+            tablero._nombres[user_id] = nombre or ""
+        tablero._orden = sorted((-m, user_id) for user_id, m in tablero._monedas.items())
+        return tablero
+
+    def _discard(self, user_id: int, monedas: int) -> None:
+        i = bisect.bisect_left(self._orden, (-monedas, user_id))
+        del self._orden[i]
+
+    def _above(self, monedas: int) -> int:
+        """Number of users with more coins than `monedas`"""
+        return bisect.bisect_left(self._orden, (-monedas,))
+
+    # ---------- public API ----------
+
+    def update(self, user_id: int, monedas: int, nombre: str | None = None) -> None:
+        """Insert or move a user to a new coin balance"""
+        monedas = max(int(monedas or 0), 0)
+        with self._lock:
+            anterior = self._monedas.get(user_id)
+            if anterior != monedas:
+                if anterior is not None:
+                    self._discard(user_id, anterior)
+                bisect.insort(self._orden, (-monedas, user_id))
+                self._monedas[user_id] = monedas
+            if nombre is not None:
+                self._nombres[user_id] = nombre
+
+    def set_name(self, user_id: int, nombre: str) -> None:
+        with self._lock:
+            if user_id in self._monedas:
+                self._nombres[user_id] = nombre
+
+    def remove(self, user_id: int) -> None:
+        with self._lock:
+            anterior = self._monedas.pop(user_id, None)
+            if anterior is None:
+                return
+            self._discard(user_id, anterior)
+            self._nombres.pop(user_id, None)
+
+    def __contains__(self, user_id: int) -> bool:
+        return user_id in self._monedas
+
+    def rank(self, user_id: int) -> int | None:
+        """1-based rank (ties share a rank), or None for unknown users"""
+        with self._lock:
+            monedas = self._monedas.get(user_id)
+            if monedas is None:
+                return None
+            return self._above(monedas) + 1
+
+    def top(self, k: int) -> list[dict]:
+        """The k richest users, highest first (ties by id_usuario)"""
+        resultado = []
+        with self._lock:
+            posicion, anterior = 0, None
+            for negativo, user_id in self._orden[:k]:
+                if negativo != anterior:
+                    posicion, anterior = self._above(-negativo) + 1, negativo
+                resultado.append({
+                    "posicion": posicion,
+                    "id_usuario": user_id,
+                    "nombre": self._nombres.get(user_id, ""),
+                    "monedas": -negativo
+                })
+        return resultado
+
+    def coins(self, user_id: int) -> int | None:
+        return self._monedas.get(user_id)
+
+    def total(self) -> int:
+        return len(self._orden)
+
+
+def load_leaderboard() -> CoinLeaderboard:
+    """Build a fresh leaderboard from one bulk query"""
+    db = SessionLocal()
+    try:
+        filas = db.execute(
+            select(Usuario.id_usuario, Usuario.nombre, Usuario.monedas)
+        ).all()
+    finally:
+        db.close()
+
+    return CoinLeaderboard.from_rows(filas)
+
+
+_leaderboard = CoinLeaderboard()
+
+
+def get_leaderboard() -> CoinLeaderboard:
+    return _leaderboard
+
+
+async def seed_leaderboard() -> None:
+    global _leaderboard
+    _leaderboard = await asyncio.to_thread(load_leaderboard)
+    print(f"✓ Leaderboard loaded ({_leaderboard.total()} users)")
+
+
+async def reconcile_leaderboard_loop() -> None:
+    """Periodically rebuild from the database to correct drift (e.g. awards made by other workers)"""
+    while True:
+        await asyncio.sleep(RECONCILE_INTERVAL_SEG)
+        try:
+            await seed_leaderboard()
+        except Exception as e:
+            print(f"✗ Leaderboard reconcile failed: {e}")
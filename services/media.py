@@ -0,0 +1,279 @@
+import os
+import stat
+import hashlib
+import asyncio
+import mimetypes
+import threading
+from collections import OrderedDict
+from email.utils import formatdate, parsedate_to_datetime
+from starlette.responses import Response
+
+from models.video import Video
+
+MEDIA_ROOT = os.path.abspath(os.getenv("MEDIA_ROOT", "./media"))
+FD_CACHE_SIZE = int(os.getenv("MEDIA_FD_CACHE_SIZE", "128"))
+CHUNK_SIZE = 256 * 1024
+
+
+class OpenFile:
+    """A cached descriptor plus its stat; read with os.pread so it can be shared"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.fd = os.open(path, os.O_RDONLY | getattr(os, "O_BINARY", 0))
+        st = os.fstat(self.fd)
+        self.size = st.st_size
+        self.mtime_ns = st.st_mtime_ns
+        self.mtime = st.st_mtime
+        self.usuarios = 0
+        self.descartado = False
+        self.lock = threading.Lock()
+
+    @property
+    def etag(self) -> str:
+        return f'"{self.size:x}-{self.mtime_ns:x}"'
+
+    @property
+    def last_modified(self) -> str:
+        return formatdate(self.mtime, usegmt=True)
+
+    def close(self) -> None:
+        try:
+            os.close(self.fd)
+        except OSError:
+            pass
+
+
+class FileDescriptorCache:
+    """
+    LRU of open file descriptors. Entries are revalidated against the file's
+    current size/mtime; an evicted descriptor is closed once its last reader
+    releases it.
+    """
+
+    def __init__(self, capacidad: int):
+        self.capacidad = capacidad
+        self._lock = threading.Lock()
+        self._archivos: OrderedDict[str, OpenFile] = OrderedDict()
+
+    def acquire(self, path: str) -> OpenFile:
+        st = os.stat(path)
+        if not stat.S_ISREG(st.st_mode):
+            raise FileNotFoundError(path)
+
+        with self._lock:
+            archivo = self._archivos.get(path)
+            if archivo and (archivo.size != st.st_size or archivo.mtime_ns != st.st_mtime_ns):
+                # File was replaced on disk
+                self._discard(path)
+                archivo = None
+            if archivo is None:
+                archivo = OpenFile(path)
+                self._archivos[path] = archivo
+                while len(self._archivos) > self.capacidad:
+                    self._discard(next(iter(self._archivos)))
+            self._archivos.move_to_end(path)
+            archivo.usuarios += 1
+            return archivo
+
+    def release(self, archivo: OpenFile) -> None:
+        with self._lock:
+            archivo.usuarios -= 1
+            if archivo.descartado and archivo.usuarios == 0:
+                archivo.close()
+
+    def _discard(self, path: str) -> None:
+        archivo = self._archivos.pop(path)
+        archivo.descartado = True
+        if archivo.usuarios == 0:
+            archivo.close()
+
+    def close_all(self) -> None:
+        with self._lock:
+            for path in list(self._archivos):
+                self._discard(path)
+
+
+fd_cache = FileDescriptorCache(FD_CACHE_SIZE)
+
+
+def resolve_media_path(relativo: str) -> str | None:
+    """Absolute path under MEDIA_ROOT, or None if it escapes the root"""
+    path = os.path.realpath(os.path.join(MEDIA_ROOT, relativo.lstrip("/\\")))
+    if os.path.commonpath([path, os.path.realpath(MEDIA_ROOT)]) != os.path.realpath(MEDIA_ROOT):
+        return None
+    return path
+
+
+def video_media_path(video: Video) -> str | None:
+    """
+    Local file for a video: Video.url itself when it is a path relative to
+    MEDIA_ROOT, otherwise the conventional videos/{id_video}.mp4
+    """
+    url = video.url or ""
+    if url and not url.startswith(("http://", "https://")):
+        return resolve_media_path(url)
+    return resolve_media_path(f"videos/{video.id_video}.mp4")
+
+
+_digests: dict[str, tuple[int, int, str]] = {}
+_digests_lock = threading.Lock()
+
+
+def file_digest(path: str) -> tuple[int, str] | None:
+    """
+    (size, sha256 hex) of a media file, or None if it does not exist.
+    Digests are memoized per path and recomputed only when size/mtime change.
+    """
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    if not stat.S_ISREG(st.st_mode):
+        return None
+
+    memo = _digests.get(path)
+    if memo and memo[0] == st.st_size and memo[1] == st.st_mtime_ns:
+        return st.st_size, memo[2]
+
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(1024 * 1024):
+            sha.update(chunk)
+    with _digests_lock:
+        _digests[path] = (st.st_size, st.st_mtime_ns, sha.hexdigest())
+    return st.st_size, sha.hexdigest()
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+def parse_range(header: str, size: int) -> tuple[int, int] | None:
+    """
+    Parse a single 'bytes=' range into inclusive (start, end).
+    Returns None for multi-range or malformed headers (serve the full file);
+    raises RangeNotSatisfiable when the range falls outside the file.
+    """
+    unidad, _, rangos = header.partition("=")
+    if unidad.strip().lower() != "bytes" or "," in rangos:
+        return None
+    inicio, _, fin = rangos.strip().partition("-")
+    try:
+        if inicio == "":
+            # Suffix range: last N bytes
+            n = int(fin)
+            if n <= 0:
+                raise RangeNotSatisfiable()
+            return max(size - n, 0), size - 1
+        inicio = int(inicio)
+        fin = int(fin) if fin else size - 1
+    except ValueError:
+        return None
+    if inicio >= size or inicio > fin:
+        raise RangeNotSatisfiable()
+    return inicio, min(fin, size - 1)
+
+
+def _pread(archivo: "OpenFile", n: int, posicion: int) -> bytes:
+    if hasattr(os, "pread"):
+        return os.pread(archivo.fd, n, posicion)
+    # Windows: no pread, serialize seek + read on the shared descriptor
+    with archivo.lock:
+        os.lseek(archivo.fd, posicion, os.SEEK_SET)
+        return os.read(archivo.fd, n)
+
+
+class RangeFileResponse(Response):
+    """
+    ASGI response for a file on disk with Range, ETag and Last-Modified
+    support. Streams CHUNK_SIZE pread() chunks so only one chunk is in
+    Python memory at a time.
+    """
+
+    def __init__(self, path: str, headers: dict, method: str = "GET", background=None):
+        super().__init__(
+            media_type=mimetypes.guess_type(path)[0] or "application/octet-stream",
+            background=background
+        )
+        self.path = path
+        self.request_headers = headers
+        self.method = method
+
+    async def __call__(self, scope, receive, send):
+        archivo = fd_cache.acquire(self.path)
+        try:
+            await self._send(archivo, scope, send)
+        finally:
+            fd_cache.release(archivo)
+        if self.background is not None:
+            await self.background()
+
+    def _not_modified(self, archivo: OpenFile) -> bool:
+        etags = self.request_headers.get("if-none-match")
+        if etags is not None:
+            return etags.strip() == "*" or archivo.etag in [e.strip() for e in etags.split(",")]
+        desde = self.request_headers.get("if-modified-since")
+        if desde:
+            try:
+                return int(archivo.mtime) <= parsedate_to_datetime(desde).timestamp()
+            except (TypeError, ValueError):
+                return False
+        return False
+
+    async def _send(self, archivo: OpenFile, scope, send):
+        # Length and type depend on the range; any other header set on the response is kept
+        cabeceras = [
+            (k, v) for k, v in self.raw_headers
+            if k not in (b"content-length", b"content-type")
+        ] + [
+            (b"accept-ranges", b"bytes"),
+            (b"etag", archivo.etag.encode()),
+            (b"last-modified", archivo.last_modified.encode()),
+            (b"cache-control", b"private, max-age=86400"),
+        ]
+
+        if self._not_modified(archivo):
+            await send({"type": "http.response.start", "status": 304, "headers": cabeceras})
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        inicio, fin, status = 0, archivo.size - 1, 200
+        rango = self.request_headers.get("range")
+        if_range = self.request_headers.get("if-range")
+        if rango and (not if_range or if_range.strip() in (archivo.etag, archivo.last_modified)):
+            try:
+                parsed = parse_range(rango, archivo.size)
+            except RangeNotSatisfiable:
+                cabeceras.append((b"content-range", f"bytes */{archivo.size}".encode()))
+                await send({"type": "http.response.start", "status": 416, "headers": cabeceras})
+                await send({"type": "http.response.body", "body": b""})
+                return
+            if parsed:
+                inicio, fin = parsed
+                status = 206
+                cabeceras.append((b"content-range", f"bytes {inicio}-{fin}/{archivo.size}".encode()))
+
+        longitud = max(fin - inicio + 1, 0)
+        cabeceras += [
+            (b"content-type", self.media_type.encode()),
+            (b"content-length", str(longitud).encode()),
+        ]
+        await send({"type": "http.response.start", "status": status, "headers": cabeceras})
+
+        if self.method == "HEAD" or longitud == 0:
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        posicion = inicio
+        restante = longitud
+        while restante > 0:
+            chunk = await asyncio.to_thread(_pread, archivo, min(CHUNK_SIZE, restante), posicion)
+            if not chunk:
+                break
+            posicion += len(chunk)
+            restante -= len(chunk)
+            await send({"type": "http.response.body", "body": chunk, "more_body": restante > 0})
+        if restante > 0:
+            # File shrank underneath us; terminate the body
+            await send({"type": "http.response.body", "body": b""})
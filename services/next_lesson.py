@@ -0,0 +1,106 @@
+import os
+import time
+import threading
+from collections import OrderedDict
+from sqlalchemy import select, and_
+from sqlalchemy.orm import Session
+
+from models.modulo import Modulo
+from models.leccion import Leccion
+from models.video import Video
+from models.usuario_leccion import UsuarioLeccion
+from services.catalog_cache import catalog_cache
+
+CACHE_SIZE = int(os.getenv("NEXT_LESSON_CACHE_SIZE", "10000"))
+# Answers submitted through other workers show up after at most this long
+CACHE_TTL_SEG = float(os.getenv("NEXT_LESSON_CACHE_TTL", "60"))
+
+
+class NextLessonCache:
+    """
+    LRU of id_usuario -> resolved next lesson. An entry lives until the
+    user's next answer, a catalog change or the TTL, whichever comes first.
+    """
+
+    def __init__(self, capacidad: int):
+        self.capacidad = capacidad
+        self._lock = threading.Lock()
+        self._entradas: OrderedDict[int, tuple[dict, int, float]] = OrderedDict()
+
+    def get(self, user_id: int) -> dict | None:
+        with self._lock:
+            entrada = self._entradas.get(user_id)
+            if not entrada:
+                return None
+            payload, version, creado = entrada
+            if version != catalog_cache.version or time.monotonic() - creado > CACHE_TTL_SEG:
+                return None
+            self._entradas.move_to_end(user_id)
+            return payload
+
+    def put(self, user_id: int, payload: dict, version: int) -> None:
+        with self._lock:
+            self._entradas[user_id] = (payload, version, time.monotonic())
+            self._entradas.move_to_end(user_id)
+            while len(self._entradas) > self.capacidad:
+                self._entradas.popitem(last=False)
+
+    def discard(self, user_id: int) -> None:
+        with self._lock:
+            self._entradas.pop(user_id, None)
+
+
+next_lesson_cache = NextLessonCache(CACHE_SIZE)
+
+
+def resolve_next_lesson(db: Session, user_id: int) -> dict:
+    """
+    First active lesson the user has not completed, in module then lesson
+    order. One anti-join: each candidate lesson probes the
+    usuarios_lecciones primary key (id_usuario, id_leccion) and the first
+    miss wins. Its videos come from a second query.
+    """
+    ul = UsuarioLeccion
+    fila = db.execute(
+        select(Leccion.id_leccion, Leccion.titulo, Leccion.orden, Modulo.id_modulo, Modulo.titulo.label("modulo"))
+        .join(Modulo, Modulo.id_modulo == Leccion.id_modulo)
+        .outerjoin(ul, and_(
+            ul.id_usuario == user_id,
+            ul.id_leccion == Leccion.id_leccion,
+            ul.completado == True
+        ))
+        .where(Modulo.activo == True, Leccion.activo == True, ul.id_leccion.is_(None))
+        .order_by(Modulo.orden, Modulo.id_modulo, Leccion.orden, Leccion.id_leccion)
+        .limit(1)
+    ).first()
+
+    if not fila:
+        return {"completado_todo": True, "leccion": None}
+
+    videos = db.execute(
+        select(Video.id_video, Video.titulo, Video.url, Video.duracion_seg, Video.orden)
+        .where(Video.id_leccion == fila.id_leccion, Video.activo == True)
+        .order_by(Video.orden)
+    ).mappings().all()
+
+    return {
+        "completado_todo": False,
+        "leccion": {
+            "id_leccion": fila.id_leccion,
+            "titulo": fila.titulo,
+            "orden": fila.orden,
+            "id_modulo": fila.id_modulo,
+            "modulo_nombre": fila.modulo,
+            "videos": [dict(v) for v in videos]
+        }
+    }
+
+
+def get_next_lesson(db: Session, user_id: int) -> dict:
+    """resolve_next_lesson, cached per user"""
+    payload = next_lesson_cache.get(user_id)
+    if payload is None:
+        version = catalog_cache.version
+        payload = resolve_next_lesson(db, user_id)
+        next_lesson_cache.put(user_id, payload, version)
+    return payload
@@ -0,0 +1,98 @@
+import os
+import math
+import time
+import bcrypt
+
+# Tunables (env)
+# Time budget for one password hash on this CPU; the cost is the highest that fits
+TARGET_MS = float(os.getenv("BCRYPT_TARGET_MS", "250"))
+# Floor for slow nodes; existing hashes are never rehashed downwards (needs_rehash)
+MIN_ROUNDS = int(os.getenv("BCRYPT_MIN_ROUNDS", "10"))
+MAX_ROUNDS = int(os.getenv("BCRYPT_MAX_ROUNDS", "16"))
+# Cheap cost timed at startup; every +1 round doubles the time
+SAMPLE_ROUNDS = 8
+
+_rounds: int | None = None
+
+
+def calibrate_rounds() -> int:
+    """
+    bcrypt cost for this CPU: BCRYPT_ROUNDS when set (a process manager
+    calibrates once and exports it so all its workers agree), otherwise the
+    highest cost within TARGET_MS, clamped to [MIN_ROUNDS, MAX_ROUNDS].
+    """
+    fijo = os.getenv("BCRYPT_ROUNDS")
+    if fijo:
+        return int(fijo)
+
+    salt = bcrypt.gensalt(rounds=SAMPLE_ROUNDS)
+    muestras = []
+    for _ in range(3):
+        inicio = time.perf_counter()
+        bcrypt.hashpw(b"calibracion", salt)
+        muestras.append((time.perf_counter() - inicio) * 1000)
+    ms = max(min(muestras), 0.01)
+
+    rounds = SAMPLE_ROUNDS + math.floor(math.log2(TARGET_MS / ms))
+    if rounds < MIN_ROUNDS:
+        estimado = ms * 2 ** (MIN_ROUNDS - SAMPLE_ROUNDS)
+        print(f"✗ bcrypt cost {MIN_ROUNDS} takes ~{estimado:.0f} ms on this CPU, over the {TARGET_MS:.0f} ms target")
+    return max(MIN_ROUNDS, min(rounds, MAX_ROUNDS))
+
+
+def init_password_hashing() -> int:
+    """Calibrate at startup; returns the cost new hashes will use"""
+    global _rounds
+    _rounds = calibrate_rounds()
+    return _rounds
+
+
+def target_rounds() -> int:
+    return _rounds if _rounds is not None else init_password_hashing()
+
+
+def hash_password(contrasena: str | bytes) -> str:
+    if isinstance(contrasena, str):
+        contrasena = contrasena.encode("utf-8")
+    return bcrypt.hashpw(contrasena, bcrypt.gensalt(rounds=target_rounds())).decode("utf-8")
+
+
+def hash_rounds(contrasena_hash: str) -> int | None:
+    """Cost stored in a bcrypt hash ($2b$12$...)"""
+    try:
+        return int(contrasena_hash.split("$")[2])
+    except (IndexError, ValueError):
+        return None
+
+
+def needs_rehash(contrasena_hash: str) -> bool:
+    """Only upgrades: a hash stronger than this node's target is left alone"""
+    rounds = hash_rounds(contrasena_hash)
+    return rounds is not None and rounds < target_rounds()
+
+
+def rehash_password(user_id: int, contrasena: str, hash_anterior: str) -> None:
+    """
+    Background task after a successful login: store the password hashed at
+    the current cost. Only replaces the hash that was verified, so a
+    password change made in the meantime is never overwritten.
+    """
+    # Imported here: process managers import this module only to calibrate
+    from sqlalchemy import update
+    from database.db import SessionLocal
+    from models.user import Usuario
+
+    db = SessionLocal()
+    try:
+        db.execute(
+            update(Usuario)
+            .where(Usuario.id_usuario == user_id, Usuario.contrasena_hash == hash_anterior)
+            .values(contrasena_hash=hash_password(contrasena))
+            .execution_options(synchronize_session=False)
+        )
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        print(f"✗ Password rehash failed for user {user_id}: {e}")
+    finally:
+        db.close()
@@ -0,0 +1,383 @@
+from datetime import datetime
+from sqlalchemy import update, insert, select, func, case, bindparam
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from models.user import Usuario
+from models.desafio_diario import DesafioDiario
+from models.leccion import Leccion
+from models.usuario_leccion import UsuarioLeccion
+from models.usuario_modulo import UsuarioModulo
+from models.resumen_usuario import ResumenUsuario
+from models.mision_cobrada import MisionCobrada
+from database.db import with_session
+from services.daily_reset import inicio_dia
+from services.write_behind import get_write_behind, DESAFIOS
+
+NOMBRE_DESAFIO = "Desafio diario"
+CONTADORES_DESAFIO = ("lecciones_completadas", "modulos_completados", "xp_ganado")
+
+
+def supports_returning(db: Session) -> bool:
+    """True when the current dialect supports UPDATE ... RETURNING (PostgreSQL, SQLite >= 3.35)"""
+    return bool(db.get_bind().dialect.update_returning)
+
+
+def create_desafio(db: Session, user_id: int, **valores) -> bool:
+    """
+    Insert the user's daily challenge row.
+    Returns False if a concurrent request created it first.
+    """
+    fila = {
+        "id_desafio": user_id,
+        "lecciones_completadas": 0,
+        "modulos_completados": 0,
+        "xp_ganado": 0,
+        "nombre_desafio": NOMBRE_DESAFIO,
+        "actualizado_en": datetime.utcnow(),
+    }
+    fila.update(valores)
+    try:
+        with db.begin_nested():
+            db.execute(insert(DesafioDiario).values(**fila))
+        return True
+    except IntegrityError:
+        return False
+
+
+def _desafio_values(cambios: dict) -> dict:
+    """
+    SET clause for a challenge write. Rows the day-boundary reset has not
+    reached yet are rolled over in the same statement, so yesterday's
+    counters never leak into today's progress.
+    """
+    obsoleta = DesafioDiario.actualizado_en < inicio_dia()
+    valores = {}
+    for columna in CONTADORES_DESAFIO:
+        actual = func.coalesce(getattr(DesafioDiario, columna), 0)
+        if columna in cambios:
+            valores[columna] = cambios[columna](actual, obsoleta)
+        else:
+            valores[columna] = case((obsoleta, 0), else_=actual)
+    valores["actualizado_en"] = datetime.utcnow()
+    return valores
+
+
+def set_mission_progress(db: Session, user_id: int, columna: str, progreso: int) -> None:
+    """
+    Raise a client-reported mission counter on the user's daily challenge
+    row. Within a day the counter never goes down, so a lower report cannot
+    reopen a completed mission. The caller commits.
+    """
+    valores = _desafio_values({
+        columna: lambda actual, obsoleta: case((obsoleta, progreso), (actual > progreso, actual), else_=progreso)
+    })
+
+    for _ in range(2):
+        actualizada = db.execute(
+            update(DesafioDiario)
+            .where(DesafioDiario.id_desafio == user_id)
+            .values(valores)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        if actualizada:
+            return
+
+        # No row yet: create it already holding the new progress
+        if create_desafio(db, user_id, **{columna: max(progreso, 0)}):
+            return
+
+
+def mission_counter(db: Session, user_id: int, columna: str) -> int:
+    """Today's value of a challenge counter, including write-behind increments not yet flushed"""
+    col = getattr(DesafioDiario, columna)
+    valor = db.execute(
+        select(case((DesafioDiario.actualizado_en < inicio_dia(), 0), else_=func.coalesce(col, 0)))
+        .where(DesafioDiario.id_desafio == user_id)
+    ).scalar() or 0
+
+    buffer = get_write_behind()
+    if buffer:
+        valor += buffer.pending(DESAFIOS, (user_id, datetime.utcnow().date().isoformat()))["inc"].get(columna, 0)
+    return valor
+
+
+def claim_mission_reward(db: Session, user_id: int, mision_id: int) -> bool:
+    """
+    Record that today's reward for a mission was paid. Returns True only for
+    the first claim of the day, so neither concurrent requests nor a counter
+    reported down and up again can be rewarded twice. The caller commits.
+    """
+    try:
+        with db.begin_nested():
+            db.execute(insert(MisionCobrada).values(
+                id_usuario=user_id,
+                id_mision=mision_id,
+                dia=inicio_dia().date(),
+                creado_en=datetime.utcnow()
+            ))
+        return True
+    except IntegrityError:
+        return False
+
+
+def award_coins(db: Session, user_id: int, cantidad: int) -> int | None:
+    """
+    Atomically add coins to a user (monedas = monedas + cantidad).
+    Returns the new balance, or None if the user does not exist.
+    """
+    stmt = (
+        update(Usuario)
+        .where(Usuario.id_usuario == user_id)
+        .values(monedas=func.coalesce(Usuario.monedas, 0) + cantidad)
+        .execution_options(synchronize_session=False)
+    )
+
+    if supports_returning(db):
+        fila = db.execute(stmt.returning(Usuario.monedas)).first()
+        return fila[0] if fila else None
+
+    # MySQL has no UPDATE ... RETURNING; read back inside the same transaction
+    if not db.execute(stmt).rowcount:
+        return None
+    return db.execute(
+        select(Usuario.monedas).where(Usuario.id_usuario == user_id)
+    ).scalar()
+
+
+def increment_desafio(db: Session, user_id: int, **incrementos) -> None:
+    """Atomically add to the user's daily challenge counters (col = col + n)"""
+    valores = _desafio_values({
+        columna: (lambda actual, obsoleta, n=cantidad: case((obsoleta, 0), else_=actual) + n)
+        for columna, cantidad in incrementos.items()
+    })
+
+    for _ in range(2):
+        actualizada = db.execute(
+            update(DesafioDiario)
+            .where(DesafioDiario.id_desafio == user_id)
+            .values(valores)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        if actualizada or create_desafio(db, user_id, **incrementos):
+            return
+
+
+def _create_user_summary(db: Session, user_id: int, total: int) -> bool:
+    """Insert the user's summary row. Returns False if a concurrent request created it first."""
+    try:
+        with db.begin_nested():
+            db.execute(insert(ResumenUsuario).values(
+                id_usuario=user_id,
+                lecciones_completadas=total,
+                actualizado_en=datetime.utcnow()
+            ))
+        return True
+    except IntegrityError:
+        return False
+
+
+def _count_completed(db: Session, user_id: int, excluir: int | None = None) -> int:
+    consulta = db.query(func.count(UsuarioLeccion.id_leccion)).filter(
+        UsuarioLeccion.id_usuario == user_id,
+        UsuarioLeccion.completado == True
+    )
+    if excluir is not None:
+        consulta = consulta.filter(UsuarioLeccion.id_leccion != excluir)
+    return consulta.scalar() or 0
+
+
+def _build_user_summary(db: Session, user_id: int) -> int:
+    total = _count_completed(db, user_id)
+    creada = _create_user_summary(db, user_id, total)
+    db.commit()
+    if creada:
+        return total
+    return db.scalar(select(ResumenUsuario.lecciones_completadas).where(ResumenUsuario.id_usuario == user_id)) or 0
+
+
+def completed_lessons_total(db: Session, user_id: int) -> int:
+    """
+    Lessons the user has completed, from their summary row. A missing row is
+    built once from usuarios_lecciones and committed on a Session of its own,
+    so read-only callers persist it too.
+    """
+    total = db.scalar(select(ResumenUsuario.lecciones_completadas).where(ResumenUsuario.id_usuario == user_id))
+    if total is not None:
+        return total
+    return with_session(_build_user_summary, user_id)
+
+
+def _increment_user_summary(db: Session, user_id: int, leccion: Leccion) -> None:
+    """+1 completed lesson on the user's summary row (created from a COUNT if missing)"""
+    incrementar = (
+        update(ResumenUsuario)
+        .where(ResumenUsuario.id_usuario == user_id)
+        .values(
+            lecciones_completadas=func.coalesce(ResumenUsuario.lecciones_completadas, 0) + 1,
+            actualizado_en=datetime.utcnow()
+        )
+        .execution_options(synchronize_session=False)
+    )
+    if db.execute(incrementar).rowcount:
+        return
+    # The session does not autoflush: count the others, plus this lesson
+    if not _create_user_summary(db, user_id, _count_completed(db, user_id, excluir=leccion.id_leccion) + 1):
+        # Built concurrently, from a count that did not include this lesson
+        db.execute(incrementar)
+
+
+def on_lesson_completed(db: Session, user_id: int, leccion: Leccion) -> bool:
+    """
+    Incrementally roll a newly completed lesson up into the user's module
+    progress, lifetime total and daily challenge counters. Must run in the same transaction
+    as the UsuarioLeccion write; the caller commits.
+    Returns True if this lesson completed the module.
+    """
+    total = db.query(func.count(Leccion.id_leccion)).filter(
+        Leccion.id_modulo == leccion.id_modulo,
+        Leccion.activo == True
+    ).scalar() or 0
+
+    usuario_modulo = db.query(UsuarioModulo).filter(
+        UsuarioModulo.id_usuario == user_id,
+        UsuarioModulo.id_modulo == leccion.id_modulo
+    ).with_for_update().first()
+
+    if not usuario_modulo:
+        usuario_modulo = UsuarioModulo(
+            id_usuario=user_id,
+            id_modulo=leccion.id_modulo,
+            progreso_pct=0,
+            completado=False
+        )
+        db.add(usuario_modulo)
+
+    ya_completado = bool(usuario_modulo.completado)
+
+    # Recounted rather than derived from progreso_pct, which goes stale when
+    # the module gains or loses lessons (one range scan on the user's
+    # usuarios_lecciones primary key prefix)
+    if total:
+        previas = db.query(func.count(UsuarioLeccion.id_leccion)).join(
+            Leccion, UsuarioLeccion.id_leccion == Leccion.id_leccion
+        ).filter(
+            UsuarioLeccion.id_usuario == user_id,
+            UsuarioLeccion.completado == True,
+            UsuarioLeccion.id_leccion != leccion.id_leccion,
+            Leccion.id_modulo == leccion.id_modulo,
+            Leccion.activo == True
+        ).scalar() or 0
+        completadas = min(previas + (1 if leccion.activo else 0), total)
+        usuario_modulo.progreso_pct = round(completadas * 100 / total, 2)
+        usuario_modulo.completado = completadas >= total
+    usuario_modulo.actualizado_en = datetime.utcnow()
+
+    _increment_user_summary(db, user_id, leccion)
+
+    modulo_completado = bool(usuario_modulo.completado) and not ya_completado
+    incrementos = {"lecciones_completadas": 1}
+    if modulo_completado:
+        incrementos["modulos_completados"] = 1
+
+    buffer = get_write_behind()
+    if buffer:
+        buffer.add(DESAFIOS, (user_id, datetime.utcnow().date().isoformat()), inc=incrementos)
+    else:
+        increment_desafio(db, user_id, **incrementos)
+    return modulo_completado
+
+
+def subtract_completed(db: Session, cuentas: dict[int, int]) -> None:
+    """
+    Take removed completions ({id_usuario: n}) off the users' summary rows,
+    in one executemany UPDATE. The caller commits.
+    """
+    if not cuentas:
+        return
+    tabla = ResumenUsuario.__table__
+    actual = func.coalesce(tabla.c.lecciones_completadas, 0)
+    db.connection().execute(
+        update(tabla)
+        .where(tabla.c.id_usuario == bindparam("b_usuario"))
+        .values(
+            lecciones_completadas=case((actual > bindparam("b_n"), actual - bindparam("b_n")), else_=0),
+            actualizado_en=datetime.utcnow()
+        ),
+        [{"b_usuario": id_usuario, "b_n": n} for id_usuario, n in cuentas.items()]
+    )
+
+
+def rebuild_module_progress(db: Session, modulos: list[int] | None = None) -> int:
+    """
+    Recompute users' module rollups (every module, or only `modulos`) from
+    usuarios_lecciones in bulk: one aggregate query, then batched
+    insert/update of usuarios_modulos. Returns the number of rows written.
+    The caller commits.
+    """
+    def _solo(consulta, columna):
+        return consulta if modulos is None else consulta.filter(columna.in_(modulos))
+
+    totales = dict(
+        _solo(db.query(Leccion.id_modulo, func.count(Leccion.id_leccion)), Leccion.id_modulo)
+        .filter(Leccion.activo == True)
+        .group_by(Leccion.id_modulo)
+        .all()
+    )
+
+    completadas = _solo(db.query(
+        UsuarioLeccion.id_usuario,
+        Leccion.id_modulo,
+        func.count(UsuarioLeccion.id_leccion)
+    ).join(
+        Leccion, UsuarioLeccion.id_leccion == Leccion.id_leccion
+    ), Leccion.id_modulo).filter(
+        UsuarioLeccion.completado == True,
+        Leccion.activo == True
+    ).group_by(UsuarioLeccion.id_usuario, Leccion.id_modulo).all()
+
+    existentes = set(_solo(db.query(UsuarioModulo.id_usuario, UsuarioModulo.id_modulo), UsuarioModulo.id_modulo).all())
+    ahora = datetime.utcnow()
+
+    nuevas, cambios, vistas = [], [], set()
+    for id_usuario, id_modulo, cuenta in completadas:
+        total = totales.get(id_modulo, 0)
+        fila = {
+            "id_usuario": id_usuario,
+            "id_modulo": id_modulo,
+            "progreso_pct": round(min(cuenta, total) * 100 / total, 2) if total else 0,
+            "completado": bool(total) and cuenta >= total,
+            "actualizado_en": ahora,
+        }
+        vistas.add((id_usuario, id_modulo))
+        (cambios if (id_usuario, id_modulo) in existentes else nuevas).append(fila)
+
+    # Rows with no completed lessons left are reset to zero
+    for id_usuario, id_modulo in existentes - vistas:
+        cambios.append({
+            "id_usuario": id_usuario,
+            "id_modulo": id_modulo,
+            "progreso_pct": 0,
+            "completado": False,
+            "actualizado_en": ahora,
+        })
+
+    if nuevas:
+        db.bulk_insert_mappings(UsuarioModulo, nuevas)
+    if cambios:
+        db.bulk_update_mappings(UsuarioModulo, cambios)
+
+    return len(nuevas) + len(cambios)
+
+
+if __name__ == "__main__":
+    # Backfill: python -m services.progress_service
+    from database.db import SessionLocal
+
+    db = SessionLocal()
+    try:
+        filas = rebuild_module_progress(db)
+        db.commit()
+        print(f"✓ Module progress rebuilt ({filas} rows)")
+    finally:
+        db.close()
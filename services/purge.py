@@ -0,0 +1,195 @@
+import os
+import asyncio
+from sqlalchemy import select, update, delete, func
+from sqlalchemy.orm import Session
+
+from database.db import SessionLocal
+from models.modulo import Modulo
+from models.leccion import Leccion
+from models.video import Video
+from models.usuario_leccion import UsuarioLeccion
+from models.usuario_modulo import UsuarioModulo
+from models.purga_pendiente import PurgaPendiente
+from models.resumen_leccion import ResumenLeccion
+from models.repaso_palabra import RepasoPalabra
+from services.catalog_cache import bump_catalog_version
+from services.progress_service import subtract_completed, rebuild_module_progress
+
+# Tunables (env)
+BATCH_SIZE = int(os.getenv("PURGE_BATCH_SIZE", "500"))
+BATCH_PAUSE_SEG = float(os.getenv("PURGE_BATCH_PAUSE", "0.2"))
+POLL_INTERVAL_SEG = float(os.getenv("PURGE_POLL_INTERVAL", "5"))
+
+
+def purge_phases(tipo: str, id_entidad: int) -> list[tuple]:
+    """
+    Ordered (nombre, modelo, llave, filtro) steps that remove an entity and
+    everything that references it, children first. `llave` is the keyset
+    column each step pages through.
+    """
+    if tipo == "leccion":
+        videos = select(Video.id_video).where(Video.id_leccion == id_entidad).scalar_subquery()
+        return [
+            ("usuarios_lecciones", UsuarioLeccion, UsuarioLeccion.id_usuario, UsuarioLeccion.id_leccion == id_entidad),
+            ("repasos_palabras", RepasoPalabra, RepasoPalabra.id_video, RepasoPalabra.id_video.in_(videos)),
+            ("videos", Video, Video.id_video, Video.id_leccion == id_entidad),
+            ("resumen_lecciones", ResumenLeccion, ResumenLeccion.id_leccion, ResumenLeccion.id_leccion == id_entidad),
+            ("lecciones", Leccion, Leccion.id_leccion, Leccion.id_leccion == id_entidad),
+        ]
+
+    lecciones = select(Leccion.id_leccion).where(Leccion.id_modulo == id_entidad).scalar_subquery()
+    videos = select(Video.id_video).where(Video.id_leccion.in_(lecciones)).scalar_subquery()
+    return [
+        ("usuarios_lecciones", UsuarioLeccion, UsuarioLeccion.id_usuario, UsuarioLeccion.id_leccion.in_(lecciones)),
+        ("repasos_palabras", RepasoPalabra, RepasoPalabra.id_video, RepasoPalabra.id_video.in_(videos)),
+        ("videos", Video, Video.id_video, Video.id_leccion.in_(lecciones)),
+        ("resumen_lecciones", ResumenLeccion, ResumenLeccion.id_leccion, ResumenLeccion.id_leccion.in_(lecciones)),
+        ("usuarios_modulos", UsuarioModulo, UsuarioModulo.id_usuario, UsuarioModulo.id_modulo == id_entidad),
+        ("lecciones", Leccion, Leccion.id_leccion, Leccion.id_modulo == id_entidad),
+        ("modulos", Modulo, Modulo.id_modulo, Modulo.id_modulo == id_entidad),
+    ]
+
+
+def get_pending_purge(db: Session, tipo: str, id_entidad: int) -> PurgaPendiente | None:
+    return db.query(PurgaPendiente).filter(
+        PurgaPendiente.tipo == tipo,
+        PurgaPendiente.id_entidad == id_entidad,
+        PurgaPendiente.completado == False
+    ).first()
+
+
+def schedule_purge(db: Session, tipo: str, id_entidad: int) -> PurgaPendiente:
+    """
+    Soft-hide an entity and its catalog children right away and queue the
+    physical delete of it and its dependents. The caller commits.
+    """
+    purga = get_pending_purge(db, tipo, id_entidad)
+    if purga:
+        return purga
+
+    id_modulo = id_entidad if tipo == "modulo" else db.scalar(
+        select(Leccion.id_modulo).where(Leccion.id_leccion == id_entidad)
+    )
+
+    if tipo == "modulo":
+        db.execute(update(Modulo).where(Modulo.id_modulo == id_entidad).values(activo=False))
+        lecciones = select(Leccion.id_leccion).where(Leccion.id_modulo == id_entidad).scalar_subquery()
+        db.execute(update(Leccion).where(Leccion.id_modulo == id_entidad).values(activo=False))
+        db.execute(update(Video).where(Video.id_leccion.in_(lecciones)).values(activo=False))
+    else:
+        db.execute(update(Leccion).where(Leccion.id_leccion == id_entidad).values(activo=False))
+        db.execute(update(Video).where(Video.id_leccion == id_entidad).values(activo=False))
+
+    # Hidden lessons stop counting toward module progress right away
+    if id_modulo is not None:
+        rebuild_module_progress(db, [id_modulo])
+
+    purga = PurgaPendiente(tipo=tipo, id_entidad=id_entidad, fase=0, ultimo_id=0, procesados=0, completado=False)
+    db.add(purga)
+    db.flush()
+    return purga
+
+
+def purge_progress(purga: PurgaPendiente) -> dict:
+    fases = purge_phases(purga.tipo, purga.id_entidad)
+    actual = fases[purga.fase][0] if not purga.completado and purga.fase < len(fases) else None
+    return {**purga.to_dict(), "total_fases": len(fases), "fase_actual": actual}
+
+
+def _affected_modules(db: Session, purga: PurgaPendiente) -> list[int]:
+    if purga.tipo == "modulo":
+        return [purga.id_entidad]
+    return list(db.scalars(select(Leccion.id_modulo).where(Leccion.id_leccion == purga.id_entidad)))
+
+
+def purge_batch(db: Session, purga: PurgaPendiente) -> None:
+    """
+    Delete the next keyset page of the job's current phase. The job's cursor
+    advances in the same transaction, so a crash resumes from the last
+    committed page.
+    """
+    fases = purge_phases(purga.tipo, purga.id_entidad)
+    _, modelo, llave, filtro = fases[purga.fase]
+
+    if purga.fase == len(fases) - 1:
+        # Children created while the purge ran would block the final delete
+        for _, _, llave_previa, filtro_previo in fases[:-1]:
+            if db.execute(select(llave_previa).where(filtro_previo).limit(1)).first():
+                purga.fase, purga.ultimo_id = 0, 0
+                db.commit()
+                return
+
+    ids = db.execute(
+        select(llave)
+        .where(filtro, llave > purga.ultimo_id)
+        .order_by(llave)
+        .limit(BATCH_SIZE)
+    ).scalars().all()
+
+    if not ids:
+        if modelo is UsuarioLeccion:
+            # Settle the module rollups against the rows that are left
+            rebuild_module_progress(db, _affected_modules(db, purga))
+        purga.fase += 1
+        purga.ultimo_id = 0
+        purga.completado = purga.fase >= len(fases)
+        db.commit()
+        return
+
+    if modelo is UsuarioLeccion:
+        # Home's lifetime Total is kept in resumen_usuarios: subtract in the same transaction
+        subtract_completed(db, dict(db.execute(
+            select(UsuarioLeccion.id_usuario, func.count())
+            .where(filtro, UsuarioLeccion.completado == True, llave > purga.ultimo_id, llave <= ids[-1])
+            .group_by(UsuarioLeccion.id_usuario)
+        ).all()))
+
+    borradas = db.execute(
+        delete(modelo)
+        .where(filtro, llave > purga.ultimo_id, llave <= ids[-1])
+        .execution_options(synchronize_session=False)
+    ).rowcount
+
+    purga.ultimo_id = ids[-1]
+    purga.procesados = (purga.procesados or 0) + borradas
+    db.commit()
+
+
+def run_purge_batch() -> dict | None:
+    """Advance the oldest pending purge by one batch. Returns its progress, or None when idle."""
+    db = SessionLocal()
+    try:
+        purga = db.query(PurgaPendiente).filter(
+            PurgaPendiente.completado == False
+        ).order_by(PurgaPendiente.id_purga).with_for_update(skip_locked=True).first()
+        if not purga:
+            db.commit()
+            return None
+        purge_batch(db, purga)
+        return purge_progress(purga)
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+async def purge_loop() -> None:
+    """Background worker: drain pending purges batch by batch, throttled"""
+    while True:
+        try:
+            progreso = await asyncio.to_thread(run_purge_batch)
+        except Exception as e:
+            print(f"✗ Purge batch failed: {e}")
+            await asyncio.sleep(POLL_INTERVAL_SEG)
+            continue
+
+        if progreso is None:
+            await asyncio.sleep(POLL_INTERVAL_SEG)
+            continue
+
+        if progreso["completado"]:
+            bump_catalog_version()
+            print(f"✓ Purged {progreso['tipo']} {progreso['id_entidad']} ({progreso['procesados']} rows)")
+        # Throttle so the purge never competes with API traffic
+        await asyncio.sleep(BATCH_PAUSE_SEG)
@@ -0,0 +1,75 @@
+import asyncio
+import functools
+import inspect
+
+
+def normalize_key(prefijo: str, **params) -> str:
+    """Cache/coalescing key from query params: sorted, None dropped, strings trimmed and lowercased"""
+    partes = []
+    for nombre in sorted(params):
+        valor = params[nombre]
+        if valor is None or valor == "":
+            continue
+        if isinstance(valor, str):
+            valor = valor.strip().lower()
+        partes.append(f"{nombre}={valor}")
+    return prefijo + ":" + "&".join(partes)
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent identical computations: the first caller for a key
+    starts it as a detached task (sync functions in a worker thread, off the
+    event loop) and every caller, the first included, awaits that task.
+    Since no request owns the computation, it must not use a request's
+    Session (see database.db.with_session).
+    """
+
+    def __init__(self):
+        self._en_vuelo: dict[str, asyncio.Future] = {}
+
+    async def do(self, clave: str, fn, *args, **kwargs):
+        tarea = self._en_vuelo.get(clave)
+        if tarea is None:
+            if inspect.iscoroutinefunction(fn):
+                tarea = asyncio.ensure_future(fn(*args, **kwargs))
+            else:
+                tarea = asyncio.ensure_future(asyncio.to_thread(fn, *args, **kwargs))
+            self._en_vuelo[clave] = tarea
+            tarea.add_done_callback(functools.partial(self._terminar, clave))
+
+        # shield: a cancelled caller (e.g. client disconnect) must not cancel
+        # the shared call, which every other caller is waiting on
+        return await asyncio.shield(tarea)
+
+    def _terminar(self, clave: str, tarea: asyncio.Future) -> None:
+        if self._en_vuelo.get(clave) is tarea:
+            del self._en_vuelo[clave]
+        if not tarea.cancelled():
+            # Retrieved here so a failure nobody awaited anymore is not logged
+            tarea.exception()
+
+    def in_flight(self) -> int:
+        return len(self._en_vuelo)
+
+
+single_flight_group = SingleFlight()
+
+
+def get_single_flight() -> SingleFlight:
+    """Dependency: the process-wide single-flight group"""
+    return single_flight_group
+
+
+def single_flight(clave_fn):
+    """
+    Decorator: coalesce concurrent calls whose clave_fn(*args, **kwargs) match.
+    The key must include everything the result depends on (e.g. the user id
+    for per-user data).
+    """
+    def decorador(fn):
+        @functools.wraps(fn)
+        async def envoltura(*args, **kwargs):
+            return await single_flight_group.do(clave_fn(*args, **kwargs), fn, *args, **kwargs)
+        return envoltura
+    return decorador
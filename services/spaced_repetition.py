@@ -0,0 +1,252 @@
+import os
+import asyncio
+from fastapi import HTTPException
+from datetime import datetime, timedelta
+from sqlalchemy import select, insert, update, exists, literal
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from database.db import SessionLocal
+from models.video import Video
+from models.usuario_leccion import UsuarioLeccion
+from models.repaso_palabra import RepasoPalabra
+from models.checkpoint_tarea import CheckpointTarea
+
+NOMBRE_TAREA = "backfill_repasos"
+
+# Tunables (env)
+# A popped word is hidden from /review/next this long, waiting for its answer
+LEASE_SEG = float(os.getenv("REVIEW_LEASE_SECONDS", "600"))
+BACKFILL_BATCH_SIZE = int(os.getenv("REVIEW_BACKFILL_BATCH_SIZE", "500"))
+BACKFILL_BATCH_PAUSE_SEG = float(os.getenv("REVIEW_BACKFILL_BATCH_PAUSE", "0.2"))
+
+FACILIDAD_INICIAL = 2.5
+FACILIDAD_MINIMA = 1.3
+
+
+def sm2(facilidad: float, intervalo: int, repeticiones: int, calidad: int) -> tuple[float, int, int]:
+    """
+    One SM-2 step for an answer graded 0-5. Returns the new
+    (facilidad, intervalo_dias, repeticiones).
+    """
+    if calidad < 3:
+        # Forgotten: start the word over, keeping what was learned about its ease
+        repeticiones, intervalo = 0, 1
+    else:
+        repeticiones += 1
+        if repeticiones == 1:
+            intervalo = 1
+        elif repeticiones == 2:
+            intervalo = 6
+        else:
+            intervalo = max(round(intervalo * facilidad), 1)
+
+    fallo = 5 - calidad
+    facilidad = max(facilidad + 0.1 - fallo * (0.08 + fallo * 0.02), FACILIDAD_MINIMA)
+    return facilidad, intervalo, repeticiones
+
+
+# ============== QUEUE ==============
+
+def _insert_missing(db: Session, user_id: int, ids_video: list[int], proxima: datetime) -> int:
+    """Add words to the user's queue, skipping those already in it"""
+    if not ids_video:
+        return 0
+    existentes = set(db.scalars(
+        select(RepasoPalabra.id_video).where(
+            RepasoPalabra.id_usuario == user_id,
+            RepasoPalabra.id_video.in_(ids_video)
+        )
+    ))
+    nuevos = [i for i in ids_video if i not in existentes]
+    if not nuevos:
+        return 0
+    filas = [
+        {
+            "id_usuario": user_id,
+            "id_video": id_video,
+            "facilidad": FACILIDAD_INICIAL,
+            "intervalo_dias": 0,
+            "repeticiones": 0,
+            "proxima": proxima,
+        }
+        for id_video in nuevos
+    ]
+    try:
+        with db.begin_nested():
+            db.execute(insert(RepasoPalabra), filas)
+    except IntegrityError:
+        # Queued concurrently by another request; nothing left to add
+        return 0
+    return len(filas)
+
+
+def enqueue_lesson_words(db: Session, user_id: int, id_leccion: int) -> int:
+    """
+    Queue a completed lesson's words, first due a day later.
+    Returns words added. The caller commits.
+    """
+    ids = list(db.scalars(
+        select(Video.id_video).where(Video.id_leccion == id_leccion, Video.activo == True)
+    ))
+    return _insert_missing(db, user_id, ids, datetime.utcnow() + timedelta(days=1))
+
+
+def pop_due(db: Session, user_id: int, n: int) -> list[tuple[RepasoPalabra, Video]]:
+    """
+    Take up to `n` due words, oldest due first: one range scan over
+    (id_usuario, proxima). They are leased (pushed LEASE_SEG ahead) with one
+    UPDATE so a repeated call does not hand them out again before they are
+    answered. The caller commits.
+    """
+    ahora = datetime.utcnow()
+    filas = db.execute(
+        select(RepasoPalabra, Video)
+        .join(Video, Video.id_video == RepasoPalabra.id_video)
+        .where(
+            RepasoPalabra.id_usuario == user_id,
+            RepasoPalabra.proxima <= ahora,
+            Video.activo == True
+        )
+        .order_by(RepasoPalabra.proxima)
+        .limit(n)
+        .with_for_update(of=RepasoPalabra, skip_locked=True)
+    ).all()
+
+    if filas:
+        db.execute(
+            update(RepasoPalabra)
+            .where(
+                RepasoPalabra.id_usuario == user_id,
+                RepasoPalabra.id_video.in_([repaso.id_video for repaso, _ in filas])
+            )
+            .values(proxima=ahora + timedelta(seconds=LEASE_SEG))
+            .execution_options(synchronize_session=False)
+        )
+    return filas
+
+
+def apply_answers(db: Session, user_id: int, calidades: dict[int, int]) -> list[dict]:
+    """
+    Grade reviewed words ({id_video: calidad}): the current state comes from
+    one IN query and the new schedules are written with one bulk UPDATE by
+    primary key. The caller commits.
+    """
+    repasos = db.execute(
+        select(RepasoPalabra.id_video, RepasoPalabra.facilidad, RepasoPalabra.intervalo_dias, RepasoPalabra.repeticiones)
+        .where(RepasoPalabra.id_usuario == user_id, RepasoPalabra.id_video.in_(list(calidades)))
+    ).all()
+
+    faltantes = sorted(set(calidades) - {fila.id_video for fila in repasos})
+    if faltantes:
+        raise HTTPException(
+            status_code=404,
+            detail=f"No hay repaso pendiente para las palabras {faltantes}"
+        )
+
+    ahora = datetime.utcnow()
+    cambios = []
+    for id_video, facilidad, intervalo, repeticiones in repasos:
+        facilidad, intervalo, repeticiones = sm2(
+            facilidad or FACILIDAD_INICIAL, intervalo or 0, repeticiones or 0, calidades[id_video]
+        )
+        cambios.append({
+            "id_usuario": user_id,
+            "id_video": id_video,
+            "facilidad": facilidad,
+            "intervalo_dias": intervalo,
+            "repeticiones": repeticiones,
+            "proxima": ahora + timedelta(days=intervalo),
+            "ultima_revision": ahora,
+        })
+
+    if cambios:
+        # ORM bulk UPDATE by primary key: one executemany
+        db.execute(update(RepasoPalabra), cambios)
+    return cambios
+
+
+# ============== BACKFILL ==============
+
+def backfill_batch() -> int | None:
+    """
+    One-off job: queue the words of every lesson completed before the review
+    queue existed, due right away. Each run takes the next keyset page of
+    users and fills it with one INSERT ... SELECT that skips words already
+    queued, so users who completed lessons since the deploy are covered too.
+    Returns users processed, or None once the backfill is complete.
+    """
+    db = SessionLocal()
+    try:
+        checkpoint = db.query(CheckpointTarea).filter(
+            CheckpointTarea.nombre == NOMBRE_TAREA
+        ).with_for_update().first()
+        if checkpoint and checkpoint.completado:
+            db.commit()
+            return None
+        if not checkpoint:
+            checkpoint = CheckpointTarea(nombre=NOMBRE_TAREA, ultimo_id=0, completado=False, procesados=0)
+            db.add(checkpoint)
+
+        ul = UsuarioLeccion
+        usuarios = db.scalars(
+            select(ul.id_usuario).distinct()
+            .where(ul.completado == True, ul.id_usuario > (checkpoint.ultimo_id or 0))
+            .order_by(ul.id_usuario)
+            .limit(BACKFILL_BATCH_SIZE)
+        ).all()
+        if not usuarios:
+            checkpoint.completado = True
+            db.commit()
+            return None
+
+        ahora = datetime.utcnow()
+        pendientes = (
+            select(
+                ul.id_usuario, Video.id_video, literal(FACILIDAD_INICIAL),
+                literal(0), literal(0), literal(ahora)
+            )
+            .join(Video, Video.id_leccion == ul.id_leccion)
+            .where(
+                ul.id_usuario.in_(usuarios),
+                ul.completado == True,
+                Video.activo == True,
+                ~exists().where(
+                    RepasoPalabra.id_usuario == ul.id_usuario,
+                    RepasoPalabra.id_video == Video.id_video
+                )
+            )
+        )
+        db.execute(insert(RepasoPalabra).from_select(
+            ["id_usuario", "id_video", "facilidad", "intervalo_dias", "repeticiones", "proxima"],
+            pendientes
+        ))
+
+        checkpoint.ultimo_id = usuarios[-1]
+        checkpoint.procesados = (checkpoint.procesados or 0) + len(usuarios)
+        db.commit()
+        return len(usuarios)
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+async def review_backfill_loop() -> None:
+    """Startup job: run the review-queue backfill to completion, throttled (no-op once done)"""
+    usuarios = 0
+    while True:
+        try:
+            n = await asyncio.to_thread(backfill_batch)
+        except Exception as e:
+            # e.g. a word queued concurrently by a lesson completion: retry the page
+            print(f"✗ Review queue backfill batch failed: {e}")
+            await asyncio.sleep(60)
+            continue
+        if n is None:
+            break
+        usuarios += n
+        await asyncio.sleep(BACKFILL_BATCH_PAUSE_SEG)
+    if usuarios:
+        print(f"✓ Review queue backfilled ({usuarios} users)")
@@ -0,0 +1,39 @@
+import os
+import time
+
+# Boot-time budget (ms) for imports + lifespan startup
+STARTUP_BUDGET_MS = float(os.getenv("STARTUP_BUDGET_MS", "3000"))
+
+
+class StartupReport:
+    """Records elapsed time per boot phase and prints a one-line report"""
+
+    def __init__(self):
+        self._inicio = time.perf_counter()
+        self._ultimo = self._inicio
+        self.fases: list[tuple[str, float]] = []
+
+    def mark(self, fase: str) -> None:
+        ahora = time.perf_counter()
+        ms = (ahora - self._ultimo) * 1000
+        self._ultimo = ahora
+        # A phase can be marked twice (spawned workers import main as __mp_main__ and main)
+        for i, (nombre, previo) in enumerate(self.fases):
+            if nombre == fase:
+                self.fases[i] = (nombre, previo + ms)
+                return
+        self.fases.append((fase, ms))
+
+    def total_ms(self) -> float:
+        return sum(ms for _, ms in self.fases)
+
+    def report(self) -> None:
+        detalle = ", ".join(f"{fase} {ms:.0f}ms" for fase, ms in self.fases)
+        total = self.total_ms()
+        if total > STARTUP_BUDGET_MS:
+            print(f"✗ Startup {total:.0f}ms exceeds budget {STARTUP_BUDGET_MS:.0f}ms ({detalle})")
+        else:
+            print(f"✓ Startup {total:.0f}ms ({detalle})")
+
+
+startup_report = StartupReport()
@@ -0,0 +1,411 @@
+import os
+import json
+import uuid
+import asyncio
+import time
+import threading
+from datetime import datetime, timedelta
+from sqlalchemy import update, insert, bindparam, func, case, or_
+from sqlalchemy.exc import IntegrityError, OperationalError
+from sqlalchemy.orm import Session
+
+from database.db import SessionLocal
+from models.usuario_leccion import UsuarioLeccion
+from models.checkpoint_tarea import CheckpointTarea
+
+# Tunables (env)
+WRITE_BEHIND_ENABLED = os.getenv("WRITE_BEHIND_ENABLED", "false").lower() == "true"
+WRITE_BEHIND_DIR = os.getenv("WRITE_BEHIND_DIR", "./.write_behind")
+FLUSH_INTERVAL_SEG = float(os.getenv("WRITE_BEHIND_FLUSH_INTERVAL", "2"))
+MAX_PENDING = int(os.getenv("WRITE_BEHIND_MAX_PENDING", "1000"))
+# Journal appends reach the page cache at once (a process crash loses none)
+# and the disk within this long: one fsync per interval, off the event loop
+FSYNC_INTERVAL_SEG = float(os.getenv("WRITE_BEHIND_FSYNC_INTERVAL", "0.05"))
+# A segment rejected this many times (bad row, constraint) goes to a dead-letter file
+MAX_RETRIES = int(os.getenv("WRITE_BEHIND_MAX_RETRIES", "5"))
+# Applied-batch checkpoints are kept this long, then pruned (hourly)
+CHECKPOINT_TTL_HORAS = float(os.getenv("WRITE_BEHIND_CHECKPOINT_TTL_HOURS", "24"))
+PODA_INTERVALO_SEG = 3600
+
+LECCIONES = "usuarios_lecciones"
+DESAFIOS = "desafios_diarios"
+RESUMENES = "resumen_lecciones"
+EVENTOS = "eventos_actividad"
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+        return True
+    except OSError:
+        return False
+
+
+class WriteBehindBuffer:
+    """
+    Coalesces high-frequency counter writes in memory and flushes them in
+    batches. Every add is appended to a per-process journal first (fsynced
+    in groups by the flusher task); each
+    flushed batch is recorded in checkpoints_tareas in the same transaction
+    as its UPDATEs, so journal replay after a crash applies it exactly once.
+    """
+
+    def __init__(self, directorio: str):
+        self.directorio = directorio
+        os.makedirs(directorio, exist_ok=True)
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+        self._sin_sync = False
+        self._pending: dict[tuple, dict] = {}
+        # [lote_id, segment path, lote, failures]
+        self._reintentos: list[list] = []
+        self._journal_path = os.path.join(directorio, f"journal-{os.getpid()}.log")
+        self._journal = None
+        self._wake: asyncio.Event | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+
+    # ---------- write path ----------
+
+    def add(self, tabla: str, clave: tuple, inc: dict | None = None, valores: dict | None = None) -> None:
+        """Buffer increments (`inc`) and last-write-wins values (`valores`) for one row"""
+        entrada = {"t": tabla, "k": list(clave), "inc": inc or {}, "set": valores or {}}
+        with self._lock:
+            self._journal.write(json.dumps(entrada) + "\n")
+            self._journal.flush()
+            self._sin_sync = True
+            self._merge(entrada)
+            lleno = len(self._pending) >= MAX_PENDING
+
+        if lleno and self._wake and self._loop:
+            self._loop.call_soon_threadsafe(self._wake.set)
+
+    def pending(self, tabla: str, clave: tuple) -> dict:
+        """Buffered, not yet flushed changes for one row ({"inc": {...}, "set": {...}})"""
+        with self._lock:
+            actual = self._pending.get((tabla, tuple(clave)))
+            return {"inc": dict(actual["inc"]), "set": dict(actual["set"])} if actual else {"inc": {}, "set": {}}
+
+    def _merge(self, entrada: dict) -> None:
+        clave = (entrada["t"], tuple(entrada["k"]))
+        actual = self._pending.setdefault(clave, {"inc": {}, "set": {}})
+        for columna, cantidad in entrada["inc"].items():
+            actual["inc"][columna] = actual["inc"].get(columna, 0) + cantidad
+        actual["set"].update(entrada["set"])
+
+    # ---------- flush path ----------
+
+    def flush(self) -> int:
+        """Write all pending changes in one transaction. Returns rows flushed."""
+        with self._flush_lock:
+            # Segments whose transaction failed earlier are retried first;
+            # one that keeps failing must not hold back the new batches
+            for reintento in list(self._reintentos):
+                try:
+                    self._apply_segment(*reintento[:3])
+                    self._reintentos.remove(reintento)
+                except Exception as e:
+                    self._record_failure(reintento, e)
+
+            with self._lock:
+                if not self._pending:
+                    return 0
+                lote, self._pending = self._pending, {}
+                lote_id = uuid.uuid4().hex
+                # Named after the owning pid so other workers leave it alone while we live
+                segmento = os.path.join(self.directorio, f"batch-{os.getpid()}-{lote_id}.pending")
+                self._write_segment(segmento, lote)
+                # Journal entries now live in the segment file
+                self._journal.seek(0)
+                self._journal.truncate()
+
+            try:
+                self._apply_segment(lote_id, segmento, lote)
+            except Exception as e:
+                reintento = [lote_id, segmento, lote, 0]
+                self._reintentos.append(reintento)
+                self._record_failure(reintento, e)
+                raise
+            return len(lote)
+
+    def _record_failure(self, reintento: list, error: Exception) -> None:
+        """Count a rejected segment; once over MAX_RETRIES, set it aside"""
+        lote_id, segmento = reintento[0], reintento[1]
+        if isinstance(error, OperationalError):
+            # Database unreachable: not the segment's fault
+            return
+        reintento[3] += 1
+        if reintento[3] < MAX_RETRIES:
+            return
+        self._reintentos.remove(reintento)
+        try:
+            os.replace(segmento, os.path.join(self.directorio, f"dead-{lote_id}.failed"))
+        except FileNotFoundError:
+            pass
+        print(f"✗ Write-behind batch {lote_id} failed {reintento[3]} times, moved to dead-{lote_id}.failed: {error}")
+
+    def _write_segment(self, path: str, lote: dict) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            for (tabla, clave), cambios in lote.items():
+                f.write(json.dumps({"t": tabla, "k": list(clave), **cambios}) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _apply_segment(self, lote_id: str, path: str, lote: dict) -> None:
+        db = SessionLocal()
+        nombre = f"write_behind:{lote_id}"
+        try:
+            ya_aplicado = db.query(CheckpointTarea).filter(CheckpointTarea.nombre == nombre).first()
+            if not ya_aplicado:
+                apply_batch(db, lote)
+                db.add(CheckpointTarea(nombre=nombre, completado=True, procesados=len(lote)))
+                try:
+                    db.commit()
+                except IntegrityError:
+                    # Another worker recovering the same segment committed it first
+                    db.rollback()
+
+            # The checkpoint outlives the file: a recoverer that read the
+            # segment before it was removed still finds it (pruned by age)
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                # Already handled by another worker
+                pass
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def prune_checkpoints(self) -> int:
+        """Delete applied-batch checkpoints older than CHECKPOINT_TTL_HORAS"""
+        db = SessionLocal()
+        try:
+            borrados = db.query(CheckpointTarea).filter(
+                CheckpointTarea.nombre.like("write_behind:%"),
+                CheckpointTarea.actualizado_en < datetime.utcnow() - timedelta(hours=CHECKPOINT_TTL_HORAS)
+            ).delete(synchronize_session=False)
+            db.commit()
+            return borrados
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    # ---------- lifecycle ----------
+
+    def recover(self) -> list[str]:
+        """
+        Replay segments and journals left behind by crashed processes (and our
+        own pid); those of live workers are theirs to apply. Each orphan is
+        claimed first by renaming it to a name of our pid, so workers starting
+        together never replay the same file twice; one that disappears meanwhile
+        was claimed by another worker. Returns the claimed journals, removed
+        once re-journaled.
+        """
+        huerfanos = []
+        for archivo in sorted(os.listdir(self.directorio)):
+            path = os.path.join(self.directorio, archivo)
+
+            if archivo.startswith("batch-") and archivo.endswith(".pending"):
+                pid, _, lote_id = archivo[len("batch-"):-len(".pending")].partition("-")
+                if not lote_id:
+                    # Written before segments carried their pid: nobody owns it
+                    pid, lote_id = "", pid
+                if pid and int(pid) != os.getpid() and _pid_alive(int(pid)):
+                    continue
+                path = self._claim(path, f"batch-{os.getpid()}-{lote_id}.pending")
+                if not path:
+                    continue
+                lote = self._read_lines(path)
+                try:
+                    self._apply_segment(lote_id, path, lote)
+                except Exception as e:
+                    # Retried by the flusher rather than failing startup
+                    reintento = [lote_id, path, lote, 0]
+                    self._reintentos.append(reintento)
+                    self._record_failure(reintento, e)
+
+            elif archivo.startswith("journal-") and archivo.endswith(".log"):
+                pid = int(archivo[len("journal-"):-len(".log")].partition("-")[0])
+                if pid != os.getpid() and _pid_alive(pid):
+                    continue
+                path = self._claim(path, f"journal-{os.getpid()}-{uuid.uuid4().hex}.log")
+                if not path:
+                    continue
+                for (tabla, clave), cambios in self._read_lines(path).items():
+                    self._merge({"t": tabla, "k": list(clave), **cambios})
+                huerfanos.append(path)
+        return huerfanos
+
+    def _claim(self, path: str, nombre: str) -> str | None:
+        """Atomically take over an orphan file; None if another worker got it first"""
+        destino = os.path.join(self.directorio, nombre)
+        try:
+            os.rename(path, destino)
+        except FileNotFoundError:
+            return None
+        return destino
+
+    def _read_lines(self, path: str) -> dict:
+        lote = {}
+        with open(path, encoding="utf-8") as f:
+            for linea in f:
+                try:
+                    entrada = json.loads(linea)
+                except json.JSONDecodeError:
+                    # Torn last line from a crash mid-write
+                    continue
+                clave = (entrada["t"], tuple(entrada["k"]))
+                actual = lote.setdefault(clave, {"inc": {}, "set": {}})
+                for columna, cantidad in entrada["inc"].items():
+                    actual["inc"][columna] = actual["inc"].get(columna, 0) + cantidad
+                actual["set"].update(entrada["set"])
+        return lote
+
+    def start(self) -> None:
+        huerfanos = self.recover()
+        self._journal = open(self._journal_path, "w", encoding="utf-8")
+        # Re-journal anything recovered that is still pending
+        for (tabla, clave), cambios in self._pending.items():
+            self._journal.write(json.dumps({"t": tabla, "k": list(clave), **cambios}) + "\n")
+        self._journal.flush()
+        os.fsync(self._journal.fileno())
+        for path in huerfanos:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def _sync_journal(self) -> None:
+        """Group commit: one fsync covers every append since the last one"""
+        with self._sync_lock:
+            with self._lock:
+                if not self._sin_sync or not self._journal:
+                    return
+                self._sin_sync = False
+                fd = self._journal.fileno()
+            os.fsync(fd)
+
+    def close(self) -> None:
+        self.flush()
+        with self._sync_lock:
+            if self._journal:
+                self._journal.close()
+            os.remove(self._journal_path)
+            self._journal = None
+
+    async def _sync_loop(self) -> None:
+        while True:
+            await asyncio.sleep(FSYNC_INTERVAL_SEG)
+            try:
+                await asyncio.to_thread(self._sync_journal)
+            except Exception as e:
+                print(f"✗ Write-behind journal fsync failed: {e}")
+
+    async def run(self) -> None:
+        """Flusher loop: flush every interval, or sooner when the buffer fills up"""
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        sincronizador = asyncio.create_task(self._sync_loop())
+        ultima_poda = 0.0
+        try:
+            while True:
+                try:
+                    await asyncio.wait_for(self._wake.wait(), timeout=FLUSH_INTERVAL_SEG)
+                except asyncio.TimeoutError:
+                    pass
+                self._wake.clear()
+                try:
+                    await asyncio.to_thread(self.flush)
+                except Exception as e:
+                    print(f"✗ Write-behind flush failed: {e}")
+                if time.monotonic() - ultima_poda >= PODA_INTERVALO_SEG:
+                    ultima_poda = time.monotonic()
+                    try:
+                        await asyncio.to_thread(self.prune_checkpoints)
+                    except Exception as e:
+                        print(f"✗ Write-behind checkpoint pruning failed: {e}")
+        finally:
+            sincronizador.cancel()
+
+
+def apply_batch(db: Session, lote: dict) -> None:
+    """
+    Apply a coalesced batch; usuarios_lecciones rows go through one
+    executemany UPDATE and activity events through one executemany INSERT
+    """
+    from services.progress_service import increment_desafio
+    from services.analytics import apply_summary_delta
+    from services.activity_log import event_row
+    from models.evento_actividad import EventoActividad
+
+    filas_lecciones = []
+    eventos = []
+    hoy = datetime.utcnow().date().isoformat()
+
+    for (tabla, clave), cambios in lote.items():
+        if tabla == LECCIONES:
+            id_usuario, id_leccion = clave
+            filas_lecciones.append({
+                "b_usuario": id_usuario,
+                "b_leccion": id_leccion,
+                "b_intentos": cambios["inc"].get("intentos", 0),
+                "b_calificacion": cambios["set"]["calificacion"],
+                "b_actualizado_en": datetime.fromisoformat(cambios["set"]["actualizado_en"]),
+            })
+        elif tabla == DESAFIOS:
+            id_usuario, dia = clave
+            # Increments from a day that already rolled over are dropped
+            if dia == hoy:
+                increment_desafio(db, id_usuario, **cambios["inc"])
+        elif tabla == RESUMENES:
+            apply_summary_delta(db, clave[0], cambios["inc"])
+        elif tabla == EVENTOS:
+            eventos.append(event_row(cambios["set"]))
+
+    if eventos:
+        db.execute(insert(EventoActividad), eventos)
+
+    if filas_lecciones:
+        tabla = UsuarioLeccion.__table__
+        # A synchronous write newer than the buffered one keeps its grade
+        mas_reciente = or_(tabla.c.actualizado_en == None, tabla.c.actualizado_en <= bindparam("b_actualizado_en"))
+        db.connection().execute(
+            update(tabla)
+            .where(
+                tabla.c.id_usuario == bindparam("b_usuario"),
+                tabla.c.id_leccion == bindparam("b_leccion")
+            )
+            .values(
+                intentos=func.coalesce(tabla.c.intentos, 0) + bindparam("b_intentos"),
+                calificacion=case((mas_reciente, bindparam("b_calificacion")), else_=tabla.c.calificacion),
+                actualizado_en=case((mas_reciente, bindparam("b_actualizado_en")), else_=tabla.c.actualizado_en)
+            ),
+            filas_lecciones
+        )
+
+
+_buffer: WriteBehindBuffer | None = None
+
+
+def get_write_behind() -> WriteBehindBuffer | None:
+    """The process-wide buffer, or None when write-behind mode is disabled"""
+    return _buffer
+
+
+def start_write_behind() -> WriteBehindBuffer | None:
+    global _buffer
+    if WRITE_BEHIND_ENABLED and _buffer is None:
+        _buffer = WriteBehindBuffer(WRITE_BEHIND_DIR)
+        _buffer.start()
+    return _buffer
+
+
+def stop_write_behind() -> None:
+    global _buffer
+    if _buffer:
+        _buffer.close()
+        _buffer = None